@@ -0,0 +1,168 @@
+"""Microbenchmark of the span lifecycle of zav.llm_tracing.
+
+Measures the CPU time and the memory allocated per span, with a tracing backend that
+does nothing, and the memory kept by a span that receives many events. Every
+measurement is taken for the current spans and for a copy of the pydantic spans
+they replaced, so that both columns come from the same run.
+
+Usage: python benchmarks/span_benchmark.py
+"""
+
+import gc
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from zav.llm_tracing import Span, Trace
+from zav.llm_tracing.trace import TracingBackend, new_id
+
+
+class NullTracingBackend(TracingBackend):
+    def handle_new_trace(self, span):
+        pass
+
+    def handle_new(self, span):
+        pass
+
+    def handle_update(self, span):
+        pass
+
+    def handle_event(self, span):
+        pass
+
+
+def now():
+    return datetime.now(timezone.utc)
+
+
+# The pydantic spans of zav.llm_tracing before they were made slotted classes
+
+
+class PydanticSpanContext(BaseModel):
+    trace_id: str = Field(default_factory=new_id)
+    span_id: str = Field(default_factory=new_id)
+    trace_state: Dict[str, Any] = Field(default_factory=dict)
+
+
+class PydanticSpanEvent(BaseModel):
+    name: str
+    timestamp: datetime = Field(default_factory=now)
+    attributes: Dict[str, Any] = Field(default_factory=dict)
+
+
+class PydanticSpan(BaseModel):
+    name: str
+    context: PydanticSpanContext
+    parent_id: Optional[str] = None
+    start_time: datetime = Field(default_factory=now)
+    end_time: Optional[datetime] = None
+    attributes: Dict[str, Any] = Field(default_factory=dict)
+    events: List[PydanticSpanEvent] = Field(default_factory=list)
+    tracing_backend: TracingBackend = Field(..., exclude=True)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def new(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        new_span = PydanticSpan(
+            name=name,
+            context=PydanticSpanContext(
+                trace_id=self.context.trace_id, trace_state=self.context.trace_state
+            ),
+            attributes=attributes or {},
+            parent_id=self.context.span_id,
+            events=[],
+            tracing_backend=self.tracing_backend,
+        )
+        self.tracing_backend.handle_new(new_span)
+        return new_span
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.events.append(PydanticSpanEvent(name=name, attributes=attributes or {}))
+        self.tracing_backend.handle_event(self)
+        return self
+
+    def update(self, attributes: Optional[Dict[str, Any]] = None):
+        self.attributes.update(attributes or {})
+        self.tracing_backend.handle_update(self)
+        return self
+
+    def end(self, attributes: Optional[Dict[str, Any]] = None):
+        self.end_time = now()
+        return self.update(attributes)
+
+
+ROOTS = {
+    "pydantic": PydanticSpan(
+        name="root",
+        context=PydanticSpanContext(trace_state={"tenant": "benchmark"}),
+        tracing_backend=NullTracingBackend(),
+    ),
+    "slotted": Trace(tracing_backend=NullTracingBackend()).new(
+        name="root", trace_state={"tenant": "benchmark"}
+    ),
+}
+
+
+def span_lifecycle(root: Span) -> Callable[[], None]:
+    def lifecycle():
+        span = root.new(name="child", attributes={"input": "question"})
+        span.add_event(name="debug log", attributes={"input": "message"})
+        span.end(attributes={"output": "answer"})
+
+    return lifecycle
+
+
+def span_creation(root: Span) -> Callable[[], Span]:
+    return lambda: root.new(name="child")
+
+
+def seconds_per_call(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def allocated_bytes(fn, number: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    kept = [fn() for _ in range(number)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return allocated / number
+
+
+def event_buffer_bytes(root: Span, events: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    span = root.new(name="streaming agent")
+    for i in range(events):
+        span.add_event(name="debug log", attributes={"input": i})
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated
+
+
+def measurements(root, number: int) -> Dict[str, float]:
+    return {
+        "span creation (us)": seconds_per_call(span_creation(root), number) * 1e6,
+        "span lifecycle (us)": seconds_per_call(span_lifecycle(root), number) * 1e6,
+        "span creation (bytes kept)": allocated_bytes(span_creation(root), number),
+        "10000 events (KiB kept)": event_buffer_bytes(root, 10000) / 1024,
+    }
+
+
+def main(number: int = 20000):
+    columns = {name: measurements(root, number) for name, root in ROOTS.items()}
+    print(f"{'':28}" + "".join(f"{name:>12}" for name in columns))
+    for label in columns["slotted"]:
+        print(
+            f"{label:28}"
+            + "".join(f"{column[label]:>12.2f}" for column in columns.values())
+        )
+
+
+if __name__ == "__main__":
+    main()
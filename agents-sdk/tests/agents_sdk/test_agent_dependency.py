@@ -0,0 +1,77 @@
+import asyncio
+
+from pydantic import BaseModel
+from zav.encryption.pydantic import EncryptedStr
+
+from zav.agents_sdk.domain.agent_dependency import (
+    AgentDependencyFactory,
+    DependencyScope,
+    ScopedDependencyStore,
+    _normalize,
+    dependency_fingerprint,
+)
+
+
+class Credentials(BaseModel):
+    api_key: EncryptedStr
+
+
+class Client:
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+class ClientFactory(AgentDependencyFactory):
+    scope = DependencyScope.TENANT
+    created = 0
+
+    @classmethod
+    def create(cls, credentials: Credentials, span=None) -> Client:
+        cls.created += 1
+        return Client(credentials.api_key.get_unencrypted_secret())
+
+
+def test_secrets_are_hashed_in_the_fingerprint_input():
+    normalized = _normalize(Credentials(api_key="sk-secret"))
+
+    assert "sk-secret" not in str(normalized)
+    assert dependency_fingerprint(
+        {"credentials": Credentials(api_key="sk-secret")}
+    ) == dependency_fingerprint({"credentials": Credentials(api_key="sk-secret")})
+    assert dependency_fingerprint(
+        {"credentials": Credentials(api_key="sk-secret")}
+    ) != dependency_fingerprint({"credentials": Credentials(api_key="sk-other")})
+
+
+def test_instances_are_shared_per_tenant_and_arguments():
+    ClientFactory.created = 0
+
+    async def run():
+        store = ScopedDependencyStore()
+
+        def get(tenant, span=None, api_key="sk-secret"):
+            return store.get(
+                ClientFactory,
+                {"credentials": Credentials(api_key=api_key), "span": span},
+                request_params=("span",),
+                tenant=tenant,
+            )
+
+        first = await get("a", span="request span")
+        same = await get("a")
+        other_tenant = await get("b")
+        other_key = await get("a", api_key="sk-other")
+        await store.close()
+        return first, same, other_tenant, other_key
+
+    first, same, other_tenant, other_key = asyncio.run(run())
+
+    assert first is same
+    assert other_tenant is not first
+    assert other_key is not first
+    assert ClientFactory.created == 3
+    assert first.closed and other_tenant.closed and other_key.closed
@@ -0,0 +1,64 @@
+from zav.agents_sdk.domain.agent_dependency import (
+    AgentDependencyFactory,
+    AgentDependencyRegistry,
+)
+from zav.agents_sdk.domain.chat_agent_factory import (
+    ChatAgentFactory,
+    InjectionStepKind,
+)
+
+
+class Database:
+    pass
+
+
+class DatabaseFactory(AgentDependencyFactory):
+    @classmethod
+    def create(cls, url: str) -> Database:
+        return Database()
+
+
+class Agent:
+    def __init__(self, database: Database, name: str = "agent"):
+        self.database = database
+        self.name = name
+
+
+def registry():
+    class Registry(AgentDependencyRegistry):
+        registry = {}
+        version = 0
+
+    return Registry
+
+
+def test_plan_is_compiled_once_per_target():
+    dependencies = registry()
+    dependencies.register(DatabaseFactory)
+
+    plan = ChatAgentFactory._compile_plan(Agent, dependencies)
+
+    assert plan is ChatAgentFactory._compile_plan(Agent, dependencies)
+    assert [step.kind for step in plan] == [
+        InjectionStepKind.DEPENDENCY,
+        InjectionStepKind.AGENT_CONFIGURATION,
+    ]
+    assert [step.param_name for step in plan[0].dependency_plan] == ["url"]
+
+
+def test_registration_replaces_the_plans_of_older_versions():
+    dependencies = registry()
+
+    before = ChatAgentFactory._compile_plan(Agent, dependencies)
+    dependencies.register(DatabaseFactory)
+    plans = len(ChatAgentFactory.injection_plans)
+    after = ChatAgentFactory._compile_plan(Agent, dependencies)
+
+    assert before[0].kind == InjectionStepKind.AGENT_CONFIGURATION
+    assert after[0].kind == InjectionStepKind.DEPENDENCY
+    # The plan of Agent is replaced, the one of DatabaseFactory.create is added
+    assert len(ChatAgentFactory.injection_plans) == plans + 1
+    assert ChatAgentFactory.injection_plans[(Agent, dependencies)] == (
+        dependencies.version,
+        after,
+    )
@@ -0,0 +1,50 @@
+import json
+
+from zav.agents_sdk.domain.chat_message import (
+    ChatMessage,
+    ChatMessageDelta,
+    ChatMessageEvidence,
+    ChatMessageSender,
+)
+
+EVIDENCES = [ChatMessageEvidence(document_hit_url="https://example.com")]
+
+
+def message(content: str, **kwargs) -> ChatMessage:
+    return ChatMessage(sender=ChatMessageSender.BOT, content=content, **kwargs)
+
+
+def test_first_delta_only_sends_the_fields_that_are_set():
+    delta = ChatMessageDelta.from_messages(None, message("Hel"))
+
+    assert json.loads(delta.changes_json()) == {"sender": "bot", "content_delta": "Hel"}
+
+
+def test_appended_content_is_sent_as_a_delta():
+    delta = ChatMessageDelta.from_messages(message("Hel"), message("Hello"))
+
+    assert json.loads(delta.changes_json()) == {"content_delta": "lo"}
+
+
+def test_rewritten_content_replaces_the_content():
+    delta = ChatMessageDelta.from_messages(message("Hello"), message("Bye"))
+
+    assert json.loads(delta.changes_json()) == {"content": "Bye"}
+
+
+def test_cleared_fields_are_sent_as_null():
+    delta = ChatMessageDelta.from_messages(
+        message("Hello", evidences=EVIDENCES), message("Hello")
+    )
+
+    assert not delta.is_empty()
+    assert json.loads(delta.changes_json()) == {"evidences": None}
+
+
+def test_unchanged_message_gives_an_empty_delta():
+    delta = ChatMessageDelta.from_messages(
+        message("Hello", evidences=EVIDENCES), message("Hello", evidences=EVIDENCES)
+    )
+
+    assert delta.is_empty()
+    assert json.loads(delta.changes_json()) == {}
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+from zav.agents_sdk.adapters.llm_models.zav_chat_completion_client import (
+    ToolCallRequest,
+    execute_tool_call_request,
+)
+from zav.agents_sdk.domain.chat_message import FunctionCallRequest
+from zav.agents_sdk.domain.tools import ToolsRegistry
+
+
+def request(tool_call_id: str, name: str, **params) -> ToolCallRequest:
+    return ToolCallRequest(
+        id=tool_call_id,
+        function_call_request=FunctionCallRequest(name=name, params=params),
+    )
+
+
+def responses(completion):
+    return [(r.id, r.response) for r in completion.tool_call_responses]
+
+
+def test_responses_follow_the_order_of_the_requests():
+    async def wait(seconds: float) -> str:
+        await asyncio.sleep(seconds)
+        return f"waited {seconds}"
+
+    tools = ToolsRegistry()
+    tools.add(wait, name="wait")
+
+    completion = asyncio.run(
+        execute_tool_call_request(
+            tools,
+            [request("1", "wait", seconds=0.03), request("2", "wait", seconds=0)],
+        )
+    )
+
+    assert responses(completion) == [("1", "waited 0.03"), ("2", "waited 0")]
+
+
+def test_concurrent_tools_are_bounded_by_max_concurrency():
+    running = []
+    max_running = []
+
+    async def work() -> str:
+        running.append(None)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        return "done"
+
+    tools = ToolsRegistry()
+    tools.add(work, name="work")
+
+    completion = asyncio.run(
+        execute_tool_call_request(
+            tools, [request(str(i), "work") for i in range(6)], max_concurrency=2
+        )
+    )
+
+    assert max(max_running) == 2
+    assert [response for _, response in responses(completion)] == ["done"] * 6
+
+
+def test_slow_tools_time_out_without_failing_the_others():
+    errors = []
+
+    async def slow() -> str:
+        await asyncio.sleep(1)
+        return "too late"
+
+    async def fast() -> str:
+        return "in time"
+
+    tools = ToolsRegistry()
+    tools.add(slow, name="slow")
+    tools.add(fast, name="fast")
+
+    completion = asyncio.run(
+        execute_tool_call_request(
+            tools,
+            [request("1", "slow"), request("2", "fast")],
+            log_fn=errors.append,
+            timeout=0.05,
+        )
+    )
+
+    assert responses(completion) == [
+        ("1", "Error in executing tool slow: timed out after 0.05 seconds"),
+        ("2", "in time"),
+    ]
+    assert errors[-1] == {"Error": responses(completion)[0][1]}
+
+
+def test_sync_tools_run_off_the_event_loop():
+    loop_threads = []
+
+    def blocking(value: int) -> str:
+        loop_threads.append(threading.get_ident())
+        return str(value * 2)
+
+    async def run():
+        loop_threads.append(threading.get_ident())
+        return await execute_tool_call_request(
+            tools, [request("1", "blocking", value=2)]
+        )
+
+    tools = ToolsRegistry()
+    tools.add(blocking, name="blocking")
+
+    completion = asyncio.run(run())
+
+    assert responses(completion) == [("1", "4")]
+    assert loop_threads[0] != loop_threads[1]
@@ -0,0 +1,60 @@
+import asyncio
+
+from zav.llm_tracing import Trace
+from zav.llm_tracing.instrumented import instrument_instance
+from zav.llm_tracing.trace import TracingBackend
+
+from zav.agents_sdk.domain.agent_setup_retriever import TracingSamplingConfiguration
+
+
+class RecordingTracingBackend(TracingBackend):
+    def __init__(self):
+        self.spans = []
+
+    def handle_new_trace(self, span):
+        self.spans.append(span.name)
+
+    def handle_new(self, span):
+        self.spans.append(span.name)
+
+    def handle_update(self, span):
+        pass
+
+    def handle_event(self, span):
+        pass
+
+
+class Retriever:
+    async def retrieve(self, query: str) -> str:
+        return query.upper()
+
+
+def test_agent_rate_takes_precedence_over_tenant_and_default_rates():
+    sampling = TracingSamplingConfiguration(
+        sample_rate=0.5,
+        tenant_sample_rates={"tenant": 0.2},
+        agent_sample_rates={"agent": 1.0},
+    )
+
+    assert sampling.sample_rate_for("tenant", "agent") == 1.0
+    assert sampling.sample_rate_for("tenant", "other agent") == 0.2
+    assert sampling.sample_rate_for("other tenant", "other agent") == 0.5
+
+
+def test_unsampled_requests_skip_the_instrumentation():
+    backend = RecordingTracingBackend()
+    span = Trace(tracing_backend=backend).new(name="agent-response", sampled=False)
+    retriever = instrument_instance(Retriever(), span.new(name="agent"))
+
+    assert asyncio.run(retriever.retrieve("query")) == "QUERY"
+    assert backend.spans == []
+
+
+def test_sampled_requests_record_the_instrumented_calls():
+    backend = RecordingTracingBackend()
+    span = Trace(tracing_backend=backend).new(name="agent-response")
+    retriever = instrument_instance(Retriever(), span)
+
+    asyncio.run(retriever.retrieve("query"))
+
+    assert backend.spans == ["agent-response", "Retriever_retrieve"]
@@ -0,0 +1,112 @@
+import threading
+import time
+
+from zav.llm_tracing import Trace
+from zav.llm_tracing.batching_exporter import BatchingTracingBackend, ExporterMetrics
+from zav.llm_tracing.trace import TracingBackend
+
+
+class RecordingTracingBackend(TracingBackend):
+    def __init__(self):
+        self.calls = []
+        self.flushed = False
+        self.shut_down = False
+
+    def handle_new_trace(self, span):
+        self.calls.append(("new_trace", span.name))
+
+    def handle_new(self, span):
+        self.calls.append(("new", span.name))
+
+    def handle_update(self, span):
+        if span.name == "broken":
+            raise ValueError("failed")
+        self.calls.append(("update", span.name))
+
+    def handle_event(self, span):
+        self.calls.append(("event", span.name))
+
+    def flush(self):
+        self.flushed = True
+
+    def shutdown(self):
+        self.shut_down = True
+
+
+def batching(backend: TracingBackend, **kwargs) -> BatchingTracingBackend:
+    # A long delay and a large batch keep the thread from exporting on its own
+    return BatchingTracingBackend(
+        backend, **{"batch_size": 100, "schedule_delay": 60, **kwargs}
+    )
+
+
+def exporter_threads():
+    return [t for t in threading.enumerate() if t.name == "tracing-exporter"]
+
+
+def test_records_beyond_the_queue_size_are_dropped():
+    backend = RecordingTracingBackend()
+    exporter = batching(backend, max_queue_size=2)
+    root = Trace(tracing_backend=exporter).new(name="root")
+
+    root.new(name="first")
+    root.new(name="second")
+
+    assert exporter.metrics() == ExporterMetrics(
+        queue_depth=2, exported=0, dropped=1, failed=0
+    )
+    exporter.shutdown()
+    assert backend.calls == [("new_trace", "root"), ("new", "first")]
+
+
+def test_flush_exports_the_queued_records_in_order():
+    backend = RecordingTracingBackend()
+    exporter = batching(backend)
+    root = Trace(tracing_backend=exporter).new(name="root")
+
+    root.new(name="child").end()
+    root.new(name="broken").end()
+    exporter.flush()
+
+    assert backend.flushed
+    assert backend.calls == [
+        ("new_trace", "root"),
+        ("new", "child"),
+        ("update", "child"),
+        ("new", "broken"),
+    ]
+    assert exporter.metrics() == ExporterMetrics(
+        queue_depth=0, exported=4, dropped=0, failed=1
+    )
+    exporter.shutdown()
+
+
+def test_shutdown_joins_the_thread_and_exports_the_rest():
+    backend = RecordingTracingBackend()
+    exporter = batching(backend)
+    threads_before = exporter_threads()
+    root = Trace(tracing_backend=exporter).new(name="root")
+    (thread,) = [t for t in exporter_threads() if t not in threads_before]
+
+    exporter.shutdown()
+    root.new(name="late")
+
+    assert not thread.is_alive()
+    assert backend.shut_down
+    assert backend.calls == [("new_trace", "root")]
+    assert exporter.metrics().dropped == 1
+
+
+def test_full_batches_wake_the_thread_up():
+    backend = RecordingTracingBackend()
+    exporter = batching(backend, batch_size=2)
+    root = Trace(tracing_backend=exporter).new(name="root")
+
+    root.new(name="child")
+    for _ in range(100):
+        if exporter.metrics().exported == 2:
+            break
+        time.sleep(0.01)
+
+    assert backend.calls == [("new_trace", "root"), ("new", "child")]
+    exporter.shutdown()
@@ -0,0 +1,170 @@
+import asyncio
+from dataclasses import dataclass
+
+import pytest
+from pydantic import BaseModel
+
+from zav.llm_tracing import Trace
+from zav.llm_tracing.instrumented import (
+    MAX_DEPTH,
+    MAX_ITEMS,
+    MAX_STRING_LENGTH,
+    capped,
+    instrument_instance,
+)
+from zav.llm_tracing.trace import TracingBackend
+
+
+class RecordingTracingBackend(TracingBackend):
+    def __init__(self):
+        self.spans = []
+
+    def handle_new_trace(self, span):
+        pass
+
+    def handle_new(self, span):
+        self.spans.append(span)
+
+    def handle_update(self, span):
+        pass
+
+    def handle_event(self, span):
+        pass
+
+
+class Document(BaseModel):
+    title: str
+
+
+@dataclass
+class Hit:
+    score: float
+
+
+class Retriever:
+    started: asyncio.Event
+    release: asyncio.Event
+
+    async def retrieve(self, query: str, limit: int = 2) -> list:
+        self.started.set()
+        await self.release.wait()
+        return [Document(title=query)] * limit
+
+    async def stream(self, query: str):
+        for word in query.split():
+            yield word
+
+    async def fail(self):
+        raise ValueError("failed")
+
+    def count(self, query: str) -> int:
+        return len(query)
+
+
+def instrumented(sampled: bool = True):
+    backend = RecordingTracingBackend()
+    span = Trace(tracing_backend=backend).new(name="root", sampled=sampled)
+    retriever = Retriever()
+    return backend, retriever, instrument_instance(retriever, span)
+
+
+def test_coroutine_span_ends_after_the_await():
+    backend, retriever, instrumented_retriever = instrumented()
+
+    async def run():
+        retriever.started, retriever.release = asyncio.Event(), asyncio.Event()
+        task = asyncio.ensure_future(instrumented_retriever.retrieve("query"))
+        await retriever.started.wait()
+        (span,) = backend.spans
+        ended_before_result = span.end_time is not None
+        retriever.release.set()
+        return ended_before_result, await task
+
+    ended_before_result, result = asyncio.run(run())
+
+    (span,) = backend.spans
+    assert not ended_before_result
+    assert span.name == "Retriever_retrieve"
+    assert span.end_time is not None
+    assert span.attributes["input"] == {"query": "query", "limit": 2}
+    assert span.attributes["output"] == [{"title": "query"}, {"title": "query"}]
+    assert result == [Document(title="query")] * 2
+
+
+def test_coroutine_errors_end_the_span_with_the_error():
+    backend, _, instrumented_retriever = instrumented()
+
+    with pytest.raises(ValueError):
+        asyncio.run(instrumented_retriever.fail())
+
+    (span,) = backend.spans
+    assert span.attributes["level"] == "ERROR"
+    assert span.end_time is not None
+
+
+def test_async_generator_span_ends_when_exhausted_or_closed():
+    backend, _, instrumented_retriever = instrumented()
+
+    async def run():
+        words = [word async for word in instrumented_retriever.stream("a b c")]
+        stream = instrumented_retriever.stream("d e f")
+        first = await stream.__anext__()
+        ended_while_open = backend.spans[1].end_time is not None
+        await stream.aclose()
+        return words, first, ended_while_open
+
+    words, first, ended_while_open = asyncio.run(run())
+
+    exhausted, closed = backend.spans
+    assert words == ["a", "b", "c"]
+    assert exhausted.attributes["output"] == ["a", "b", "c"]
+    assert first == "d"
+    assert not ended_while_open
+    assert closed.end_time is not None
+    assert closed.attributes["output"] == ["d"]
+
+
+def test_sync_methods_are_recorded():
+    backend, _, instrumented_retriever = instrumented()
+
+    assert instrumented_retriever.count("query") == 5
+    (span,) = backend.spans
+    assert span.attributes == {"input": {"query": "query"}, "output": 5}
+
+
+def test_falsy_span_returns_the_original_attributes():
+    backend, retriever, instrumented_retriever = instrumented(sampled=False)
+
+    assert instrumented_retriever.count == retriever.count
+    assert instrumented_retriever.count("query") == 5
+    assert backend.spans == []
+
+
+def test_capped_truncates_strings_collections_and_depth():
+    nested: dict = {}
+    innermost = nested
+    for _ in range(MAX_DEPTH + 1):
+        innermost["child"] = {}
+        innermost = innermost["child"]
+
+    assert capped("a" * (MAX_STRING_LENGTH + 1)) == (
+        f"{'a' * MAX_STRING_LENGTH}... ({MAX_STRING_LENGTH + 1} characters)"
+    )
+    assert capped(list(range(MAX_ITEMS + 3)))[-1] == "... 3 more items"
+    assert len(capped(list(range(MAX_ITEMS + 3)))) == MAX_ITEMS + 1
+    assert capped({i: i for i in range(MAX_ITEMS + 1)})["..."] == "1 more items"
+    value = capped(nested)
+    for _ in range(MAX_DEPTH):
+        value = value["child"]
+    assert value == "<dict>"
+
+
+def test_capped_converts_models_dataclasses_and_unknown_objects():
+    class Opaque:
+        def __repr__(self):
+            return "<opaque>"
+
+    assert capped(Document(title="t")) == {"title": "t"}
+    assert capped(Hit(score=0.5)) == {"score": 0.5}
+    assert capped((1, "a")) == [1, "a"]
+    assert capped(Opaque()) == "<opaque>"
@@ -0,0 +1,117 @@
+from zav.llm_tracing import Span, Trace
+from zav.llm_tracing.trace import TracingBackend
+
+
+class RecordingTracingBackend(TracingBackend):
+    def __init__(self):
+        self.calls = []
+
+    def handle_new_trace(self, span):
+        self.calls.append(("new_trace", span.name))
+
+    def handle_new(self, span):
+        self.calls.append(("new", span.name))
+
+    def handle_update(self, span):
+        self.calls.append(("update", span.name))
+
+    def handle_event(self, span):
+        self.calls.append(("event", span.events[-1].name))
+
+
+def root(backend: TracingBackend) -> Span:
+    return Trace(tracing_backend=backend).new(
+        name="root", attributes={"input": "question"}, trace_state={"tenant": "t"}
+    )
+
+
+def test_children_belong_to_the_trace_of_their_parent():
+    backend = RecordingTracingBackend()
+    parent = root(backend)
+
+    child = parent.new(name="child", attributes={"input": "step"})
+    child.add_event(name="log").end(attributes={"output": "answer"})
+
+    assert child.context.trace_id == parent.context.trace_id
+    assert child.context.trace_state == {"tenant": "t"}
+    assert child.parent_id == parent.context.span_id
+    assert child.context.span_id != parent.context.span_id
+    assert child.attributes == {"input": "step", "output": "answer"}
+    assert child.end_time is not None
+    assert backend.calls == [
+        ("new_trace", "root"),
+        ("new", "child"),
+        ("event", "log"),
+        ("update", "child"),
+    ]
+
+
+def test_dict_keeps_the_fields_of_the_pydantic_spans():
+    span = root(RecordingTracingBackend()).add_event(name="log", attributes={"a": 1})
+
+    serialized = span.dict()
+
+    assert set(serialized) == {
+        "name",
+        "context",
+        "parent_id",
+        "start_time",
+        "end_time",
+        "attributes",
+        "events",
+    }
+    assert set(serialized["context"]) == {"trace_id", "span_id", "trace_state"}
+    assert serialized["events"][0]["name"] == "log"
+    assert serialized["events"][0]["attributes"] == {"a": 1}
+
+
+def test_only_the_last_events_are_kept():
+    backend = RecordingTracingBackend()
+    span = Span(
+        name="stream",
+        context=root(backend).context,
+        tracing_backend=backend,
+        max_events=3,
+    )
+
+    for i in range(5):
+        span.add_event(name=str(i))
+
+    assert [event.name for event in span.events] == ["2", "3", "4"]
+    assert span.dropped_events == 2
+    assert len([call for call in backend.calls if call[0] == "event"]) == 5
+
+
+def test_snapshot_is_not_changed_by_later_updates():
+    span = root(RecordingTracingBackend()).add_event(name="first")
+
+    snapshot = span.snapshot()
+    span.add_event(name="second").update(attributes={"output": "answer"})
+
+    assert snapshot.attributes == {"input": "question"}
+    assert [event.name for event in snapshot.events] == ["first"]
+    assert snapshot.context.span_id == span.context.span_id
+
+
+def test_unsampled_spans_are_falsy_and_record_nothing():
+    backend = RecordingTracingBackend()
+    span = Trace(tracing_backend=backend).new(name="root", sampled=False)
+
+    child = span.new(name="child").add_event(name="log").end()
+
+    assert not span
+    assert child is span
+    assert backend.calls == []
+
+
+def test_unsampled_span_records_errors_when_asked_to():
+    backend = RecordingTracingBackend()
+    span = Trace(tracing_backend=backend).new(
+        name="root", sampled=False, sample_on_error=True
+    )
+
+    recorded = span.end_with_error(ValueError("failed"))
+
+    assert recorded
+    assert recorded.attributes["level"] == "ERROR"
+    assert backend.calls == [("new_trace", "root"), ("update", "root")]
@@ -0,0 +1,181 @@
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+import pytest
+
+from zav.message_bus import (
+    Bootstrap,
+    BootstrapDependency,
+    Command,
+    CommandHandlerRegistry,
+    EventHandlerRegistry,
+)
+
+
+@dataclass
+class Ping(Command):
+    fail: bool = False
+
+
+@dataclass
+class Pong(Command):
+    pass
+
+
+def registries():
+    class Commands(CommandHandlerRegistry):
+        registry = {}
+
+    class Events(EventHandlerRegistry):
+        registry = {}
+
+    return Commands, Events
+
+
+class Session:
+    def __init__(self, log):
+        self.log = log
+        self.commits = 0
+
+    async def commit(self):
+        self.commits += 1
+
+
+def session_factory(log):
+    @asynccontextmanager
+    async def session():
+        log.append("enter")
+        value = Session(log)
+        try:
+            yield value
+        finally:
+            log.append("exit")
+
+    return session
+
+
+def test_message_bus_is_reused_until_handlers_change():
+    commands, events = registries()
+
+    @commands.register(Ping)
+    async def ping(cmd, queue):
+        return "ping"
+
+    bootstrap = Bootstrap([], commands, events)
+    message_bus = bootstrap.message_bus
+    assert bootstrap.message_bus is message_bus
+
+    bootstrap.update_command_handler_registry({Ping: ping})
+    assert bootstrap.message_bus is message_bus
+
+    async def other_ping(cmd, queue):
+        return "other"
+
+    bootstrap.update_command_handler_registry({Ping: other_ping})
+    assert bootstrap.message_bus is not message_bus
+
+
+def test_handlers_registered_after_first_access_are_used():
+    commands, events = registries()
+    bootstrap = Bootstrap([], commands, events)
+    bootstrap.message_bus
+
+    @commands.register(Pong)
+    async def pong(cmd, queue):
+        return "pong"
+
+    assert asyncio.run(bootstrap.message_bus.handle(Pong())) == ["pong"]
+
+
+def test_updates_take_precedence_over_the_registries():
+    commands, events = registries()
+
+    @commands.register(Ping)
+    async def ping(cmd, queue):
+        return "registry"
+
+    async def override(cmd, queue):
+        return "update"
+
+    bootstrap = Bootstrap([], commands, events)
+    bootstrap.update_command_handler_registry({Ping: override})
+
+    assert asyncio.run(bootstrap.message_bus.handle(Ping())) == ["update"]
+
+
+def test_context_dependencies_are_entered_per_call_by_default():
+    commands, events = registries()
+    log = []
+
+    @commands.register(Ping)
+    async def ping(cmd, queue, session, answer):
+        return answer
+
+    bootstrap = Bootstrap(
+        [
+            BootstrapDependency("session", context_value=session_factory(log)),
+            BootstrapDependency("answer", value=42),
+        ],
+        commands,
+        events,
+    )
+
+    async def run():
+        return [await bootstrap.message_bus.handle(Ping()) for _ in range(2)]
+
+    assert asyncio.run(run()) == [[42], [42]]
+    assert log == ["enter", "exit", "enter", "exit"]
+
+
+def test_pooled_dependencies_are_reused_and_released():
+    commands, events = registries()
+    log = []
+    sessions = set()
+
+    @commands.register(Ping)
+    async def ping(cmd, queue, session):
+        sessions.add(session)
+        await asyncio.sleep(0.01)
+        if cmd.fail:
+            raise ValueError("failed")
+        return session.commits
+
+    async def commit(session):
+        await session.commit()
+
+    bootstrap = Bootstrap(
+        [
+            BootstrapDependency(
+                "session",
+                context_value=session_factory(log),
+                pool_size=2,
+                release_fn=commit,
+            )
+        ],
+        commands,
+        events,
+    )
+
+    async def run():
+        message_bus = bootstrap.message_bus
+        await asyncio.gather(*(message_bus.handle(Ping()) for _ in range(6)))
+        assert log == ["enter", "enter"]
+        assert sum(session.commits for session in sessions) == 6
+        with pytest.raises(ValueError):
+            await message_bus.handle(Ping(fail=True))
+        assert log == ["enter", "enter", "exit"]
+        await bootstrap.shutdown()
+
+    asyncio.run(run())
+    assert log.count("exit") == 2
+    assert len(sessions) == 2
+
+
+def test_pooled_dependency_requires_a_context_value():
+    commands, events = registries()
+
+    with pytest.raises(ValueError):
+        Bootstrap(
+            [BootstrapDependency("session", value=1, pool_size=2)], commands, events
+        )
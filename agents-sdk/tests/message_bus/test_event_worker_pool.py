@@ -0,0 +1,74 @@
+import asyncio
+from dataclasses import dataclass
+
+from zav.message_bus import Command, Event, MessageBus
+from zav.message_bus.event_worker_pool import EventWorkerPool
+
+
+@dataclass
+class Start(Command):
+    pass
+
+
+@dataclass
+class Started(Event):
+    pass
+
+
+def test_command_returns_before_its_events_are_handled():
+    log = []
+
+    async def start(command, queue):
+        queue.append(Started())
+        return "started"
+
+    async def started(event, queue):
+        await asyncio.sleep(0.01)
+        log.append("event handled")
+
+    async def run():
+        pool = EventWorkerPool(num_workers=2)
+        message_bus = MessageBus(
+            command_handlers={Start: start},
+            event_handlers={Started: [started]},
+            exception_handlers={},
+            event_worker_pool=pool,
+        )
+        results = await message_bus.handle(Start())
+        handled_before_return = list(log)
+        await pool.shutdown(timeout=1)
+        return results, handled_before_return
+
+    results, handled_before_return = asyncio.run(run())
+
+    assert results == ["started"]
+    assert handled_before_return == []
+    assert log == ["event handled"]
+
+
+def test_failing_background_message_does_not_stop_the_workers():
+    log = []
+
+    async def start(command, queue):
+        queue.append(Started())
+
+    async def started(event, queue):
+        log.append("handled")
+        if len(log) == 1:
+            raise ValueError("failed")
+
+    async def run():
+        pool = EventWorkerPool(num_workers=1)
+        message_bus = MessageBus(
+            command_handlers={Start: start},
+            event_handlers={Started: [started]},
+            exception_handlers={},
+            event_worker_pool=pool,
+        )
+        await message_bus.handle(Start())
+        await message_bus.handle(Start())
+        await pool.shutdown(timeout=1)
+        return pool.queue_depth
+
+    assert asyncio.run(run()) == 0
+    assert log == ["handled", "handled"]
@@ -0,0 +1,78 @@
+import asyncio
+from dataclasses import dataclass
+
+import pytest
+
+from zav.message_bus import Command, Event, MessageBus
+
+
+@dataclass
+class Start(Command):
+    pass
+
+
+@dataclass
+class Started(Event):
+    pass
+
+
+@dataclass
+class Followup(Event):
+    name: str
+
+
+def message_bus(event_handlers, concurrent: bool, log):
+    async def start(command, queue):
+        queue.append(Started())
+
+    async def followup(event, queue):
+        log.append(event.name)
+
+    return MessageBus(
+        command_handlers={Start: start},
+        event_handlers={Started: event_handlers, Followup: [followup]},
+        exception_handlers={},
+        concurrent_event_handlers=concurrent,
+    )
+
+
+def handler(name: str, delay: float, log):
+    async def handle(event, queue):
+        await asyncio.sleep(delay)
+        log.append(f"{name} done")
+        queue.append(Followup(name=f"{name} followup"))
+
+    return handle
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_enqueued_messages_follow_the_order_of_the_handlers(concurrent):
+    log = []
+    handlers = [handler("slow", 0.05, log), handler("fast", 0, log)]
+
+    asyncio.run(message_bus(handlers, concurrent, log).handle(Start()))
+
+    expected_runs = ["fast done", "slow done"] if concurrent else ["slow done"]
+    assert log[: len(expected_runs)] == expected_runs
+    assert log[-2:] == ["slow followup", "fast followup"]
+
+
+def test_failing_handler_cancels_and_awaits_its_siblings():
+    log = []
+
+    async def slow(event, queue):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.01)
+            log.append("slow cancelled")
+            raise
+
+    async def failing(event, queue):
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        asyncio.run(message_bus([slow, failing], True, log).handle(Start()))
+
+    assert log == ["slow cancelled"]
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+from zav.message_bus import Command, Event, MessageBus
+from zav.message_bus.errors import RetryableHandlerError
+from zav.message_bus.event_worker_pool import EventWorkerPool
+from zav.message_bus.outbox import OutboxRecord, SQLiteOutbox
+
+
+@dataclass
+class Start(Command):
+    pass
+
+
+@dataclass
+class Finish(Command):
+    pass
+
+
+@dataclass
+class Started(Event):
+    position: int
+
+
+class Flaky(Exception):
+    pass
+
+
+def outbox(tmp_path) -> SQLiteOutbox:
+    return SQLiteOutbox(str(tmp_path / "outbox.db"))
+
+
+def record(key: str) -> OutboxRecord:
+    return OutboxRecord.from_message(Started(position=0), idempotency_key=key)
+
+
+def test_leased_records_are_not_leased_again_until_released(tmp_path):
+    async def run():
+        store = outbox(tmp_path)
+        await store.append([record("a"), record("b")])
+        first = await store.lease(limit=1, lease_seconds=60)
+        second = await store.lease(limit=10, lease_seconds=60)
+        third = await store.lease(limit=10, lease_seconds=60)
+        await store.ack(first[0])
+        await store.retry(second[0], delay=0)
+        fourth = await store.lease(limit=10, lease_seconds=60)
+        await store.close()
+        return first, second, third, fourth
+
+    first, second, third, fourth = asyncio.run(run())
+
+    assert [r.idempotency_key for r in first] == ["a"]
+    assert [r.idempotency_key for r in second] == ["b"]
+    assert third == []
+    assert [(r.idempotency_key, r.attempts) for r in fourth] == [("b", 1)]
+    assert fourth[0].message == Started(position=0)
+
+
+def test_appends_are_deduplicated_by_idempotency_key(tmp_path):
+    async def run():
+        store = outbox(tmp_path)
+        await store.append([record("a")])
+        await store.append([record("a"), record("b")])
+        leased = await store.lease(limit=10, lease_seconds=60)
+        await store.close()
+        return leased
+
+    assert [r.idempotency_key for r in asyncio.run(run())] == ["a", "b"]
+
+
+def test_release_under_an_expired_lease_is_ignored(tmp_path):
+    async def run():
+        store = outbox(tmp_path)
+        await store.append([record("a")])
+        (stale,) = await store.lease(limit=1, lease_seconds=0.01)
+        time.sleep(0.02)
+        (current,) = await store.lease(limit=1, lease_seconds=60)
+        await store.ack(stale)
+        after_stale_ack = await store.lease(limit=1, lease_seconds=60)
+        await store.retry(current, delay=0)
+        after_retry = await store.lease(limit=1, lease_seconds=60)
+        await store.close()
+        return current, after_stale_ack, after_retry
+
+    current, after_stale_ack, after_retry = asyncio.run(run())
+
+    assert current.lease_token is not None
+    assert after_stale_ack == []
+    assert [r.attempts for r in after_retry] == [1]
+
+
+def test_retried_command_does_not_store_its_events_twice(tmp_path):
+    attempts = []
+
+    async def start(command, queue):
+        queue.append(Started(position=0))
+        queue.append(Started(position=1))
+        queue.append(Finish())
+
+    async def finish(command, queue):
+        attempts.append(command)
+        if len(attempts) == 1:
+            raise Flaky()
+
+    async def run():
+        store = outbox(tmp_path)
+        message_bus = MessageBus(
+            command_handlers={Start: start, Finish: finish},
+            event_handlers={Started: []},
+            exception_handlers={
+                Flaky: lambda e: RetryableHandlerError(e, max_retries=1, base_delay=0)
+            },
+            outbox=store,
+        )
+        await message_bus.handle(Start())
+        leased = await store.lease(limit=10, lease_seconds=60)
+        await store.close()
+        return leased
+
+    leased = asyncio.run(run())
+
+    assert len(attempts) == 2
+    assert [r.message.position for r in leased] == [0, 1]
+
+
+def test_events_of_commands_handled_by_the_pool_are_stored(tmp_path):
+    handled = []
+
+    async def start(command, queue):
+        queue.append(Finish())
+
+    async def finish(command, queue):
+        queue.append(Started(position=0))
+
+    async def started(event, queue):
+        handled.append(event)
+
+    async def run():
+        store = outbox(tmp_path)
+        pool = EventWorkerPool(num_workers=1)
+        message_bus = MessageBus(
+            command_handlers={Start: start, Finish: finish},
+            event_handlers={Started: [started]},
+            exception_handlers={},
+            event_worker_pool=pool,
+            outbox=store,
+        )
+        await message_bus.handle(Start())
+        await pool.shutdown(timeout=1)
+        leased = await store.lease(limit=10, lease_seconds=60)
+        await store.close()
+        return leased
+
+    leased = asyncio.run(run())
+
+    assert [r.message for r in leased] == [Started(position=0)]
+    assert handled == []
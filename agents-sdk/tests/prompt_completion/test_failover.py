@@ -0,0 +1,165 @@
+import asyncio
+from typing import List, Optional
+
+from zav.llm_domain import (
+    FailoverConfiguration,
+    LLMClientConfiguration,
+    LLMModelConfiguration,
+    LLMModelType,
+    LLMProviderName,
+    LLMVendorConfiguration,
+    OpenAIConfiguration,
+)
+
+from zav.prompt_completion.client import (
+    BotConversation,
+    ChatClientRequest,
+    ChatCompletionClient,
+    ChatMessage,
+    ChatMessageSender,
+    ChatResponse,
+)
+from zav.prompt_completion.client_factories import ChatClientFactory
+from zav.prompt_completion.failover import FailoverChatCompletionClient
+
+REQUEST = ChatClientRequest(
+    conversation=BotConversation(bot_setup_description=None, messages=[]),
+    max_tokens=10,
+)
+
+
+def answer(content: str) -> ChatResponse:
+    return ChatResponse(
+        error=None,
+        chat_message=ChatMessage(sender=ChatMessageSender.BOT, content=content),
+    )
+
+
+class FakeChatClient(ChatCompletionClient):
+    def __init__(self, content: str, delay: float = 0, error: bool = False):
+        self.content = content
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+        self.closed = False
+
+    async def complete(self, request, stream=False, span=None):  # type: ignore
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            return ChatResponse(error=Exception(self.content), chat_message=None)
+        if not stream:
+            return answer(self.content)
+        return self.__stream()
+
+    async def __stream(self):
+        try:
+            for chunk in self.content.split():
+                yield answer(chunk)
+        finally:
+            self.closed = True
+
+    @classmethod
+    def from_configuration(cls, vendor_configuration, model_configuration, span=None):
+        return cls(model_configuration.name)
+
+
+def complete(clients: List[FakeChatClient], hedge_delay: Optional[float] = None):
+    client = FailoverChatCompletionClient(clients=clients, hedge_delay=hedge_delay)
+    return asyncio.run(client.complete(REQUEST))
+
+
+def test_first_backend_answers_alone():
+    first, second = FakeChatClient("first"), FakeChatClient("second")
+
+    response = complete([first, second])
+
+    assert response.chat_message.content == "first"
+    assert second.calls == 0
+
+
+def test_fails_over_to_the_next_backend_on_error():
+    first, second = FakeChatClient("down", error=True), FakeChatClient("second")
+
+    response = complete([first, second])
+
+    assert response.chat_message.content == "second"
+
+
+def test_returns_the_last_error_when_every_backend_fails():
+    clients = [FakeChatClient("down", error=True), FakeChatClient("busy", error=True)]
+
+    response = complete(clients)
+
+    assert str(response.error) == "busy"
+
+
+def test_hedged_backend_wins_and_the_slow_one_is_cancelled():
+    slow, fast = FakeChatClient("slow", delay=1), FakeChatClient("fast")
+
+    response = complete([slow, fast], hedge_delay=0.01)
+
+    assert response.chat_message.content == "fast"
+    assert slow.cancelled
+
+
+def test_streams_of_losing_backends_are_closed():
+    async def race():
+        first = FakeChatClient("first answer", delay=0.05)
+        second = FakeChatClient("second answer", delay=0.01)
+        client = FailoverChatCompletionClient(
+            clients=[first, second], hedge_delay=0.001
+        )
+        chunks = [
+            r.chat_message.content
+            async for r in await client.complete(REQUEST, stream=True)
+        ]
+        # Let the first backend finish and its stream be closed
+        await asyncio.sleep(0.1)
+        return chunks, first, second
+
+    chunks, first, second = asyncio.run(race())
+
+    assert chunks == ["second", "answer"]
+    assert first.cancelled
+    assert second.closed
+
+
+def test_factory_builds_the_backends_of_the_configuration():
+    registry = dict(ChatClientFactory.registry)
+    ChatClientFactory.registry[(LLMProviderName.OPENAI, LLMModelType.CHAT)] = (
+        FakeChatClient
+    )
+
+    def config(name: str, **kwargs) -> LLMClientConfiguration:
+        return LLMClientConfiguration(
+            vendor=LLMProviderName.OPENAI,
+            vendor_configuration=LLMVendorConfiguration(
+                openai=OpenAIConfiguration(openai_api_key="key", openai_org="org")
+            ),
+            model_configuration=LLMModelConfiguration(
+                name=name, type=LLMModelType.CHAT, temperature=0
+            ),
+            **kwargs,
+        )
+
+    try:
+        client = ChatClientFactory.create(
+            config(
+                "primary",
+                failover=FailoverConfiguration(backends=[config("backup")]),
+            )
+        )
+        plain = ChatClientFactory.create(config("primary"))
+    finally:
+        ChatClientFactory.registry.clear()
+        ChatClientFactory.registry.update(registry)
+
+    assert isinstance(client, FailoverChatCompletionClient)
+    assert asyncio.run(client.complete(REQUEST)).chat_message.content == "primary"
+    assert isinstance(plain, FakeChatClient)
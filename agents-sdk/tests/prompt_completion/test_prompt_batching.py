@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+from openai import BadRequestError
+from zav.llm_domain import PromptBatchingConfiguration
+
+from zav.prompt_completion.adapters.openai_clients import (
+    complete_batch,
+    complete_in_batches,
+    pack_prompts,
+    prompt_response_from,
+)
+from zav.prompt_completion.client import PromptResponse, PromptTooLargeError
+
+TOO_LONG = (
+    "This model's maximum context length is 10 tokens, however you requested "
+    "20 tokens (15 in your prompt; 5 for the completion). "
+    "context_length_exceeded"
+)
+
+
+def bad_request(message: str) -> BadRequestError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/completions")
+    return BadRequestError(
+        message, response=httpx.Response(400, request=request), body=None
+    )
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, prompt, **params):
+        self.calls.append(prompt)
+        prompts = prompt if isinstance(prompt, list) else [prompt]
+        if any(p.startswith("long") for p in prompts):
+            raise bad_request(TOO_LONG)
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(index=index, text=f" {p.upper()} ")
+                for index, p in enumerate(prompts)
+            ],
+            usage=None,
+        )
+
+
+def complete_prompt(completions: FakeCompletions):
+    async def complete(prompt: str, max_tokens: int) -> PromptResponse:
+        try:
+            answer = await completions.create(prompt=prompt, max_tokens=max_tokens)
+        except BadRequestError as e:
+            return PromptResponse(
+                error=PromptTooLargeError(e.message), prompt_answer=None
+            )
+        return prompt_response_from(answer.choices[0])
+
+    return complete
+
+
+def run_batch(completions: FakeCompletions, prompts):
+    return asyncio.run(
+        complete_batch(
+            completions,
+            dict(model="model", temperature=0),
+            prompts,
+            5,
+            prompt_response_from=prompt_response_from,
+            complete_prompt=complete_prompt(completions),
+        )
+    )
+
+
+def test_pack_prompts_respects_batch_size_and_tokens():
+    batching = PromptBatchingConfiguration(max_batch_size=2, max_batch_tokens=30)
+
+    # 20 characters are estimated at 5 tokens, plus 10 for the completion
+    assert pack_prompts(["a" * 20] * 5, 10, batching) == [[0, 1], [2, 3], [4]]
+    assert pack_prompts(["a" * 80, "a", "a"], 10, batching) == [[0], [1, 2]]
+
+
+def test_batch_is_completed_in_one_request():
+    completions = FakeCompletions()
+
+    responses = run_batch(completions, ["a", "b"])
+
+    assert completions.calls == [["a", "b"]]
+    assert [r.prompt_answer["text"] for r in responses] == ["A", "B"]
+
+
+def test_rejected_batch_falls_back_to_one_request_per_prompt():
+    completions = FakeCompletions()
+
+    responses = run_batch(completions, ["a", "long", "b"])
+
+    assert completions.calls[0] == ["a", "long", "b"]
+    assert sorted(completions.calls[1:]) == ["a", "b", "long"]
+    assert responses[0].prompt_answer["text"] == "A"
+    assert isinstance(responses[1].error, PromptTooLargeError)
+    assert responses[2].prompt_answer["text"] == "B"
+
+
+def test_rejected_single_prompt_batch_is_not_sent_again():
+    completions = FakeCompletions()
+
+    responses = run_batch(completions, ["long"])
+
+    assert completions.calls == [["long"]]
+    assert isinstance(responses[0].error, PromptTooLargeError)
+
+
+def test_complete_in_batches_keeps_prompt_order():
+    async def complete(prompts, max_tokens):
+        await asyncio.sleep(0.01 * len(prompts))
+        return prompts
+
+    responses = asyncio.run(
+        complete_in_batches(
+            ["a", "b", "c"],
+            1,
+            PromptBatchingConfiguration(max_batch_size=2),
+            complete,
+        )
+    )
+
+    assert responses == ["a", "b", "c"]
@@ -0,0 +1,153 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from zav.llm_domain import RateLimitConfiguration
+
+from zav.prompt_completion.rate_limiter import (
+    AdaptiveRateLimiter,
+    RateLimitHeaders,
+    create_with_rate_limit,
+)
+
+
+class RateLimited(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after-ms": "10"})
+
+
+def limiter(**config) -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(
+        RateLimitConfiguration(**{"default_retry_after": 0.01, **config})
+    )
+
+
+def test_headers_of_each_vendor_are_parsed():
+    openai = RateLimitHeaders.parse(
+        {
+            "x-ratelimit-remaining-requests": "5",
+            "x-ratelimit-reset-requests": "1m30s",
+            "x-ratelimit-remaining-tokens": "100",
+            "x-ratelimit-reset-tokens": "120ms",
+            "retry-after": "2",
+        }
+    )
+    anthropic = RateLimitHeaders.parse({"anthropic-ratelimit-requests-remaining": "7"})
+
+    assert openai == RateLimitHeaders(
+        remaining_requests=5,
+        requests_reset=90.0,
+        remaining_tokens=100,
+        tokens_reset=0.12,
+        retry_after=2.0,
+    )
+    assert anthropic.remaining_requests == 7
+
+
+def test_limit_increases_additively_and_decreases_multiplicatively():
+    rate_limiter = limiter(initial_concurrency=4, max_retries=1)
+    responses = iter([RateLimited(), SimpleNamespace(headers={})])
+
+    async def create():
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def success():
+        return SimpleNamespace(headers={})
+
+    async def run():
+        await rate_limiter.call(success)
+        increased = rate_limiter.metrics().concurrency_limit
+        await rate_limiter.call(create)
+        return increased
+
+    increased = asyncio.run(run())
+    metrics = rate_limiter.metrics()
+
+    assert increased == pytest.approx(4.25)
+    assert metrics.rate_limited == 1
+    # Halved by the rate limited attempt, then increased by its retry
+    assert metrics.concurrency_limit == pytest.approx(4.25 / 2 + 1 / (4.25 / 2))
+    assert metrics.in_flight == 0
+
+
+def test_calls_wait_for_a_slot():
+    rate_limiter = limiter(initial_concurrency=1, min_concurrency=1, increase_step=0.1)
+    running = []
+
+    async def create():
+        running.append(rate_limiter.metrics().in_flight)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(headers={})
+
+    async def run():
+        await asyncio.gather(*(rate_limiter.call(create) for _ in range(3)))
+
+    asyncio.run(run())
+
+    assert running == [1, 1, 1]
+    assert rate_limiter.metrics().acquired == 3
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.chunks:
+            raise StopAsyncIteration
+        return self.chunks.pop(0)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeResource:
+    def __init__(self, stream: FakeStream):
+        self.with_raw_response = self
+        self.stream = stream
+
+    async def create(self, **params):
+        return SimpleNamespace(headers={}, parse=lambda: self.stream)
+
+
+def test_stream_holds_its_slot_until_exhausted():
+    rate_limiter = limiter()
+
+    async def run():
+        stream = await create_with_rate_limit(
+            FakeResource(FakeStream(["a", "b"])), {"stream": True}, rate_limiter
+        )
+        in_flight_before = rate_limiter.metrics().in_flight
+        chunks = [chunk async for chunk in stream]
+        return in_flight_before, chunks
+
+    in_flight_before, chunks = asyncio.run(run())
+
+    assert in_flight_before == 1
+    assert chunks == ["a", "b"]
+    assert rate_limiter.metrics().in_flight == 0
+
+
+def test_closed_stream_releases_its_slot_once():
+    rate_limiter = limiter()
+    fake_stream = FakeStream(["a", "b"])
+
+    async def run():
+        stream = await create_with_rate_limit(
+            FakeResource(fake_stream), {"stream": True}, rate_limiter
+        )
+        await stream.__anext__()
+        await stream.aclose()
+        await stream.aclose()
+
+    asyncio.run(run())
+
+    assert fake_stream.closed
+    assert rate_limiter.metrics().in_flight == 0
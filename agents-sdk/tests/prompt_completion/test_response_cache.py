@@ -0,0 +1,131 @@
+import asyncio
+
+from zav.llm_domain import LLMModelConfiguration, LLMModelType, LLMProviderName
+
+from zav.prompt_completion.client import (
+    BotConversation,
+    ChatClientRequest,
+    ChatCompletionClient,
+    ChatMessage,
+    ChatMessageSender,
+    ChatResponse,
+)
+from zav.prompt_completion.response_cache import (
+    CachedChatCompletionClient,
+    ResponseCache,
+)
+
+
+def request(question: str = "question") -> ChatClientRequest:
+    return ChatClientRequest(
+        conversation=BotConversation(
+            bot_setup_description=None,
+            messages=[ChatMessage(sender=ChatMessageSender.USER, content=question)],
+        ),
+        max_tokens=10,
+    )
+
+
+def answer(content: str) -> ChatResponse:
+    return ChatResponse(
+        error=None,
+        chat_message=ChatMessage(sender=ChatMessageSender.BOT, content=content),
+    )
+
+
+class FakeChatClient(ChatCompletionClient):
+    def __init__(self, chunks=("The", "The answer", "The answer is"), error=False):
+        self.chunks = chunks
+        self.error = error
+        self.calls = 0
+
+    async def complete(self, request, stream=False, span=None):  # type: ignore
+        self.calls += 1
+        if self.error:
+            return ChatResponse(error=Exception("failed"), chat_message=None)
+        if not stream:
+            return answer(self.chunks[-1])
+        return self.__stream()
+
+    async def __stream(self):
+        for chunk in self.chunks:
+            yield answer(chunk)
+
+    @classmethod
+    def from_configuration(cls, vendor_configuration, model_configuration, span=None):
+        return cls()
+
+
+def cached(client: FakeChatClient, temperature: float = 0, cache=None, **kwargs):
+    return CachedChatCompletionClient(
+        client=client,
+        cache=cache or ResponseCache(),
+        vendor=LLMProviderName.OPENAI,
+        model_configuration=LLMModelConfiguration(
+            name="model", type=LLMModelType.CHAT, temperature=temperature
+        ),
+        **kwargs,
+    )
+
+
+async def contents(chat_responses):
+    return [r.chat_message.content async for r in chat_responses]
+
+
+def test_identical_requests_are_answered_from_the_cache():
+    client = FakeChatClient()
+    cached_client = cached(client)
+
+    async def run():
+        first = await cached_client.complete(request())
+        second = await cached_client.complete(request())
+        other = await cached_client.complete(request("other question"))
+        return first, second, other
+
+    first, second, other = asyncio.run(run())
+
+    assert first.chat_message == second.chat_message == other.chat_message
+    assert client.calls == 2
+
+
+def test_failed_responses_are_not_cached():
+    client = FakeChatClient(error=True)
+    cached_client = cached(client)
+
+    async def run():
+        await cached_client.complete(request())
+        return await cached_client.complete(request())
+
+    assert asyncio.run(run()).error is not None
+    assert client.calls == 2
+
+
+def test_streams_are_replayed_with_their_first_and_final_chunks():
+    client = FakeChatClient()
+    cached_client = cached(client, max_stream_chunks=1)
+
+    async def run():
+        recorded = await contents(await cached_client.complete(request(), True))
+        replayed = await contents(await cached_client.complete(request(), True))
+        completed = await cached_client.complete(request())
+        return recorded, replayed, completed
+
+    recorded, replayed, completed = asyncio.run(run())
+
+    assert recorded == ["The", "The answer", "The answer is"]
+    assert replayed == ["The", "The answer is"]
+    assert completed.chat_message.content == "The answer is"
+    assert client.calls == 1
+
+
+def test_model_parameters_are_part_of_the_key():
+    client = FakeChatClient()
+    cache = ResponseCache()
+
+    async def run():
+        for temperature in (0, 0, 1):
+            await cached(client, temperature, cache).complete(request())
+
+    asyncio.run(run())
+
+    assert client.calls == 2
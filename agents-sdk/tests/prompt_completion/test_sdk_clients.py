@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from zav.encryption import credential_fingerprint
+
+from zav.prompt_completion.client import PromptCompletionClient
+from zav.prompt_completion.sdk_clients import SDKClientRegistry
+
+
+class FakeSDKClient:
+    def __init__(self, name: str):
+        self.name = name
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_clients_are_shared_per_credentials():
+    registry = SDKClientRegistry()
+
+    async def run():
+        first = registry.get_or_create("openai", lambda: FakeSDKClient("a"), ("k",))
+        same = registry.get_or_create("openai", lambda: FakeSDKClient("b"), ("k",))
+        other = registry.get_or_create("openai", lambda: FakeSDKClient("c"), ("k2",))
+        await registry.close()
+        return first, same, other
+
+    first, same, other = asyncio.run(run())
+    assert first is same
+    assert other is not first
+    assert first.closed and other.closed
+
+
+def test_least_recently_used_client_is_dropped_but_closed_at_shutdown():
+    registry = SDKClientRegistry(max_clients=2)
+
+    async def run():
+        a = registry.get_or_create("openai", lambda: FakeSDKClient("a"), ("a",))
+        b = registry.get_or_create("openai", lambda: FakeSDKClient("b"), ("b",))
+        registry.get_or_create("openai", lambda: FakeSDKClient("x"), ("a",))
+        c = registry.get_or_create("openai", lambda: FakeSDKClient("c"), ("c",))
+        await asyncio.sleep(0)
+        assert len(registry) == 2
+        # Completion clients built on the evicted client may still use it
+        assert not b.closed
+        again = registry.get_or_create("openai", lambda: FakeSDKClient("d"), ("b",))
+        assert again is not b
+        await registry.close()
+        assert a.closed and b.closed and c.closed and again.closed
+
+    asyncio.run(run())
+
+
+def test_clients_of_closed_event_loops_are_dropped():
+    registry = SDKClientRegistry()
+
+    async def create(name: str):
+        return registry.get_or_create("openai", lambda: FakeSDKClient(name), ("k",))
+
+    first = asyncio.run(create("first"))
+    second = asyncio.run(create("second"))
+
+    assert first is not second
+    assert len(registry) == 1
+
+
+def test_credential_fingerprint_does_not_contain_the_secret():
+    fingerprint = credential_fingerprint("sk-secret", None)
+
+    assert "sk-secret" not in fingerprint
+    assert fingerprint == credential_fingerprint("sk-secret", "")
+    assert fingerprint != credential_fingerprint("sk-other", None)
+
+
+class ThirdPartyClient(PromptCompletionClient):
+    async def complete(self, prompts, max_tokens, span=None):
+        return []
+
+    @classmethod
+    def from_configuration(cls, vendor_configuration, model_configuration, span=None):
+        return cls()
+
+
+def test_with_span_must_be_implemented_by_the_client():
+    with pytest.raises(NotImplementedError):
+        ThirdPartyClient().with_span(None)
@@ -0,0 +1,122 @@
+import asyncio
+
+from zav.llm_domain import LLMProviderName, TokenBudgetConfiguration
+
+from zav.prompt_completion import tokenizer as tokenizer_module
+from zav.prompt_completion.client import (
+    BotConversation,
+    ChatClientRequest,
+    ChatMessage,
+    ChatMessageSender,
+    PromptTooLargeError,
+)
+from zav.prompt_completion.tokenizer import Tokenizer, fit_request
+
+# 40 characters are approximated at 10 tokens, plus 4 of message overhead
+TEXT = "a" * 40
+
+
+def message(sender: ChatMessageSender = ChatMessageSender.USER) -> ChatMessage:
+    return ChatMessage(sender=sender, content=TEXT)
+
+
+def request(*messages: ChatMessage) -> ChatClientRequest:
+    return ChatClientRequest(
+        conversation=BotConversation(
+            bot_setup_description=None, messages=list(messages)
+        ),
+        max_tokens=10,
+    )
+
+
+def fit(chat_request: ChatClientRequest, context_window: int, trim: bool = True):
+    return fit_request(
+        chat_request,
+        Tokenizer(),
+        TokenBudgetConfiguration(context_window=context_window, trim_conversation=trim),
+    )
+
+
+def test_request_that_fits_is_sent_as_is():
+    chat_request = request(message(), message())
+
+    assert Tokenizer().count_request(chat_request) == 3 + 2 * 14
+    assert fit(chat_request, context_window=41) == (chat_request, 0, None)
+
+
+def test_oldest_messages_are_dropped_until_the_request_fits():
+    messages = [message(), message(), message(), message()]
+
+    trimmed, dropped, error = fit(request(*messages), context_window=50)
+
+    assert error is None
+    assert dropped == 2
+    assert trimmed["conversation"].messages == messages[2:]
+
+
+def test_responses_are_dropped_with_their_call():
+    messages = [message(), message(ChatMessageSender.TOOL), message(), message()]
+
+    trimmed, dropped, error = fit(request(*messages), context_window=60)
+
+    assert dropped == 2
+    assert trimmed["conversation"].messages == messages[2:]
+
+
+def test_last_message_is_always_kept():
+    chat_request = request(message(), message())
+
+    _, dropped, error = fit(chat_request, context_window=20)
+
+    assert dropped == 0
+    assert isinstance(error, PromptTooLargeError)
+    assert error.extra_tokens == 3 + 14 - 10
+
+
+def test_request_too_large_without_trimming_fails():
+    chat_request = request(message(), message())
+
+    returned, dropped, error = fit(chat_request, context_window=40, trim=False)
+
+    assert returned is chat_request
+    assert dropped == 0
+    assert error.extra_tokens == 31 - 30
+
+
+class FakeEncoding:
+    name = "fake"
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text, disallowed_special=()):
+        self.encoded.append(text)
+        return text.split()
+
+
+def test_token_counts_are_cached_by_hash():
+    encoding = FakeEncoding()
+    tokenizer = Tokenizer(encoding)
+
+    counts = [tokenizer.count_text("one two three") for _ in range(3)]
+
+    assert counts == [3, 3, 3]
+    assert encoding.encoded == ["one two three"]
+    assert "one two three" not in [
+        part for key in tokenizer_module._token_counts for part in key
+    ]
+
+
+def test_encoding_is_loaded_by_load(monkeypatch):
+    encoding = FakeEncoding()
+    monkeypatch.setattr(
+        tokenizer_module,
+        "_load_encoding",
+        lambda model_name: asyncio.sleep(0, encoding),
+    )
+    tokenizer = Tokenizer.for_model(LLMProviderName.OPENAI, "gpt-4o")
+
+    assert not tokenizer.is_exact
+    asyncio.run(tokenizer.load())
+    assert tokenizer.is_exact
+    assert tokenizer.count_text("one two") == 2
@@ -4,14 +4,17 @@ from zav.agents_sdk.adapters.agent_setup_retrievers import *
 from zav.agents_sdk.domain.agent_dependency import (
     AgentDependencyFactory,
     AgentDependencyRegistry,
+    DependencyScope,
 )
 from zav.agents_sdk.domain.agent_setup_retriever import AgentSetup, AgentSetupRetriever
 from zav.agents_sdk.domain.chat_agent import ChatAgent, StreamableChatAgent
 from zav.agents_sdk.domain.chat_agent_factory import ChatAgentFactory
 from zav.agents_sdk.domain.chat_message import (
     ChatMessage,
+    ChatMessageDelta,
     ChatMessageEvidence,
     ChatMessageSender,
+    ChatStreamMode,
     ContentPart,
     ConversationContext,
     CustomContext,
@@ -28,14 +31,17 @@ from zav.agents_sdk.setup_app import setup_app
 __all__ = [
     "AgentDependencyFactory",
     "AgentDependencyRegistry",
+    "DependencyScope",
     "AgentSetup",
     "AgentSetupRetriever",
     "ChatAgent",
     "StreamableChatAgent",
     "ChatAgentFactory",
     "ChatMessage",
+    "ChatMessageDelta",
     "ChatMessageEvidence",
     "ChatMessageSender",
+    "ChatStreamMode",
     "ConversationContext",
     "DocumentContext",
     "FunctionCallRequest",
@@ -1,20 +1,9 @@
-import asyncio
-import functools
 import inspect
-from concurrent.futures import ThreadPoolExecutor
 
+from zav.executors import force_async
 
-def is_bound_function(obj):
-    return inspect.ismethod(obj) and callable(obj)
-
+__all__ = ["force_async", "is_bound_function"]
 
-def force_async(fn):
-    """Turns a sync function to async function using threads."""
-    pool = ThreadPoolExecutor()
 
-    @functools.wraps(fn)
-    def wrapper(*args, **kwargs):
-        future = pool.submit(fn, *args, **kwargs)
-        return asyncio.wrap_future(future)  # make it awaitable
-
-    return wrapper
+def is_bound_function(obj):
+    return inspect.ismethod(obj) and callable(obj)
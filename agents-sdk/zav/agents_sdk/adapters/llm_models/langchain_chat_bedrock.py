@@ -7,10 +7,15 @@ from zav.llm_domain import (
     LLMProviderName,
 )
 
-from zav.agents_sdk.domain.agent_dependency import AgentDependencyFactory
+from zav.agents_sdk.domain.agent_dependency import (
+    AgentDependencyFactory,
+    DependencyScope,
+)
 
 
 class ChatBedrockFactory(AgentDependencyFactory):
+    scope = DependencyScope.SINGLETON
+
     @classmethod
     def create(cls, config: LLMClientConfiguration) -> ChatBedrock:
         if config.vendor == LLMProviderName.ANTHROPIC and (
@@ -3,10 +3,15 @@ from typing import Optional, cast
 from langchain_openai import ChatOpenAI
 from zav.llm_domain import LLMClientConfiguration, LLMProviderName, OpenAIConfiguration
 
-from zav.agents_sdk.domain.agent_dependency import AgentDependencyFactory
+from zav.agents_sdk.domain.agent_dependency import (
+    AgentDependencyFactory,
+    DependencyScope,
+)
 
 
 class ChatOpenAIFactory(AgentDependencyFactory):
+    scope = DependencyScope.SINGLETON
+
     @classmethod
     def create(cls, config: LLMClientConfiguration) -> ChatOpenAI:
         if config.vendor == LLMProviderName.OPENAI and (
@@ -1,3 +1,4 @@
+import asyncio
 import enum
 import inspect
 from typing import AsyncIterator, Callable, Dict, List, Optional, Union, overload
@@ -5,6 +6,7 @@ from typing import AsyncIterator, Callable, Dict, List, Optional, Union, overloa
 from pydantic import BaseModel
 from pydantic.utils import GetterDict
 from typing_extensions import Literal
+from zav.executors import force_async
 from zav.llm_domain import LLMClientConfiguration
 from zav.llm_tracing import Span
 from zav.prompt_completion import (
@@ -20,7 +22,10 @@ from zav.prompt_completion import FunctionCallResponse as PcFunctionCallResponse
 from zav.prompt_completion import ToolCallRequest as PcToolCallRequest
 from zav.prompt_completion import ToolCallResponse as PcToolCallResponse
 
-from zav.agents_sdk.domain.agent_dependency import AgentDependencyFactory
+from zav.agents_sdk.domain.agent_dependency import (
+    AgentDependencyFactory,
+    DependencyScope,
+)
 from zav.agents_sdk.domain.chat_message import ChatMessage, FunctionCallRequest
 from zav.agents_sdk.domain.tools import ToolsRegistry
 
@@ -134,69 +139,112 @@ def parse_chat_message(message: Union[ChatMessage, ChatCompletion]) -> PcChatMes
     )
 
 
+async def _execute_tool(
+    tools_registry: ToolsRegistry,
+    tool_call_request: ToolCallRequest,
+    log_fn: Optional[Callable] = None,
+    span: Optional[Span] = None,
+    timeout: Optional[float] = None,
+) -> Dict:
+    tool_call_id = tool_call_request.id
+    function_call_request = tool_call_request.function_call_request
+    new_span = (
+        span.new(
+            name=function_call_request.name,
+            attributes={
+                "metadata": {"tool_call_id": tool_call_id},
+                "input": function_call_request.params or {},
+            },
+        )
+        if span
+        else None
+    )
+    if function_call_request.name not in tools_registry.tools_index:
+        tool_response = (
+            f"Tool {function_call_request.name} not found. "
+            "Please provide a valid tool name."
+        )
+        if new_span:
+            new_span.end(attributes={"output": tool_response})
+        return {"id": tool_call_id, "response": tool_response}
+
+    try:
+        executable = tools_registry.tools_index[function_call_request.name].executable
+        if not inspect.iscoroutinefunction(executable):
+            # Sync tools must not block the event loop
+            executable = force_async(executable)
+        tool_response = await asyncio.wait_for(
+            executable(**(function_call_request.params or {})),  # type: ignore
+            timeout=timeout,
+        )
+        if inspect.isawaitable(tool_response):
+            tool_response = await asyncio.wait_for(tool_response, timeout=timeout)
+    except asyncio.TimeoutError:
+        tool_response = (
+            f"Error in executing tool {function_call_request.name}: "
+            f"timed out after {timeout} seconds"
+        )
+        if log_fn:
+            log_fn({"Error": tool_response})
+    except Exception as e:
+        tool_response = f"Error in executing tool {function_call_request.name}: {e}"
+        if log_fn:
+            log_fn({"Error": tool_response})
+    if new_span:
+        new_span.end(attributes={"output": tool_response})
+    return {"id": tool_call_id, "response": tool_response}
+
+
 async def execute_tool_call_request(
     tools_registry: ToolsRegistry,
     tool_call_requests: Optional[List[ToolCallRequest]] = None,
     log_fn: Optional[Callable] = None,
     span: Optional[Span] = None,
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
 ):
+    """Execute the requested tool calls concurrently.
+
+    Args:
+        tools_registry: The registry of the tools that can be called.
+        tool_call_requests: The tool calls requested by the model.
+        log_fn: Function used to log the requests and errors.
+        span: The span under which a span per tool call is created.
+        max_concurrency: Max number of tools executed at the same time. Unlimited
+            if not set.
+        timeout: Max number of seconds a single tool call may take.
+
+    Returns:
+        A tool ChatCompletion with the responses in the order of the requests.
+    """
     if not tool_call_requests:
         return None
     if log_fn:
         log_fn({"Tool Call Requests": tool_call_requests})
 
-    tool_outputs: List = []
-    for tool_call_request in tool_call_requests:
-        tool_call_id = tool_call_request.id
-        function_call_request = tool_call_request.function_call_request
-        new_span = (
-            span.new(
-                name=function_call_request.name,
-                attributes={
-                    "metadata": {"tool_call_id": tool_call_id},
-                    "input": function_call_request.params or {},
-                },
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def execute(tool_call_request: ToolCallRequest) -> Dict:
+        if semaphore is None:
+            return await _execute_tool(
+                tools_registry=tools_registry,
+                tool_call_request=tool_call_request,
+                log_fn=log_fn,
+                span=span,
+                timeout=timeout,
             )
-            if span
-            else None
-        )
-        if function_call_request.name not in tools_registry.tools_index:
-            tool_outputs.append(
-                {
-                    "id": tool_call_id,
-                    "response": f"Tool {function_call_request.name} not found. "
-                    "Please provide a valid tool name.",
-                }
+        async with semaphore:
+            return await _execute_tool(
+                tools_registry=tools_registry,
+                tool_call_request=tool_call_request,
+                log_fn=log_fn,
+                span=span,
+                timeout=timeout,
             )
-            if new_span:
-                new_span.end(
-                    attributes={
-                        "output": f"Tool {function_call_request.name} not found. "
-                        "Please provide a valid tool name."
-                    }
-                )
-            continue
 
-        try:
-            executable = tools_registry.tools_index[
-                function_call_request.name
-            ].executable
-            if inspect.iscoroutinefunction(executable):
-                tool_response = await executable(
-                    **(function_call_request.params or {})  # type: ignore
-                )
-            else:
-                tool_response = executable(**(function_call_request.params or {}))
-            if new_span:
-                new_span.end(attributes={"output": tool_response})
-            tool_outputs.append({"id": tool_call_id, "response": tool_response})
-        except Exception as e:
-            tool_response = f"Error in executing tool {function_call_request.name}: {e}"
-            if log_fn:
-                log_fn({"Error": tool_response})
-            if new_span:
-                new_span.end(attributes={"output": tool_response})
-            tool_outputs.append({"id": tool_call_id, "response": tool_response})
+    tool_outputs = await asyncio.gather(
+        *(execute(tool_call_request) for tool_call_request in tool_call_requests)
+    )
 
     return ChatCompletion(
         sender=ChatCompletionSender.TOOL,
@@ -216,9 +264,21 @@ class ZAVChatCompletionClient:
         self,
         chat_completion_client: ChatCompletionClient,
         span: Optional[Span] = None,
+        tool_concurrency_limit: Optional[int] = None,
+        tool_timeout: Optional[float] = None,
     ) -> None:
         self.__chat_completion_client = chat_completion_client
         self.__span = span
+        self.__tool_concurrency_limit = tool_concurrency_limit
+        self.__tool_timeout = tool_timeout
+
+    def with_span(self, span: Optional[Span] = None) -> "ZAVChatCompletionClient":
+        return ZAVChatCompletionClient(
+            self.__chat_completion_client,
+            span=span,
+            tool_concurrency_limit=self.__tool_concurrency_limit,
+            tool_timeout=self.__tool_timeout,
+        )
 
     @overload
     async def complete(  # type: ignore
@@ -330,7 +390,7 @@ class ZAVChatCompletionClient:
         )
 
         chat_response = await self.__chat_completion_client.complete(
-            request=req, stream=stream
+            request=req, stream=stream, span=self.__span
         )
         if isinstance(chat_response, AsyncIterator):
 
@@ -518,6 +578,8 @@ class ZAVChatCompletionClient:
                 tool_call_requests=response.chat_completion.tool_call_requests,
                 log_fn=log_fn,
                 span=span,
+                max_concurrency=self.__tool_concurrency_limit,
+                timeout=self.__tool_timeout,
             )
             if (
                 response.chat_completion
@@ -550,9 +612,30 @@ class ZAVChatCompletionClient:
 
 
 class ZAVChatCompletionClientFactory(AgentDependencyFactory):
+    scope = DependencyScope.SINGLETON
+
     @classmethod
     def create(
-        cls, config: LLMClientConfiguration, span: Optional[Span] = None
+        cls,
+        config: LLMClientConfiguration,
+        span: Optional[Span] = None,
+        tool_concurrency_limit: Optional[int] = None,
+        tool_timeout: Optional[float] = None,
     ) -> ZAVChatCompletionClient:
         chat_completion_client = ChatClientFactory.create(config, span=span)
-        return ZAVChatCompletionClient(chat_completion_client, span=span)
+        return ZAVChatCompletionClient(
+            chat_completion_client,
+            span=span,
+            tool_concurrency_limit=tool_concurrency_limit,
+            tool_timeout=tool_timeout,
+        )
+
+    @classmethod
+    def derive(
+        cls, instance: ZAVChatCompletionClient, **kwargs
+    ) -> ZAVChatCompletionClient:
+        try:
+            return instance.with_span(kwargs.get("span"))
+        except NotImplementedError:
+            # The backend client cannot be bound to the span of the request
+            return cls.create(**kwargs)
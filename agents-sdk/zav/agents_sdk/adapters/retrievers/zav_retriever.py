@@ -1,11 +1,13 @@
+import asyncio
 import json
+import time
 from datetime import date, datetime
 from functools import wraps
-from typing import Dict, List, Literal, Optional
+from typing import Callable, Dict, List, Literal, Optional, Set, Tuple
 
 from pydantic import BaseModel
 from zav.api.errors import UnknownException
-from zav.search_api import ApiClient, Configuration
+from zav.search_api import ApiClient, AsyncApiClient, Configuration
 from zav.search_api.apis import DocumentsApi as DocumentsApiSync
 from zav.search_api.exceptions import ApiException
 from zav.search_api.model.index_cluster_string import IndexClusterString
@@ -36,11 +38,19 @@ class RetrievedHistoryItem(BaseModel):
 
 class DocumentsApi(DocumentsApiSync):
     def __init__(self, *args, **kwargs):
+        # Wrapped bound methods are cached so that they are only wrapped once
+        self._async_methods: Dict[str, Callable] = {}
         super().__init__(*args, **kwargs)
 
     def __getattribute__(self, name):
+        async_methods = object.__getattribute__(self, "_async_methods")
+        if name in async_methods:
+            return async_methods[name]
         original = object.__getattribute__(self, name)
-        return force_async(original) if is_bound_function(original) else original
+        if is_bound_function(original):
+            async_methods[name] = force_async(original)
+            return async_methods[name]
+        return original
 
 
 def _handle_pipeline_service_api_error(e: ApiException):
@@ -103,15 +113,24 @@ class ZAVRetriever:
         request_headers: RequestHeaders,
         tenant: str,
         index_id: Optional[str] = None,
+        authorization: Optional[str] = None,
+        x_auth: Optional[str] = None,
     ) -> None:
-        if request_headers.authorization:
-            api_client.set_default_header(
-                "Authorization", request_headers.authorization
-            )
-        if request_headers.x_auth:
-            api_client.set_default_header("X-Auth", request_headers.x_auth)
+        # Credentials are sent per call so that the api client can be shared
+        # between concurrent requests of different tenants.
+        authorization = request_headers.authorization or authorization
+        x_auth = request_headers.x_auth or x_auth
+        self.__auth_headers = {
+            **({"Authorization": authorization} if authorization else {}),
+            **({"X-Auth": x_auth} if x_auth else {}),
+        }
         self.__retrieved_history: List[RetrievedHistoryItem] = []
-        self.__documents = DocumentsApi(api_client)
+        # An AsyncApiClient is awaited natively, a sync ApiClient is run on threads
+        self.__documents = (
+            DocumentsApiSync(api_client)
+            if isinstance(api_client, AsyncApiClient)
+            else DocumentsApi(api_client)
+        )
         self.__internal_headers = request_headers.dict(
             exclude_none=True, exclude={"authorization", "x_auth"}
         )
@@ -244,7 +263,9 @@ class ZAVRetriever:
         )
         search_response: SearchPostResponse = (
             await self.__documents.document_search_post(
-                search_post_request=search_post_request, **self.__internal_headers
+                search_post_request=search_post_request,
+                _headers=self.__auth_headers,
+                **self.__internal_headers,
             )
         )
         response_dict = search_response.to_dict()
@@ -320,6 +341,7 @@ class ZAVRetriever:
             property_values=property_values,
             tenant=self.__tenant,
             **({"index_cluster": index_cluster} if index_cluster else {}),
+            _headers=self.__auth_headers,
             **self.__internal_headers,
         )
         response_dict = list_response.to_dict()
@@ -343,7 +365,66 @@ def _api_config(host: str, retries: Optional[int] = None) -> Configuration:
     return config
 
 
+class ZAVApiClientPool:
+    """Shares one AsyncApiClient per host, retries and event loop.
+
+    Clients keep their connections alive between requests. Clients that have not
+    been handed out for `idle_timeout` seconds are closed.
+    """
+
+    def __init__(self, idle_timeout: float = 300.0):
+        self.__idle_timeout = idle_timeout
+        self.__clients: Dict[
+            Tuple[str, Optional[int], Optional[asyncio.AbstractEventLoop]],
+            Tuple[AsyncApiClient, float],
+        ] = {}
+        self.__closing_tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self.__clients)
+
+    def get(self, host: str, retries: Optional[int] = None) -> AsyncApiClient:
+        now = time.monotonic()
+        self.__evict_idle(now)
+        # httpx clients are bound to the event loop they were first used in
+        try:
+            loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        key = (host, retries, loop)
+        if key in self.__clients:
+            api_client, _ = self.__clients[key]
+        else:
+            api_client = AsyncApiClient(_api_config(host, retries))
+        self.__clients[key] = (api_client, now)
+        return api_client
+
+    def __evict_idle(self, now: float):
+        idle_keys = [
+            key
+            for key, (_, last_used) in self.__clients.items()
+            if now - last_used > self.__idle_timeout
+        ]
+        for key in idle_keys:
+            api_client, _ = self.__clients.pop(key)
+            loop = key[2]
+            if loop is not None and loop.is_running() and not loop.is_closed():
+                task = loop.create_task(api_client.aclose())
+                self.__closing_tasks.add(task)
+                task.add_done_callback(self.__closing_tasks.discard)
+
+    async def close(self):
+        current_loop = asyncio.get_running_loop()
+        clients, self.__clients = self.__clients, {}
+        for (_, _, loop), (api_client, _) in clients.items():
+            # Clients of other (likely closed) event loops can only be dropped
+            if loop is current_loop:
+                await api_client.aclose()
+
+
 class ZAVRetrieverFactory(AgentDependencyFactory):
+    api_client_pool = ZAVApiClientPool()
+
     @classmethod
     def create(
         cls,
@@ -355,17 +436,14 @@ class ZAVRetrieverFactory(AgentDependencyFactory):
         x_auth: Optional[str] = None,
         retries: Optional[int] = None,
     ) -> ZAVRetriever:
-        configuration = _api_config(zav_retriever_host, retries)
-        api_client = ApiClient(configuration)
-        if authorization:
-            api_client.set_default_header("Authorization", authorization)
-        if x_auth:
-            api_client.set_default_header("X-Auth", x_auth)
+        api_client = cls.api_client_pool.get(zav_retriever_host, retries)
 
         return ZAVRetriever(
             api_client=api_client,
-            configuration=configuration,
+            configuration=api_client.configuration,
             request_headers=request_headers,
             tenant=tenant,
             index_id=index_id,
+            authorization=authorization,
+            x_auth=x_auth,
         )
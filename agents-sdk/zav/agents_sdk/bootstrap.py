@@ -1,9 +1,11 @@
+import importlib.util
 from typing import Any, Callable, Optional, Type
 
+from zav.executors import shared_thread_pool
 from zav.llm_tracing import TracingBackendFactory
 from zav.message_bus import Bootstrap, BootstrapDependency
 
-from zav.agents_sdk.adapters import AgentDependencyRegistry
+from zav.agents_sdk.adapters import AgentDependencyRegistry, ZAVRetrieverFactory
 from zav.agents_sdk.domain.agent_setup_retriever import AgentSetupRetriever
 from zav.agents_sdk.domain.chat_agent_factory import ChatAgentFactory
 from zav.agents_sdk.handlers import CommandHandlerRegistry, EventHandlerRegistry
@@ -34,6 +36,7 @@ def setup_bootstrap(
         BootstrapDependency(
             name="tracing_backend_factory",
             value=TracingBackendFactory,
+            shutdown_fn=TracingBackendFactory.shutdown,
         ),
         BootstrapDependency(
             name="agent_dependency_registry",
@@ -43,7 +46,32 @@ def setup_bootstrap(
             name="debug_backend",
             value=debug_backend,
         ),
+        BootstrapDependency(
+            name="shared_thread_pool",
+            shutdown_fn=shared_thread_pool.shutdown,
+        ),
+        BootstrapDependency(
+            name="agent_dependency_store",
+            shutdown_fn=AgentDependencyRegistry.store.close,
+        ),
+        BootstrapDependency(
+            name="zav_retriever_api_client_pool",
+            shutdown_fn=ZAVRetrieverFactory.api_client_pool.close,
+        ),
     ]
+    if importlib.util.find_spec("zav.prompt_completion") is not None:
+        from zav.prompt_completion import ResponseCache, sdk_client_registry
+
+        bootstrap_deps += [
+            BootstrapDependency(
+                name="response_cache",
+                shutdown_fn=ResponseCache.flush_all,
+            ),
+            BootstrapDependency(
+                name="sdk_client_registry",
+                shutdown_fn=sdk_client_registry.close,
+            ),
+        ]
     return Bootstrap(
         dependencies=bootstrap_deps,
         command_handler_registry=CommandHandlerRegistry,
@@ -1,6 +1,6 @@
-from typing import AsyncGenerator, Optional
+from typing import AsyncGenerator, Optional, Union
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Query
 from sse_starlette.sse import EventSourceResponse, ServerSentEvent
 from zav.api.dependencies import get_message_bus
 from zav.api.errors import UnknownException
@@ -13,7 +13,12 @@ from zav.agents_sdk.controllers.v1.chats.types import (
     ChatStreamItem,
 )
 from zav.agents_sdk.controllers.v1.common import get_headers
-from zav.agents_sdk.domain import ChatRequest, RequestHeaders
+from zav.agents_sdk.domain import (
+    ChatMessageDelta,
+    ChatRequest,
+    ChatStreamMode,
+    RequestHeaders,
+)
 from zav.agents_sdk.domain.chat_agent import ChatMessage
 from zav.agents_sdk.handlers import commands
 
@@ -38,6 +43,8 @@ def extract_create_stream_command(
     body: ChatResponseForm,
     tenant: str = Query(...),
     index_id: Optional[str] = Query(None),
+    stream_mode: Optional[ChatStreamMode] = Query(None),
+    x_stream_mode: Optional[ChatStreamMode] = Header(None, alias="X-Stream-Mode"),
     request_headers: RequestHeaders = Depends(get_headers),
 ) -> commands.CreateChatStream:
     return commands.CreateChatStream(
@@ -45,6 +52,7 @@ def extract_create_stream_command(
         index_id=index_id,
         request_headers=request_headers,
         chat_request=ChatRequest(**body.dict(exclude_unset=True)),
+        stream_mode=stream_mode or x_stream_mode or ChatStreamMode.FULL,
     )
 
 
@@ -69,14 +77,24 @@ async def create_chat_response(
     return ChatResponseItem.from_orm(result)
 
 
-async def stream_response(chat_message_stream: AsyncGenerator[ChatMessage, None]):
+async def stream_response(
+    chat_message_stream: AsyncGenerator[Union[ChatMessage, ChatMessageDelta], None],
+    stream_mode: ChatStreamMode = ChatStreamMode.FULL,
+):
     if not isinstance(chat_message_stream, AsyncGenerator):
         raise UnknownException("Could not create chat response.")
     try:
         async for message in chat_message_stream:
-            yield ServerSentEvent(
-                data=message.json(), event="new_message", id="message_id", retry=15000
-            )
+            if isinstance(message, ChatMessageDelta):
+                event = "delta"
+                data = message.changes_json()
+            else:
+                # In delta mode the full message is only sent once, at the end
+                event = (
+                    "complete" if stream_mode == ChatStreamMode.DELTA else "new_message"
+                )
+                data = message.json()
+            yield ServerSentEvent(data=data, event=event, id="message_id", retry=15000)
     except Exception as e:
         logger.error(f"Error in streaming chat messages: {e}", exc_info=True)
         yield ServerSentEvent(data=str(e), event="error")
@@ -100,6 +118,12 @@ async def stream_response(chat_message_stream: AsyncGenerator[ChatMessage, None]
     status_code=201,
     name="create_chat_streaming",
     operation_id="create_chat_streaming",
+    description=(
+        "Streams `new_message` events carrying the full message so far. With "
+        "`stream_mode=delta` (or the `X-Stream-Mode: delta` header), `delta` events "
+        "carry only the appended text and the changed fields, followed by a "
+        "`complete` event with the full message."
+    ),
 )
 async def create_chat_streaming(
     command=Depends(extract_create_stream_command),
@@ -111,4 +135,7 @@ async def create_chat_streaming(
     if not result:
         raise UnknownException("Could not create chat response.")
 
-    return EventSourceResponse(stream_response(result), media_type="text/event-stream")
+    return EventSourceResponse(
+        stream_response(result, stream_mode=command.stream_mode),
+        media_type="text/event-stream",
+    )
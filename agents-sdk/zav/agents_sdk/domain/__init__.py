@@ -2,8 +2,10 @@ from zav.agents_sdk.domain.chat_agent import ChatAgent
 from zav.agents_sdk.domain.chat_agent_factory import ChatAgentFactory
 from zav.agents_sdk.domain.chat_message import (
     ChatMessage,
+    ChatMessageDelta,
     ChatMessageEvidence,
     ChatMessageSender,
+    ChatStreamMode,
     FunctionCallRequest,
     FunctionSpec,
 )
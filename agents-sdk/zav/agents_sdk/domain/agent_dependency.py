@@ -1,14 +1,46 @@
+import asyncio
+import functools
+import hashlib
 import inspect
+import json
 from abc import ABC, abstractmethod
-from typing import Dict, Generic, Type, TypeVar, Union
+from enum import Enum
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Generic,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
+from cachetools import TTLCache
+from pydantic import BaseModel
 from typing_extensions import ParamSpec
+from zav.encryption.pydantic import EncryptedStr
+from zav.encryption.fingerprint import credential_fingerprint
 
 T = TypeVar("T")
 DEPENDENCY_PARAMS = ParamSpec("DEPENDENCY_PARAMS")
 
 
+class DependencyScope(str, Enum):
+    # A new instance is created for every request
+    REQUEST = "request"
+    # Instances are shared across the requests of the same tenant
+    TENANT = "tenant"
+    # Instances are shared across all requests
+    SINGLETON = "singleton"
+
+
 class AgentDependencyFactory(ABC, Generic[DEPENDENCY_PARAMS, T]):
+    scope: DependencyScope = DependencyScope.REQUEST
+
     @classmethod
     @abstractmethod
     def create(
@@ -20,14 +52,187 @@ class AgentDependencyFactory(ABC, Generic[DEPENDENCY_PARAMS, T]):
         - (un)typed key-value pairs within agent_configuration, matched by argument name
         - (un)typed key-value pairs within the handler command, matched by argument name
         - other dependencies matched by their type
+
+        The method can also be defined as `async def` when creating the dependency
+        requires I/O. It is awaited during injection.
+
+        Instances of TENANT and SINGLETON scoped factories are created once per
+        distinct set of arguments and shared. Request bound arguments (the span) are
+        not part of that set and are passed as None.
         """
         raise NotImplementedError
 
+    @classmethod
+    def derive(cls, instance: T, **kwargs) -> T:
+        """Return the object injected in a request from a shared instance.
+
+        Only used for TENANT and SINGLETON scoped factories. The keyword arguments
+        are the ones resolved for the current request, including the span.
+        """
+        return instance
+
+    @classmethod
+    async def close(cls, instance: T) -> None:
+        """Release the resources held by a shared instance that is discarded."""
+        close_fn = getattr(instance, "aclose", None) or getattr(instance, "close", None)
+        if callable(close_fn) and inspect.isawaitable(result := close_fn()):
+            await result
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, EncryptedStr):
+        # Only a hash of the secret (encrypted, or unencrypted behind an empty
+        # string) becomes part of the key
+        return [
+            "secret",
+            credential_fingerprint(str(value), value.get_unencrypted_secret()),
+        ]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Enum):
+        return _normalize(value.value)
+    if isinstance(value, BaseModel):
+        return [type(value).__name__, {key: _normalize(val) for key, val in value}]
+    if isinstance(value, dict):
+        return {str(key): _normalize(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(val) for val in value]
+    raise TypeError(f"Cannot use a value of type {type(value)} in a dependency key")
+
+
+def dependency_fingerprint(params: Dict[str, Any]) -> str:
+    """Hash the arguments of a dependency, raising TypeError for non-data values."""
+    return hashlib.sha256(
+        json.dumps(_normalize(params), sort_keys=True).encode()
+    ).hexdigest()
+
+
+DependencyKey = Tuple[Any, Optional[str], Optional[asyncio.AbstractEventLoop], str]
+
+
+class DependencyCache(TTLCache):
+    """TTLCache that reports the items it evicts or expires."""
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        on_evict: Callable[[DependencyKey, Any], None],
+    ):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.__on_evict = on_evict
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.__on_evict(key, value)
+        return key, value
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, value in expired:
+            self.__on_evict(key, value)
+        return expired
+
+
+class ScopedDependencyStore:
+    """Shares the instances of TENANT and SINGLETON scoped dependencies.
+
+    Instances are keyed by factory, tenant (TENANT scope only), event loop and the
+    fingerprint of the arguments they were created with. Instances that are evicted
+    or that have not been used for `ttl` seconds are closed.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600.0):
+        self.__instances = DependencyCache(
+            maxsize=maxsize, ttl=ttl, on_evict=self.__schedule_close
+        )
+        self.__pending: Dict[DependencyKey, asyncio.Future] = {}
+        self.__closing_tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self.__instances)
+
+    async def get(
+        self,
+        factory: Union[Type[AgentDependencyFactory], AgentDependencyFactory],
+        params: Dict[str, Any],
+        request_params: Collection[str] = (),
+        tenant: Optional[str] = None,
+    ) -> Any:
+        shared_params = {
+            name: (None if name in request_params else value)
+            for name, value in params.items()
+        }
+        try:
+            fingerprint = dependency_fingerprint(shared_params)
+        except TypeError:
+            # Arguments that are not plain data (e.g. request scoped dependencies)
+            # cannot be shared safely
+            return await self.__create(factory, params)
+        # Clients are usually bound to the event loop they were first used in
+        key: DependencyKey = (
+            factory,
+            tenant if factory.scope == DependencyScope.TENANT else None,
+            asyncio.get_running_loop(),
+            fingerprint,
+        )
+        # Refresh the ttl of the instance
+        instance = self.__instances.pop(key, None)
+        if instance is not None:
+            self.__instances[key] = instance
+        else:
+            if key not in self.__pending:
+                future = asyncio.ensure_future(self.__create(factory, shared_params))
+                self.__pending[key] = future
+                future.add_done_callback(functools.partial(self.__store, key))
+            instance = await asyncio.shield(self.__pending[key])
+        return factory.derive(instance, **params)
+
+    @staticmethod
+    async def __create(
+        factory: Union[Type[AgentDependencyFactory], AgentDependencyFactory],
+        params: Dict[str, Any],
+    ) -> Any:
+        instance = factory.create(**params)
+        if inspect.isawaitable(instance):
+            instance = await instance
+        return instance
+
+    def __store(self, key: DependencyKey, future: asyncio.Future):
+        self.__pending.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.__instances[key] = future.result()
+
+    def __schedule_close(self, key: DependencyKey, instance: Any):
+        factory, _, loop, _ = key
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            task = loop.create_task(factory.close(instance))
+            self.__closing_tasks.add(task)
+            task.add_done_callback(self.__closing_tasks.discard)
+
+    async def close(self):
+        current_loop = asyncio.get_running_loop()
+        self.__instances.expire()
+        instances = [(key, self.__instances.pop(key)) for key in list(self.__instances)]
+        await asyncio.gather(
+            *(
+                key[0].close(instance)
+                for key, instance in instances
+                # Instances of other (likely closed) event loops can only be dropped
+                if key[2] is current_loop
+            ),
+            *(task for task in self.__closing_tasks if task.get_loop() is current_loop),
+            return_exceptions=True,
+        )
+
 
 class AgentDependencyRegistry:
     registry: Dict[
         type, Union[Type[AgentDependencyFactory], AgentDependencyFactory]
     ] = {}
+    # Bumped on every registration so that cached injection plans can be invalidated
+    version: int = 0
+    store: ScopedDependencyStore = ScopedDependencyStore()
 
     @classmethod
     def register(
@@ -39,3 +244,4 @@ class AgentDependencyRegistry:
                 f"Factory method {inst_or_cls.create} should have a return annotation"
             )
         cls.registry[created_cls] = inst_or_cls
+        cls.version += 1
@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, confloat
 from zav.llm_domain import LLMClientConfiguration
 
 
@@ -29,11 +29,31 @@ class TracingVendorName(str, Enum):
     LANGFUSE = "langfuse"
 
 
+class TracingSamplingConfiguration(BaseModel):
+    """Share of the requests that are traced.
+
+    The rate of the agent takes precedence over the rate of the tenant, which takes
+    precedence over `sample_rate`. Requests that are not sampled are still traced
+    when they fail if `always_sample_errors` is set.
+    """
+
+    sample_rate: confloat(ge=0, le=1) = 1.0  # type: ignore
+    tenant_sample_rates: Dict[str, confloat(ge=0, le=1)] = {}  # type: ignore
+    agent_sample_rates: Dict[str, confloat(ge=0, le=1)] = {}  # type: ignore
+    always_sample_errors: bool = True
+
+    def sample_rate_for(self, tenant: str, agent_identifier: str) -> float:
+        if agent_identifier in self.agent_sample_rates:
+            return self.agent_sample_rates[agent_identifier]
+        return self.tenant_sample_rates.get(tenant, self.sample_rate)
+
+
 class TracingConfiguration(BaseModel):
     vendor: TracingVendorName
     vendor_configuration: TracingVendorConfiguration = Field(
         default_factory=TracingVendorConfiguration
     )
+    sampling: Optional[TracingSamplingConfiguration] = None
 
 
 class AgentSetup(BaseModel):
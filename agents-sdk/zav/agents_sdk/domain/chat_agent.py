@@ -13,7 +13,11 @@ from typing import (
 
 from zav.llm_tracing import Span
 
-from zav.agents_sdk.domain.chat_message import ChatMessage, ChatMessageSender
+from zav.agents_sdk.domain.chat_message import (
+    ChatMessage,
+    ChatMessageDelta,
+    ChatMessageSender,
+)
 from zav.agents_sdk.domain.tools import ToolsRegistry
 
 
@@ -132,3 +136,30 @@ class StreamableChatAgent(ChatAgent):
         self, conversation: List[ChatMessage]
     ) -> AsyncGenerator[ChatMessage, None]:
         raise NotImplementedError
+
+    async def execute_streaming_delta(
+        self, conversation: List[ChatMessage]
+    ) -> AsyncGenerator[Union[ChatMessageDelta, ChatMessage], None]:
+        """Stream only the changes of the response message, then the full message.
+
+        By default the deltas are computed from `execute_streaming`. Agents that
+        produce deltas natively can override this, as long as the last item is the
+        complete ChatMessage.
+        """
+        previous: Optional[ChatMessage] = None
+        last_message: Optional[ChatMessage] = None
+        async for message in self.execute_streaming(conversation):
+            delta = ChatMessageDelta.from_messages(previous, message)
+            if not delta.is_empty():
+                yield delta
+            last_message = message
+            # Agents may mutate and re-yield the same message, so keep a snapshot
+            previous = message.copy(
+                update={
+                    field: list(value)
+                    for field in ("evidences", "content_parts")
+                    if (value := getattr(message, field)) is not None
+                }
+            )
+        if last_message is not None:
+            yield last_message
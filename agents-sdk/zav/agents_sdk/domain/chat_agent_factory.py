@@ -1,9 +1,13 @@
+import asyncio
 import inspect
+from dataclasses import dataclass
+from enum import Enum
 from typing import (
     Any,
     Callable,
     Dict,
     Optional,
+    Tuple,
     Type,
     Union,
     cast,
@@ -15,7 +19,10 @@ from pydantic import BaseModel
 from zav.llm_domain import LLMClientConfiguration
 from zav.llm_tracing import Span
 
-from zav.agents_sdk.domain.agent_dependency import AgentDependencyRegistry
+from zav.agents_sdk.domain.agent_dependency import (
+    AgentDependencyRegistry,
+    DependencyScope,
+)
 from zav.agents_sdk.domain.agent_setup_retriever import AgentSetup, AgentSetupRetriever
 from zav.agents_sdk.domain.chat_agent import ChatAgent, StreamableChatAgent
 from zav.agents_sdk.domain.chat_request import ConversationContext
@@ -44,8 +51,38 @@ def init_sub_agent_span(
     )
 
 
+class InjectionStepKind(str, Enum):
+    DEPENDENCY = "dependency"
+    CONVERSATION_CONTEXT = "conversation_context"
+    SUB_AGENT = "sub_agent"
+    LLM_CLIENT_CONFIGURATION = "llm_client_configuration"
+    SPAN = "span"
+    AGENT_CONFIGURATION = "agent_configuration"
+
+
+@dataclass(frozen=True)
+class InjectionStep:
+    """A pre-compiled instruction describing how to resolve a single parameter."""
+
+    kind: InjectionStepKind
+    param_name: str
+    has_default: bool
+    is_optional: bool
+    param_default: Any
+    is_not_annotated: bool = False
+    is_base_model: bool = False
+    param_annotation: Any = None
+    sub_agent_name: Optional[str] = None
+    agent_dependency: Any = None
+    is_async_dependency: bool = False
+    dependency_plan: Tuple["InjectionStep", ...] = ()
+
+
 class ChatAgentFactory:
     registry: Dict[str, Type[ChatAgent]] = {}
+    injection_plans: Dict[
+        Tuple[Callable, Optional[type]], Tuple[Optional[int], Tuple[InjectionStep, ...]]
+    ] = {}
 
     @classmethod
     def register(cls) -> Callable:
@@ -152,18 +189,12 @@ class ChatAgentFactory:
             return param_value
 
     @classmethod
-    async def _parse_value(
+    def _compile_step(
         cls,
         param: inspect.Parameter,
         param_name: str,
-        handler_params: Dict[str, Any],
-        agent_setup_retriever: AgentSetupRetriever,
         agent_dependency_registry: Optional[Type[AgentDependencyRegistry]] = None,
-        debug_backend: Optional[Callable[[Any], Any]] = None,
-        agent_setup: Optional[AgentSetup] = None,
-        conversation_context: Optional[ConversationContext] = None,
-        span: Optional[Span] = None,
-    ) -> Optional[Any]:
+    ) -> InjectionStep:
         param_annotation = param.annotation
         is_optional = check_is_optional(param_annotation)
         if is_optional:
@@ -173,43 +204,129 @@ class ChatAgentFactory:
                 if annotation is not type(None)  # noqa: E721
             )
         is_class = inspect.isclass(param_annotation)
+        has_default = param.default != inspect.Parameter.empty
+        step_params: Dict[str, Any] = dict(
+            param_name=param_name,
+            has_default=has_default,
+            is_optional=is_optional,
+            param_default=param.default,
+        )
         # Parse agent dependency
         if agent_dependency_registry and is_class:
             agent_dependency = agent_dependency_registry.registry.get(param_annotation)
             if agent_dependency:
-                # The agent dependency needs to be inspected and initialized
-                agent_dependency_params = inspect.signature(
-                    agent_dependency.create
-                ).parameters
-                return agent_dependency.create(
-                    **{
-                        param_name: await cls._parse_value(
-                            param=param,
-                            param_name=param_name,
-                            handler_params=handler_params,
-                            agent_setup_retriever=agent_setup_retriever,
-                            agent_dependency_registry=agent_dependency_registry,
-                            debug_backend=debug_backend,
-                            agent_setup=agent_setup,
-                            conversation_context=conversation_context,
-                            span=span,
-                        )
-                        for param_name, param in agent_dependency_params.items()
-                        if param_name != "self"
-                    }
+                return InjectionStep(
+                    kind=InjectionStepKind.DEPENDENCY,
+                    agent_dependency=agent_dependency,
+                    is_async_dependency=inspect.iscoroutinefunction(
+                        agent_dependency.create
+                    ),
+                    dependency_plan=cls._compile_plan(
+                        target=agent_dependency.create,
+                        agent_dependency_registry=agent_dependency_registry,
+                    ),
+                    **step_params,
                 )
-        has_default = param.default != inspect.Parameter.empty
-        # parse conversation context
-        is_conversation_context = is_class and issubclass(
-            param_annotation, ConversationContext
+        if is_class and issubclass(param_annotation, ConversationContext):
+            return InjectionStep(
+                kind=InjectionStepKind.CONVERSATION_CONTEXT, **step_params
+            )
+        if is_class and issubclass(param_annotation, ChatAgent):
+            return InjectionStep(
+                kind=InjectionStepKind.SUB_AGENT,
+                sub_agent_name=cast(ChatAgent, param_annotation).agent_name,
+                **step_params,
+            )
+        if is_class and issubclass(param_annotation, LLMClientConfiguration):
+            return InjectionStep(
+                kind=InjectionStepKind.LLM_CLIENT_CONFIGURATION, **step_params
+            )
+        if is_class and issubclass(param_annotation, Span):
+            return InjectionStep(kind=InjectionStepKind.SPAN, **step_params)
+
+        return InjectionStep(
+            kind=InjectionStepKind.AGENT_CONFIGURATION,
+            is_not_annotated=param_annotation == inspect.Parameter.empty,
+            is_base_model=is_class and issubclass(param_annotation, BaseModel),
+            param_annotation=param_annotation,
+            **step_params,
         )
-        if is_conversation_context:
+
+    @classmethod
+    def _compile_plan(
+        cls,
+        target: Callable,
+        agent_dependency_registry: Optional[Type[AgentDependencyRegistry]] = None,
+    ) -> Tuple[InjectionStep, ...]:
+        """Return the injection plan of an agent class or dependency factory method.
+
+        Plans are compiled once per target and cached with the registry version they
+        were compiled with, so that registering a new dependency replaces the plans
+        that could be affected.
+        """
+        plan_key = (target, agent_dependency_registry)
+        version = (
+            agent_dependency_registry.version if agent_dependency_registry else None
+        )
+        cached_version, plan = cls.injection_plans.get(plan_key, (None, None))
+        if plan is None or cached_version != version:
+            plan = tuple(
+                cls._compile_step(
+                    param=param,
+                    param_name=param_name,
+                    agent_dependency_registry=agent_dependency_registry,
+                )
+                for param_name, param in inspect.signature(target).parameters.items()
+                if param_name != "self"
+            )
+            cls.injection_plans[plan_key] = (version, plan)
+        return plan
+
+    @classmethod
+    async def _resolve_step(
+        cls,
+        step: InjectionStep,
+        handler_params: Dict[str, Any],
+        agent_setup_retriever: AgentSetupRetriever,
+        agent_dependency_registry: Optional[Type[AgentDependencyRegistry]] = None,
+        debug_backend: Optional[Callable[[Any], Any]] = None,
+        agent_setup: Optional[AgentSetup] = None,
+        conversation_context: Optional[ConversationContext] = None,
+        span: Optional[Span] = None,
+    ) -> Optional[Any]:
+        if step.kind == InjectionStepKind.DEPENDENCY:
+            dependency_params = await cls._resolve_plan(
+                plan=step.dependency_plan,
+                handler_params=handler_params,
+                agent_setup_retriever=agent_setup_retriever,
+                agent_dependency_registry=agent_dependency_registry,
+                debug_backend=debug_backend,
+                agent_setup=agent_setup,
+                conversation_context=conversation_context,
+                span=span,
+            )
+            if (
+                agent_dependency_registry
+                and step.agent_dependency.scope != DependencyScope.REQUEST
+            ):
+                return await agent_dependency_registry.store.get(
+                    factory=step.agent_dependency,
+                    params=dependency_params,
+                    request_params=[
+                        dependency_step.param_name
+                        for dependency_step in step.dependency_plan
+                        if dependency_step.kind == InjectionStepKind.SPAN
+                    ],
+                    tenant=handler_params.get("tenant"),
+                )
+            if step.is_async_dependency:
+                return await step.agent_dependency.create(**dependency_params)
+            return step.agent_dependency.create(**dependency_params)
+        if step.kind == InjectionStepKind.CONVERSATION_CONTEXT:
             return conversation_context
-        # Parse sub agent
-        is_chat_agent = is_class and issubclass(param_annotation, ChatAgent)
-        if is_chat_agent:
+        if step.kind == InjectionStepKind.SUB_AGENT:
+            sub_agent_name = cast(str, step.sub_agent_name)
             # Retrieve agent_identifier from agent_setup
-            sub_agent_name = cast(ChatAgent, param_annotation).agent_name
             sub_agent_identifier = sub_agent_name
             if agent_setup and agent_setup.sub_agent_mapping:
                 sub_agent_identifier = agent_setup.sub_agent_mapping.get(
@@ -218,50 +335,74 @@ class ChatAgentFactory:
             return await cls._parse_sub_agent(
                 handler_params=handler_params,
                 agent_setup_retriever=agent_setup_retriever,
-                has_default=has_default,
-                is_optional=is_optional,
+                has_default=step.has_default,
+                is_optional=step.is_optional,
                 sub_agent_name=sub_agent_name,
                 sub_agent_identifier=sub_agent_identifier,
-                param_default=param.default,
+                param_default=step.param_default,
                 agent_dependency_registry=agent_dependency_registry,
                 debug_backend=debug_backend,
                 conversation_context=conversation_context,
                 span=span,
             )
-        is_llm_client_configuration = is_class and issubclass(
-            param_annotation, LLMClientConfiguration
-        )
-        if is_llm_client_configuration:
+        if step.kind == InjectionStepKind.LLM_CLIENT_CONFIGURATION:
             if agent_setup is None:
-                if has_default:
-                    return param.default
-                if is_optional:
+                if step.has_default:
+                    return step.param_default
+                if step.is_optional:
                     return None
                 else:
                     raise ValueError(
-                        f"Missing value for required parameter: {param_name}"
+                        f"Missing value for required parameter: {step.param_name}"
                     )
             return agent_setup.llm_client_configuration
-
-        is_span = is_class and issubclass(param_annotation, Span)
-        if is_span:
+        if step.kind == InjectionStepKind.SPAN:
             return span
 
         # Parse agent configuration
-        is_not_annotated = param_annotation == inspect.Parameter.empty
-        is_base_model = is_class and issubclass(param_annotation, BaseModel)
         return cls._parse_agent_configuration(
-            param_name=param_name,
-            has_default=has_default,
-            is_optional=is_optional,
-            is_not_annotated=is_not_annotated,
-            is_base_model=is_base_model,
-            param_default=param.default,
-            param_annotation=cast(BaseModel, param_annotation),
+            param_name=step.param_name,
+            has_default=step.has_default,
+            is_optional=step.is_optional,
+            is_not_annotated=step.is_not_annotated,
+            is_base_model=step.is_base_model,
+            param_default=step.param_default,
+            param_annotation=cast(BaseModel, step.param_annotation),
             handler_params=handler_params,
             agent_setup=agent_setup,
         )
 
+    @classmethod
+    async def _resolve_plan(
+        cls,
+        plan: Tuple[InjectionStep, ...],
+        handler_params: Dict[str, Any],
+        agent_setup_retriever: AgentSetupRetriever,
+        agent_dependency_registry: Optional[Type[AgentDependencyRegistry]] = None,
+        debug_backend: Optional[Callable[[Any], Any]] = None,
+        agent_setup: Optional[AgentSetup] = None,
+        conversation_context: Optional[ConversationContext] = None,
+        span: Optional[Span] = None,
+    ) -> Dict[str, Any]:
+        # Parameters are independent of each other, so sub-agents and dependencies
+        # (and their own parameters, recursively) are resolved concurrently.
+        values = await asyncio.gather(
+            *[
+                cls._resolve_step(
+                    step=step,
+                    handler_params=handler_params,
+                    agent_setup_retriever=agent_setup_retriever,
+                    agent_dependency_registry=agent_dependency_registry,
+                    debug_backend=debug_backend,
+                    agent_setup=agent_setup,
+                    conversation_context=conversation_context,
+                    span=span,
+                )
+                for step in plan
+            ]
+        )
+        return {step.param_name: value for step, value in zip(plan, values)}
+
     @classmethod
     async def create(
         cls,
@@ -278,21 +419,18 @@ class ChatAgentFactory:
             raise ValueError(f"Unknown agent: {agent_name}")
 
         agent_cls = cls.registry[agent_name]
-        agent_cls_params = inspect.signature(agent_cls).parameters
-        agent_cls_param_values = {
-            param_name: await cls._parse_value(
-                param=param,
-                param_name=param_name,
-                handler_params=handler_params,
-                agent_setup_retriever=agent_setup_retriever,
-                agent_dependency_registry=agent_dependency_registry,
-                debug_backend=debug_backend,
-                agent_setup=agent_setup,
-                conversation_context=conversation_context,
-                span=span,
-            )
-            for param_name, param in agent_cls_params.items()
-        }
+        agent_cls_param_values = await cls._resolve_plan(
+            plan=cls._compile_plan(
+                target=agent_cls, agent_dependency_registry=agent_dependency_registry
+            ),
+            handler_params=handler_params,
+            agent_setup_retriever=agent_setup_retriever,
+            agent_dependency_registry=agent_dependency_registry,
+            debug_backend=debug_backend,
+            agent_setup=agent_setup,
+            conversation_context=conversation_context,
+            span=span,
+        )
         agent_instance = agent_cls(**agent_cls_param_values)
         if span:
             span_agent_params = {
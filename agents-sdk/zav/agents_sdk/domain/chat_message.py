@@ -88,3 +88,75 @@ class ChatMessage(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class ChatStreamMode(str, enum.Enum):
+    FULL = "full"
+    DELTA = "delta"
+
+
+class ChatMessageDelta(BaseModel):
+    """The changes of a streamed chat message since the previous stream event.
+
+    `content_delta` is the text appended to the content. `content` is only set
+    when the content changed in any other way and replaces it. Every other field
+    is only set when it changed, to None when it was cleared, and
+    `changes_json` sends cleared fields as nulls and leaves unchanged ones out.
+    """
+
+    sender: Optional[ChatMessageSender] = None
+    content_delta: Optional[str] = None
+    content: Optional[str] = None
+    content_parts: Optional[List[ContentPart]] = None
+    image_uri: Optional[str] = None
+    function_call_request: Optional[FunctionCallRequest] = None
+    evidences: Optional[List[ChatMessageEvidence]] = None
+    function_specs: Optional[FunctionSpec] = None
+
+    @classmethod
+    def from_messages(
+        cls, previous: Optional[ChatMessage], current: ChatMessage
+    ) -> "ChatMessageDelta":
+        if previous is None:
+            fields = dict(
+                sender=current.sender,
+                content_delta=current.content,
+                content_parts=current.content_parts,
+                image_uri=current.image_uri,
+                function_call_request=current.function_call_request,
+                evidences=current.evidences,
+                function_specs=current.function_specs,
+            )
+            return cls(**{k: v for k, v in fields.items() if v is not None})
+
+        def changed(field: str) -> bool:
+            previous_value = getattr(previous, field)
+            current_value = getattr(current, field)
+            return previous_value is not current_value and (
+                previous_value != current_value
+            )
+
+        delta = cls()
+        if current.content.startswith(previous.content):
+            if len(current.content) > len(previous.content):
+                delta.content_delta = current.content[len(previous.content) :]
+        else:
+            delta.content = current.content
+        if current.sender != previous.sender:
+            delta.sender = current.sender
+        for field in (
+            "content_parts",
+            "image_uri",
+            "function_call_request",
+            "evidences",
+            "function_specs",
+        ):
+            if changed(field):
+                setattr(delta, field, getattr(current, field))
+        return delta
+
+    def is_empty(self) -> bool:
+        return not self.__fields_set__
+
+    def changes_json(self) -> str:
+        return self.json(include=set(self.__fields_set__))
@@ -1,4 +1,5 @@
-from typing import Any, Callable, List, Optional, Type
+import random
+from typing import Any, AsyncGenerator, Callable, List, Optional, Type
 
 from zav.llm_tracing import Span, Trace, TracingBackendFactory
 from zav.message_bus import (  # noqa
@@ -17,7 +18,7 @@ from zav.agents_sdk.domain.chat_message import (
 from zav.agents_sdk.domain.chat_message import (
     FunctionCallRequest as DomainFunctionCallRequest,
 )
-from zav.agents_sdk.domain.chat_message import FunctionSpec
+from zav.agents_sdk.domain.chat_message import ChatStreamMode, FunctionSpec
 from zav.agents_sdk.domain.chat_request import ChatRequest
 from zav.agents_sdk.domain.request_headers import RequestHeaders
 from zav.agents_sdk.handlers import commands
@@ -37,10 +38,11 @@ def init_span(
         tracing_vendor_config = getattr(
             tracing_config.vendor_configuration, tracing_vendor, None
         )
-        tracing_backend = tracing_backend_factory.create(
+        tracing_backend = tracing_backend_factory.get_or_create(
             vendor_name=tracing_vendor,
             config=tracing_vendor_config.dict() if tracing_vendor_config else {},
         )
+        sampling = tracing_config.sampling
         span = Trace(tracing_backend=tracing_backend).new(
             name="agent-response",
             attributes={
@@ -55,11 +57,28 @@ def init_span(
                     else {}
                 ),
             },
+            sampled=(
+                sampling is None
+                or random.random()
+                < sampling.sample_rate_for(tenant, chat_request.agent_identifier)
+            ),
+            sample_on_error=sampling is not None and sampling.always_sample_errors,
         )
 
     return span
 
 
+async def trace_stream_errors(
+    chat_agent_response: AsyncGenerator, span: Span
+) -> AsyncGenerator:
+    try:
+        async for item in chat_agent_response:
+            yield item
+    except Exception as e:
+        span.end_with_error(e)
+        raise
+
+
 @CommandHandlerRegistry.register(commands.CreateChatResponse)
 async def handle_create(
     cmd: commands.CreateChatResponse,
@@ -85,25 +104,34 @@ async def handle_create(
         index_id=cmd.index_id,
     )
 
-    chat_agent = await chat_agent_factory.create(
-        agent_name=agent_setup.agent_name,
-        agent_setup_retriever=agent_setup_retriever,
-        agent_dependency_registry=agent_dependency_registry,
-        debug_backend=debug_backend,
-        agent_setup=agent_setup,
-        handler_params={
-            **({"tenant": cmd.tenant} if cmd.tenant else {}),
-            **({"request_headers": cmd.request_headers} if cmd.request_headers else {}),
-            **({"index_id": cmd.index_id} if cmd.index_id else {}),
-            **(cmd.chat_request.bot_params if cmd.chat_request.bot_params else {}),
-        },
-        conversation_context=cmd.chat_request.conversation_context,
-        span=span,
-    )
+    try:
+        chat_agent = await chat_agent_factory.create(
+            agent_name=agent_setup.agent_name,
+            agent_setup_retriever=agent_setup_retriever,
+            agent_dependency_registry=agent_dependency_registry,
+            debug_backend=debug_backend,
+            agent_setup=agent_setup,
+            handler_params={
+                **({"tenant": cmd.tenant} if cmd.tenant else {}),
+                **(
+                    {"request_headers": cmd.request_headers}
+                    if cmd.request_headers
+                    else {}
+                ),
+                **({"index_id": cmd.index_id} if cmd.index_id else {}),
+                **(cmd.chat_request.bot_params if cmd.chat_request.bot_params else {}),
+            },
+            conversation_context=cmd.chat_request.conversation_context,
+            span=span,
+        )
 
-    chat_agent_response = await chat_agent.execute(
-        conversation=cmd.chat_request.conversation
-    )
+        chat_agent_response = await chat_agent.execute(
+            conversation=cmd.chat_request.conversation
+        )
+    except Exception as e:
+        if span is not None:
+            span.end_with_error(e)
+        raise
     if not chat_agent_response:
         return cmd.chat_request
 
@@ -168,29 +196,45 @@ async def handle_create_stream(
         index_id=cmd.index_id,
     )
 
-    chat_agent = await chat_agent_factory.create_streamable(
-        agent_name=agent_setup.agent_name,
-        agent_setup_retriever=agent_setup_retriever,
-        agent_dependency_registry=agent_dependency_registry,
-        debug_backend=debug_backend,
-        agent_setup=agent_setup,
-        handler_params={
-            **({"tenant": cmd.tenant} if cmd.tenant else {}),
-            **({"request_headers": cmd.request_headers} if cmd.request_headers else {}),
-            **({"index_id": cmd.index_id} if cmd.index_id else {}),
-            **(cmd.chat_request.bot_params if cmd.chat_request.bot_params else {}),
-        },
-        conversation_context=cmd.chat_request.conversation_context,
-        span=span,
-    )
-
     try:
-        chat_agent_response = chat_agent.execute_streaming(
-            conversation=cmd.chat_request.conversation
+        chat_agent = await chat_agent_factory.create_streamable(
+            agent_name=agent_setup.agent_name,
+            agent_setup_retriever=agent_setup_retriever,
+            agent_dependency_registry=agent_dependency_registry,
+            debug_backend=debug_backend,
+            agent_setup=agent_setup,
+            handler_params={
+                **({"tenant": cmd.tenant} if cmd.tenant else {}),
+                **(
+                    {"request_headers": cmd.request_headers}
+                    if cmd.request_headers
+                    else {}
+                ),
+                **({"index_id": cmd.index_id} if cmd.index_id else {}),
+                **(cmd.chat_request.bot_params if cmd.chat_request.bot_params else {}),
+            },
+            conversation_context=cmd.chat_request.conversation_context,
+            span=span,
         )
+    except Exception as e:
+        if span is not None:
+            span.end_with_error(e)
+        raise
+
+    try:
+        if cmd.stream_mode == ChatStreamMode.DELTA:
+            chat_agent_response = chat_agent.execute_streaming_delta(
+                conversation=cmd.chat_request.conversation
+            )
+        else:
+            chat_agent_response = chat_agent.execute_streaming(
+                conversation=cmd.chat_request.conversation
+            )
     except NotImplementedError:
         raise NotImplementedError(
             f"The agent {agent_setup.agent_name} does not support streaming yet."
         )
 
+    if span is not None:
+        return trace_stream_errors(chat_agent_response, span)
     return chat_agent_response
@@ -3,7 +3,7 @@ from typing import Optional
 
 from zav.message_bus import Command
 
-from zav.agents_sdk.domain import ChatRequest, RequestHeaders
+from zav.agents_sdk.domain import ChatRequest, ChatStreamMode, RequestHeaders
 
 
 @dataclass
@@ -20,3 +20,4 @@ class CreateChatStream(Command):
     request_headers: RequestHeaders
     chat_request: ChatRequest
     index_id: Optional[str] = None
+    stream_mode: ChatStreamMode = ChatStreamMode.FULL
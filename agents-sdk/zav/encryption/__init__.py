@@ -13,3 +13,4 @@ from zav.encryption.configuration import (
 )
 from zav.encryption.encrypter import AbstractEncrypter, EncrypterConfiguration
 from zav.encryption.envelope import CipherWrapper
+from zav.encryption.fingerprint import credential_fingerprint
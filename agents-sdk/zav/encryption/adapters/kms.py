@@ -1,25 +1,12 @@
-import asyncio
 import base64
-import functools
-from concurrent.futures import ThreadPoolExecutor
 
 import boto3
+from zav.executors import force_async
 
 from zav.encryption.configuration.kms import KmsConfiguration
 from zav.encryption.encrypter import AbstractEncrypter, EncrypterFactory
 
 
-def force_async(fn):
-    pool = ThreadPoolExecutor()
-
-    @functools.wraps(fn)
-    def wrapper(*args, **kwargs):
-        future = pool.submit(fn, *args, **kwargs)
-        return asyncio.wrap_future(future)  # make it awaitable
-
-    return wrapper
-
-
 @EncrypterFactory.register("kms")
 class KmsEncrypter(AbstractEncrypter):
     def __init__(self, kms: KmsConfiguration, **_rest):
@@ -0,0 +1,9 @@
+import hashlib
+from typing import Optional
+
+
+def credential_fingerprint(*credentials: Optional[str]) -> str:
+    """Hash credentials so that they can be part of a key without being kept."""
+    return hashlib.sha256(
+        "\x00".join(credential or "" for credential in credentials).encode()
+    ).hexdigest()
@@ -0,0 +1,7 @@
+# flake8: noqa
+from zav.executors.thread_pool import (
+    SharedThreadPool,
+    ThreadPoolMetrics,
+    force_async,
+    shared_thread_pool,
+)
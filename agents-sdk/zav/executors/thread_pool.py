@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass
+class ThreadPoolMetrics:
+    max_workers: int
+    threads: int
+    running: int
+    queue_depth: int
+
+
+class SharedThreadPool:
+    """A lazily started, bounded thread pool shared by all sync-to-async wrappers.
+
+    The underlying executor is created on first use, so the pool can be shut down
+    at application shutdown and transparently restarted if it is used again.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.__max_workers = max_workers
+        self.__thread_name_prefix = thread_name_prefix
+        self.__executor: Optional[ThreadPoolExecutor] = None
+        self.__lock = threading.Lock()
+        self.__submitted = 0
+        self.__started = 0
+        self.__finished = 0
+
+    def configure(
+        self,
+        max_workers: Optional[int] = None,
+        thread_name_prefix: Optional[str] = None,
+    ):
+        """Update the pool settings. They take effect the next time the pool starts."""
+        if max_workers is not None:
+            if max_workers <= 0:
+                raise ValueError("max_workers must be greater than 0")
+            self.__max_workers = max_workers
+        if thread_name_prefix is not None:
+            self.__thread_name_prefix = thread_name_prefix
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(
+                    max_workers=self.__max_workers,
+                    thread_name_prefix=self.__thread_name_prefix,
+                )
+            return self.__executor
+
+    def __run(self, fn: Callable, *args, **kwargs):
+        with self.__lock:
+            self.__started += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self.__lock:
+                self.__finished += 1
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        future = self.executor.submit(self.__run, fn, *args, **kwargs)
+        with self.__lock:
+            self.__submitted += 1
+        return future
+
+    def metrics(self) -> ThreadPoolMetrics:
+        with self.__lock:
+            return ThreadPoolMetrics(
+                max_workers=self.__max_workers,
+                threads=(
+                    len(self.__executor._threads)  # type: ignore
+                    if self.__executor is not None
+                    else 0
+                ),
+                running=self.__started - self.__finished,
+                queue_depth=max(self.__submitted - self.__started, 0),
+            )
+
+    async def shutdown(self):
+        with self.__lock:
+            executor, self.__executor = self.__executor, None
+        if executor is not None:
+            # Waiting for in-flight work must not block the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(executor.shutdown, wait=True)
+            )
+
+
+shared_thread_pool = SharedThreadPool(
+    max_workers=int(
+        os.getenv("ZAV_THREAD_POOL_MAX_WORKERS", min(32, (os.cpu_count() or 1) + 4))
+    ),
+    thread_name_prefix=os.getenv("ZAV_THREAD_POOL_THREAD_NAME_PREFIX", "zav-worker"),
+)
+
+
+def force_async(fn):
+    """Turns a sync function to async function using the shared thread pool."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        future = shared_thread_pool.submit(fn, *args, **kwargs)
+        return asyncio.wrap_future(future)  # make it awaitable
+
+    return wrapper
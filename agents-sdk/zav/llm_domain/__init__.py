@@ -1,19 +1,29 @@
 from zav.llm_domain.llm_client_configuration import (
     AnthropicConfiguration,
+    FailoverConfiguration,
     LLMClientConfiguration,
     LLMModelConfiguration,
     LLMModelType,
     LLMProviderName,
     LLMVendorConfiguration,
     OpenAIConfiguration,
+    PromptBatchingConfiguration,
+    RateLimitConfiguration,
+    ResponseCacheConfiguration,
+    TokenBudgetConfiguration,
 )
 
 __all__ = [
     "AnthropicConfiguration",
+    "FailoverConfiguration",
     "LLMClientConfiguration",
     "LLMModelConfiguration",
     "LLMModelType",
     "LLMProviderName",
     "LLMVendorConfiguration",
     "OpenAIConfiguration",
+    "PromptBatchingConfiguration",
+    "RateLimitConfiguration",
+    "ResponseCacheConfiguration",
+    "TokenBudgetConfiguration",
 ]
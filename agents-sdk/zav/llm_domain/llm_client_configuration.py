@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Literal, Optional, Union
+from typing import List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field, root_validator
 from typing_extensions import TypedDict
@@ -47,6 +47,66 @@ class LLMVendorConfiguration(BaseModel):
         return v
 
 
+class PromptBatchingConfiguration(BaseModel):
+    """Packing of prompts into multi-prompt completion requests.
+
+    A batch is closed once it holds `max_batch_size` prompts or once its estimated
+    token count (prompt tokens plus `max_tokens` per prompt) would exceed
+    `max_batch_tokens`.
+    """
+
+    max_batch_size: int = Field(default=20, gt=0)
+    max_batch_tokens: Optional[int] = Field(default=None, gt=0)
+    max_concurrent_batches: int = Field(default=4, gt=0)
+
+
+class ResponseCacheConfiguration(BaseModel):
+    """Exact-match cache of the responses of a model.
+
+    Responses are kept in an in-memory LRU of `max_entries` and, when
+    `storage_backend` and `storage_url` (e.g. s3://bucket/llm-cache) are set, also
+    in object storage. Only the first `max_stream_chunks` chunks of a streamed
+    response, plus the final one, are kept for replay.
+    """
+
+    max_entries: int = Field(default=1024, gt=0)
+    storage_backend: Optional[str] = None
+    storage_url: Optional[str] = None
+    max_stream_chunks: int = Field(default=32, gt=0)
+
+
+class TokenBudgetConfiguration(BaseModel):
+    """Local check of the size of a chat request before it is sent.
+
+    Requests whose estimated prompt tokens plus `max_tokens` exceed `context_window`
+    fail without a round-trip, unless `trim_conversation` is set, in which case the
+    oldest messages of the conversation are dropped until the request fits.
+    """
+
+    context_window: int = Field(gt=0)
+    trim_conversation: bool = False
+
+
+class RateLimitConfiguration(BaseModel):
+    """Adaptive concurrency of the calls to a model deployment.
+
+    Concurrency starts at `initial_concurrency`, grows by about `increase_step` for
+    every round of successful calls and is multiplied by `decrease_factor` on rate
+    limit (429) and overload (529) responses, within `min_concurrency` and
+    `max_concurrency`. Rejected calls are queued again until the limit resets, up
+    to `max_retries` times. All the clients of a deployment share one limiter,
+    configured by the first of them.
+    """
+
+    initial_concurrency: int = Field(default=8, gt=0)
+    min_concurrency: int = Field(default=1, gt=0)
+    max_concurrency: int = Field(default=64, gt=0)
+    increase_step: float = Field(default=1.0, gt=0)
+    decrease_factor: float = Field(default=0.5, gt=0, lt=1)
+    max_retries: int = Field(default=3, ge=0)
+    default_retry_after: float = Field(default=1.0, gt=0)
+
+
 class LLMModelConfiguration(BaseModel):
     name: str
     type: LLMModelType
@@ -54,6 +114,10 @@ class LLMModelConfiguration(BaseModel):
     json_output: bool = False
     max_tokens: Optional[int] = None
     interleave_system_message: Optional[str] = None
+    prompt_batching: Optional[PromptBatchingConfiguration] = None
+    response_cache: Optional[ResponseCacheConfiguration] = None
+    token_budget: Optional[TokenBudgetConfiguration] = None
+    rate_limit: Optional[RateLimitConfiguration] = None
 
 
 class PromptModelParams(TypedDict):
@@ -87,6 +151,7 @@ class LLMClientConfiguration(BaseModel):
         default_factory=LLMVendorConfiguration
     )
     model_configuration: LLMModelConfiguration
+    failover: Optional["FailoverConfiguration"] = None
 
     @classmethod
     def from_env_vars(
@@ -120,3 +185,21 @@ class LLMClientConfiguration(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class FailoverConfiguration(BaseModel):
+    """Backends to fall back to when the model of the configuration fails.
+
+    Backends are tried in order after the model of the configuration itself, on any
+    error (including PromptTooLargeError, e.g. to move to a larger context model).
+    When `hedge_delay` is set, the next backend is also called if the current ones
+    have not produced a response (or the first chunk of a stream) after that many
+    seconds. The first successful response is used and the others are cancelled.
+    Only chat clients support failover.
+    """
+
+    backends: List[LLMClientConfiguration] = Field(default_factory=list)
+    hedge_delay: Optional[float] = Field(default=None, gt=0)
+
+
+LLMClientConfiguration.update_forward_refs()
@@ -1,14 +1,25 @@
 from zav.llm_tracing.adapters import TracingBackendFactory
+from zav.llm_tracing.batching_exporter import BatchingTracingBackend, ExporterMetrics
 from zav.llm_tracing.instrumented import Instrumented, instrument_instance
-from zav.llm_tracing.trace import Span, SpanContext, SpanEvent, Trace, now
+from zav.llm_tracing.trace import (
+    NoOpSpan,
+    Span,
+    SpanContext,
+    SpanEvent,
+    Trace,
+    now,
+)
 
 __all__ = [
     "Span",
+    "NoOpSpan",
     "SpanContext",
     "SpanEvent",
     "Trace",
     "Instrumented",
     "instrument_instance",
     "TracingBackendFactory",
+    "BatchingTracingBackend",
+    "ExporterMetrics",
     "now",
 ]
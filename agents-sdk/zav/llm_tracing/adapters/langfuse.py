@@ -1,6 +1,7 @@
-from typing import Dict, Optional, Union
+from typing import MutableMapping, Optional, Union
 
 import httpx
+from cachetools import TTLCache
 from langfuse import Langfuse
 from langfuse.client import (
     StatefulGenerationClient,
@@ -30,6 +31,9 @@ class LangfuseTracingBackend(TracingBackend):
         httpx_client: Optional[httpx.Client] = None,
         enabled: Optional[bool] = True,
         sample_rate: Optional[float] = None,
+        max_observations: int = 10000,
+        observation_ttl: float = 3600,
+        ended_observation_ttl: float = 60,
     ):
         """Configure the Langfuse client.
 
@@ -54,6 +58,11 @@ class LangfuseTracingBackend(TracingBackend):
             enabled: Enables or disables the Langfuse client.
             sample_rate: Sampling rate for tracing. If set to 0.2, only 20% of the
                 data will be sent to the backend.
+            max_observations: Max number of observation clients kept in memory.
+            observation_ttl: Seconds after its last update that an observation
+                which never ends is dropped.
+            ended_observation_ttl: Seconds an ended observation is kept around to
+                accept late updates.
         """
         self.langfuse = Langfuse(
             public_key=public_key,
@@ -71,10 +80,48 @@ class LangfuseTracingBackend(TracingBackend):
             enabled=enabled,
             sample_rate=sample_rate,
         )
-        self.__observations_map: Dict[
+        # Observations are moved to the ended map once their span ends, and both
+        # maps evict the least recently used entries and the expired ones.
+        self.__observations_map: MutableMapping[
             str,
             Union[StatefulSpanClient, StatefulGenerationClient, StatefulTraceClient],
-        ] = {}
+        ] = TTLCache(maxsize=max_observations, ttl=observation_ttl)
+        self.__ended_observations_map: MutableMapping[
+            str,
+            Union[StatefulSpanClient, StatefulGenerationClient, StatefulTraceClient],
+        ] = TTLCache(maxsize=max_observations, ttl=ended_observation_ttl)
+
+    @property
+    def observations_map_size(self) -> int:
+        """Number of observation clients currently kept in memory."""
+        for observations_map in (
+            self.__observations_map,
+            self.__ended_observations_map,
+        ):
+            observations_map.expire()  # type: ignore
+        return len(self.__observations_map) + len(self.__ended_observations_map)
+
+    def __store_observation(
+        self,
+        span: Span,
+        observation: Union[
+            StatefulSpanClient, StatefulGenerationClient, StatefulTraceClient
+        ],
+    ):
+        # The update of an ended span is already enqueued, so the observation
+        # client is only kept for a short while in case of late updates
+        if span.end_time is not None:
+            self.__observations_map.pop(span.context.span_id, None)
+            self.__ended_observations_map[span.context.span_id] = observation
+        else:
+            # Re-inserting refreshes the ttl of spans that are still active
+            self.__observations_map[span.context.span_id] = observation
+
+    def flush(self):
+        self.langfuse.flush()
+
+    def shutdown(self):
+        self.langfuse.shutdown()
 
     def handle_new_trace(self, span: Span):
         observation = self.langfuse.trace(
@@ -96,7 +143,7 @@ class LangfuseTracingBackend(TracingBackend):
                 if k not in {"input", "output", "metadata", "tags"}
             },
         )
-        self.__observations_map[span.context.span_id] = observation
+        self.__store_observation(span, observation)
 
     def handle_new(self, span: Span):
         observation_type = span.attributes.get("observation_type")
@@ -166,10 +213,12 @@ class LangfuseTracingBackend(TracingBackend):
                     }
                 },
             )
-        self.__observations_map[span.context.span_id] = observation
+        self.__store_observation(span, observation)
 
     def handle_update(self, span: Span):
-        observation = self.__observations_map.get(span.context.span_id)
+        observation = self.__observations_map.get(
+            span.context.span_id
+        ) or self.__ended_observations_map.get(span.context.span_id)
         if not observation:
             return
 
@@ -251,6 +300,7 @@ class LangfuseTracingBackend(TracingBackend):
                     if k not in {"input", "output", "metadata", "tags"}
                 },
             )
+        self.__store_observation(span, observation)
 
     def handle_event(self, span: Span):
         last_event = span.events[-1]
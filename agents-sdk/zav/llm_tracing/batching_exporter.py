@@ -0,0 +1,124 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional, Tuple
+
+from zav.logging import logger
+
+from zav.llm_tracing.trace import Span, TracingBackend
+
+SpanRecord = Tuple[str, Span]
+
+
+@dataclass
+class ExporterMetrics:
+    queue_depth: int
+    exported: int
+    dropped: int
+    failed: int
+
+
+class BatchingTracingBackend(TracingBackend):
+    """Hands the span operations over to a backend from a background thread.
+
+    Span operations only append a snapshot of the span to a buffer of at most
+    `max_queue_size` records, so that the backend work stays off the request path.
+    Records that do not fit are dropped and counted. The thread exports the records
+    in batches of `batch_size`, at least every `schedule_delay` seconds, and
+    `flush` and `shutdown` export what is left.
+    """
+
+    def __init__(
+        self,
+        tracing_backend: TracingBackend,
+        max_queue_size: int = 2048,
+        batch_size: int = 256,
+        schedule_delay: float = 1.0,
+    ):
+        if max_queue_size <= 0 or batch_size <= 0:
+            raise ValueError("max_queue_size and batch_size must be greater than 0")
+        self.tracing_backend = tracing_backend
+        self.__max_queue_size = max_queue_size
+        self.__batch_size = batch_size
+        self.__schedule_delay = schedule_delay
+        self.__records: Deque[SpanRecord] = deque()
+        self.__exported = 0
+        self.__dropped = 0
+        self.__failed = 0
+        self.__wake_up = threading.Event()
+        self.__export_lock = threading.Lock()
+        self.__start_lock = threading.Lock()
+        self.__thread: Optional[threading.Thread] = None
+        self.__stopped = False
+
+    def metrics(self) -> ExporterMetrics:
+        return ExporterMetrics(
+            queue_depth=len(self.__records),
+            exported=self.__exported,
+            dropped=self.__dropped,
+            failed=self.__failed,
+        )
+
+    def __enqueue(self, handler_name: str, span: Span):
+        if self.__stopped or len(self.__records) >= self.__max_queue_size:
+            self.__dropped += 1
+            return
+        self.__records.append((handler_name, span.snapshot()))
+        if self.__thread is None:
+            self.__start()
+        if len(self.__records) >= self.__batch_size:
+            self.__wake_up.set()
+
+    def __start(self):
+        with self.__start_lock:
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    target=self.__run, name="tracing-exporter", daemon=True
+                )
+                self.__thread.start()
+
+    def __run(self):
+        while not self.__stopped:
+            self.__wake_up.wait(timeout=self.__schedule_delay)
+            self.__wake_up.clear()
+            self.__export()
+
+    def __export(self):
+        with self.__export_lock:
+            while self.__records:
+                batch: List[SpanRecord] = []
+                while self.__records and len(batch) < self.__batch_size:
+                    batch.append(self.__records.popleft())
+                for handler_name, span in batch:
+                    try:
+                        getattr(self.tracing_backend, handler_name)(span)
+                        self.__exported += 1
+                    except Exception:
+                        self.__failed += 1
+                        logger.exception(
+                            f"Failed to export span {span.name} with {handler_name}"
+                        )
+
+    def handle_new_trace(self, span: Span):
+        self.__enqueue("handle_new_trace", span)
+
+    def handle_new(self, span: Span):
+        self.__enqueue("handle_new", span)
+
+    def handle_update(self, span: Span):
+        self.__enqueue("handle_update", span)
+
+    def handle_event(self, span: Span):
+        self.__enqueue("handle_event", span)
+
+    def flush(self):
+        self.__export()
+        self.tracing_backend.flush()
+
+    def shutdown(self):
+        self.__stopped = True
+        self.__wake_up.set()
+        if self.__thread is not None:
+            self.__thread.join()
+        self.__export()
+        self.tracing_backend.shutdown()
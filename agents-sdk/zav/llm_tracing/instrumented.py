@@ -1,15 +1,113 @@
+import dataclasses
 import inspect
-import json
-from typing import Any, Generic, TypeVar, cast
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar, cast
 
+from pydantic import BaseModel
 from pydantic.json import pydantic_encoder
 
 from zav.llm_tracing.trace import Span
 
 T_ = TypeVar("T_")
 
+# Limits of the inputs and outputs recorded on the spans, so that the cost of
+# recording them does not grow with the size of the payloads
+MAX_STRING_LENGTH = 2000
+MAX_ITEMS = 50
+MAX_DEPTH = 6
+
+
+class CallKind(str, Enum):
+    SYNC = "sync"
+    COROUTINE = "coroutine"
+    ASYNC_GENERATOR = "async_generator"
+
+
+@lru_cache(maxsize=1024)
+def _call_plan(
+    function: Callable, bound: bool
+) -> Tuple[Optional[inspect.Signature], CallKind]:
+    if inspect.iscoroutinefunction(function):
+        kind = CallKind.COROUTINE
+    elif inspect.isasyncgenfunction(function):
+        kind = CallKind.ASYNC_GENERATOR
+    else:
+        kind = CallKind.SYNC
+    try:
+        signature = inspect.signature(function)
+    except (TypeError, ValueError):
+        return None, kind
+    if bound:
+        signature = signature.replace(
+            parameters=list(signature.parameters.values())[1:]
+        )
+    return signature, kind
+
+
+def call_plan(method: Callable) -> Tuple[Optional[inspect.Signature], CallKind]:
+    """Signature and kind of the method, computed once per function."""
+    function = getattr(method, "__func__", None)
+    if function is not None:
+        return _call_plan(function, True)
+    try:
+        return _call_plan(method, False)
+    except TypeError:
+        # Unhashable callables
+        return _call_plan.__wrapped__(method, False)  # type: ignore
+
+
+def capped(value: Any, depth: int = 0) -> Any:
+    """JSON compatible copy of the value, truncated to the recording limits."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        if len(value) > MAX_STRING_LENGTH:
+            return f"{value[:MAX_STRING_LENGTH]}... ({len(value)} characters)"
+        return value
+    if depth >= MAX_DEPTH:
+        return f"<{type(value).__name__}>"
+    if isinstance(value, Enum):
+        return capped(value.value, depth)
+    if isinstance(value, BaseModel):
+        # Iterating over a model yields its fields without converting them
+        return capped(dict(value), depth)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return capped(
+            {
+                field.name: getattr(value, field.name)
+                for field in dataclasses.fields(value)
+            },
+            depth,
+        )
+    if isinstance(value, dict):
+        items: Dict[str, Any] = {}
+        for index, (key, item) in enumerate(value.items()):
+            if index == MAX_ITEMS:
+                items["..."] = f"{len(value) - MAX_ITEMS} more items"
+                break
+            items[str(key)] = capped(item, depth + 1)
+        return items
+    if isinstance(value, (list, tuple, set, frozenset)):
+        head = [item for _, item in zip(range(MAX_ITEMS), value)]
+        items_list = [capped(item, depth + 1) for item in head]
+        if len(value) > MAX_ITEMS:
+            items_list.append(f"... {len(value) - MAX_ITEMS} more items")
+        return items_list
+    try:
+        return capped(pydantic_encoder(value), depth + 1)
+    except TypeError:
+        return capped(repr(value), depth)
+
 
 class Instrumented(Generic[T_]):
+    """Records a span for every public method called on the wrapped instance.
+
+    Nothing is recorded when the span is falsy, e.g. for traces that are not
+    sampled. Spans of coroutines end when they are awaited and spans of async
+    generators when they are exhausted.
+    """
+
     def __init__(self, instance, span: Span):
         self.instance = instance
         self.span = span
@@ -20,35 +118,69 @@ class Instrumented(Generic[T_]):
         if name.startswith("__") or name.startswith("_"):
             return original_attr
 
-        if callable(original_attr):
-            qualified_name = original_attr.__qualname__.replace(".", "_")
+        if not callable(original_attr) or not self.span:
+            return original_attr
+
+        qualified_name = original_attr.__qualname__.replace(".", "_")
+        signature, kind = call_plan(original_attr)
 
-            def new_func(*args, **kwargs):
-                sig = inspect.signature(original_attr)
-                bound_args = sig.bind(*args, **kwargs)
+        def start_span(args, kwargs) -> Span:
+            if signature is None:
+                inputs: Dict[str, Any] = {"args": args, "kwargs": kwargs}
+            else:
+                bound_args = signature.bind(*args, **kwargs)
                 bound_args.apply_defaults()
-                # Code to run before the actual method call
-                observation = self.span.new(
-                    name=qualified_name,
-                    attributes={
-                        "input": json.loads(
-                            json.dumps(
-                                dict(bound_args.arguments), default=pydantic_encoder
-                            )
-                        )
-                    },
-                )
-
-                # Call the original method
-                result = original_attr(*args, **kwargs)
+                inputs = bound_args.arguments
+            return self.span.new(
+                name=qualified_name, attributes={"input": capped(dict(inputs))}
+            )
 
-                # Code to run after the actual method call
-                observation.end(attributes={"output": result})
+        if kind == CallKind.COROUTINE:
+
+            async def new_coroutine(*args, **kwargs):
+                observation = start_span(args, kwargs)
+                try:
+                    result = await original_attr(*args, **kwargs)
+                except Exception as e:
+                    observation.end_with_error(e)
+                    raise
+                observation.end(attributes={"output": capped(result)})
                 return result
 
-            return new_func
-        else:
-            return original_attr
+            return new_coroutine
+
+        if kind == CallKind.ASYNC_GENERATOR:
+
+            async def new_async_generator(*args, **kwargs):
+                observation = start_span(args, kwargs)
+                outputs = []
+                try:
+                    async for item in original_attr(*args, **kwargs):
+                        if len(outputs) < MAX_ITEMS:
+                            outputs.append(capped(item))
+                        yield item
+                except Exception as e:
+                    observation.end_with_error(e)
+                    raise
+                except BaseException:
+                    # Closed before being exhausted, or cancelled
+                    observation.end(attributes={"output": outputs})
+                    raise
+                observation.end(attributes={"output": outputs})
+
+            return new_async_generator
+
+        def new_func(*args, **kwargs):
+            observation = start_span(args, kwargs)
+            try:
+                result = original_attr(*args, **kwargs)
+            except Exception as e:
+                observation.end_with_error(e)
+                raise
+            observation.end(attributes={"output": capped(result)})
+            return result
+
+        return new_func
 
 
 def instrument_instance(instance: T_, span: Span) -> T_:
@@ -1,9 +1,12 @@
 import uuid
 from abc import ABC, abstractmethod
+from collections import deque
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, Iterable, Optional
 
-from pydantic import BaseModel, Field
+# Events kept per span. Older events are dropped, after having been handed to the
+# tracing backend.
+MAX_SPAN_EVENTS = 100
 
 
 def now():
@@ -14,16 +17,77 @@ def new_id():
     return str(uuid.uuid4())
 
 
-class SpanContext(BaseModel):
-    trace_id: str = Field(default_factory=new_id)
-    span_id: str = Field(default_factory=new_id)
-    trace_state: Dict[str, Any] = Field(default_factory=dict)
+class SpanContext:
+    """Identifiers of a span. Ids that are not given are generated on first use."""
 
+    __slots__ = ("_trace_id", "_span_id", "trace_state")
 
-class SpanEvent(BaseModel):
-    name: str
-    timestamp: datetime = Field(default_factory=now)
-    attributes: Dict[str, Any] = Field(default_factory=dict)
+    def __init__(
+        self,
+        trace_id: Optional[str] = None,
+        span_id: Optional[str] = None,
+        trace_state: Optional[Dict[str, Any]] = None,
+    ):
+        self._trace_id = trace_id
+        self._span_id = span_id
+        self.trace_state: Dict[str, Any] = {} if trace_state is None else trace_state
+
+    @property
+    def trace_id(self) -> str:
+        if self._trace_id is None:
+            self._trace_id = new_id()
+        return self._trace_id
+
+    @trace_id.setter
+    def trace_id(self, trace_id: str):
+        self._trace_id = trace_id
+
+    @property
+    def span_id(self) -> str:
+        if self._span_id is None:
+            self._span_id = new_id()
+        return self._span_id
+
+    @span_id.setter
+    def span_id(self, span_id: str):
+        self._span_id = span_id
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "trace_state": self.trace_state,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"SpanContext(trace_id={self._trace_id!r}, span_id={self._span_id!r}, "
+            f"trace_state={self.trace_state!r})"
+        )
+
+
+class SpanEvent:
+    __slots__ = ("name", "timestamp", "attributes")
+
+    def __init__(
+        self,
+        name: str,
+        timestamp: Optional[datetime] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.timestamp = timestamp or now()
+        self.attributes: Dict[str, Any] = {} if attributes is None else attributes
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "attributes": self.attributes,
+        }
+
+    def __repr__(self) -> str:
+        return f"SpanEvent(name={self.name!r}, timestamp={self.timestamp!r})"
 
 
 class TracingBackend(ABC):
@@ -43,19 +107,55 @@ class TracingBackend(ABC):
     def handle_event(self, span: "Span"):
         pass
 
+    def flush(self):
+        """Send all pending tracing data to the vendor."""
+        pass
+
+    def shutdown(self):
+        """Flush pending tracing data and release the resources of the backend."""
+        self.flush()
 
-class Span(BaseModel):
-    name: str
-    context: SpanContext
-    parent_id: Optional[str] = None
-    start_time: datetime = Field(default_factory=now)
-    end_time: Optional[datetime] = None
-    attributes: Dict[str, Any] = Field(default_factory=dict)
-    events: List[SpanEvent] = Field(default_factory=list)
-    tracing_backend: TracingBackend = Field(..., exclude=True)
 
-    class Config:
-        arbitrary_types_allowed = True
+class Span:
+    """A unit of work of a trace.
+
+    Only the last `max_events` events are kept on the span, the older ones are
+    counted in `dropped_events`. Every event is still handed to the tracing backend.
+    """
+
+    __slots__ = (
+        "name",
+        "context",
+        "parent_id",
+        "start_time",
+        "end_time",
+        "attributes",
+        "events",
+        "dropped_events",
+        "tracing_backend",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        context: SpanContext,
+        tracing_backend: TracingBackend,
+        parent_id: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+        events: Optional[Iterable[SpanEvent]] = None,
+        max_events: int = MAX_SPAN_EVENTS,
+    ):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.start_time = start_time or now()
+        self.end_time = end_time
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.events: Deque[SpanEvent] = deque(events or (), maxlen=max_events)
+        self.dropped_events = 0
+        self.tracing_backend = tracing_backend
 
     def new(
         self,
@@ -67,10 +167,10 @@ class Span(BaseModel):
             context=SpanContext(
                 trace_id=self.context.trace_id, trace_state=self.context.trace_state
             ),
-            attributes=attributes or {},
+            attributes=attributes,
             parent_id=self.context.span_id,
-            events=[],
             tracing_backend=self.tracing_backend,
+            max_events=self.events.maxlen or MAX_SPAN_EVENTS,
         )
         self.tracing_backend.handle_new(new_span)
         return new_span
@@ -80,12 +180,15 @@ class Span(BaseModel):
         name: str,
         attributes: Optional[Dict[str, Any]] = None,
     ):
-        self.events.append(SpanEvent(name=name, attributes=attributes or {}))
+        if len(self.events) == self.events.maxlen:
+            self.dropped_events += 1
+        self.events.append(SpanEvent(name=name, attributes=attributes))
         self.tracing_backend.handle_event(self)
         return self
 
     def update(self, attributes: Optional[Dict[str, Any]] = None):
-        self.attributes.update(attributes or {})
+        if attributes:
+            self.attributes.update(attributes)
         self.tracing_backend.handle_update(self)
         return self
 
@@ -93,6 +196,91 @@ class Span(BaseModel):
         self.end_time = now()
         return self.update(attributes)
 
+    def end_with_error(self, error: Exception) -> "Span":
+        return self.end(attributes={"level": "ERROR", "status_message": repr(error)})
+
+    def snapshot(self) -> "Span":
+        """Copy of the span that later updates of the span do not change.
+
+        The copy only keeps the last event, which is the one backends export.
+        """
+        span = Span.__new__(Span)
+        span.name = self.name
+        # The ids are generated now, as the copy may be read from another thread
+        span.context = SpanContext(
+            trace_id=self.context.trace_id,
+            span_id=self.context.span_id,
+            trace_state=self.context.trace_state,
+        )
+        span.parent_id = self.parent_id
+        span.start_time = self.start_time
+        span.end_time = self.end_time
+        span.attributes = dict(self.attributes)
+        span.events = deque(self.events, maxlen=1)
+        span.dropped_events = self.dropped_events
+        span.tracing_backend = self.tracing_backend
+        return span
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "context": self.context.dict(),
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "attributes": self.attributes,
+            "events": [event.dict() for event in self.events],
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(name={self.name!r}, context={self.context!r}, "
+            f"parent_id={self.parent_id!r})"
+        )
+
+
+class NoOpSpan(Span):
+    """Span of a trace that was not sampled.
+
+    It is falsy, so that the tracing code guarded by `if span:` is skipped, and its
+    methods do nothing. With `sample_on_error`, ending it with an error starts a
+    sampled trace to record the error.
+    """
+
+    __slots__ = ("sample_on_error",)
+
+    def __init__(self, *args, sample_on_error: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sample_on_error = sample_on_error
+
+    def __bool__(self) -> bool:
+        return False
+
+    def new(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        return self
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        return self
+
+    def update(self, attributes: Optional[Dict[str, Any]] = None):
+        return self
+
+    def end(self, attributes: Optional[Dict[str, Any]] = None):
+        return self
+
+    def end_with_error(self, error: Exception) -> Span:
+        if not self.sample_on_error:
+            return self
+        return (
+            Trace(tracing_backend=self.tracing_backend)
+            .new(
+                name=self.name,
+                attributes=self.attributes,
+                trace_state=self.context.trace_state,
+            )
+            .end_with_error(error)
+        )
+
 
 class Trace:
     def __init__(self, tracing_backend: TracingBackend):
@@ -103,12 +291,21 @@ class Trace:
         name: str,
         attributes: Optional[Dict[str, Any]] = None,
         trace_state: Optional[Dict[str, Any]] = None,
-    ):
+        sampled: bool = True,
+        sample_on_error: bool = False,
+    ) -> Span:
+        if not sampled:
+            return NoOpSpan(
+                name=name,
+                context=SpanContext(trace_state=trace_state),
+                attributes=attributes,
+                tracing_backend=self.tracing_backend,
+                sample_on_error=sample_on_error,
+            )
         span = Span(
             name=name,
-            context=SpanContext(trace_state=trace_state or {}),
-            attributes=attributes or {},
-            events=[],
+            context=SpanContext(trace_state=trace_state),
+            attributes=attributes,
             tracing_backend=self.tracing_backend,
         )
         self.tracing_backend.handle_new_trace(span)
@@ -1,10 +1,35 @@
-from typing import Callable, Dict, Type
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Tuple, Type
 
+from cachetools import LRUCache
+
+from zav.llm_tracing.batching_exporter import BatchingTracingBackend
 from zav.llm_tracing.trace import TracingBackend
 
 
+class TracingBackendCache(LRUCache):
+    """LRU cache of tracing backends that shuts down the backends it evicts."""
+
+    def popitem(self) -> Tuple[Any, TracingBackend]:
+        key, tracing_backend = super().popitem()
+        # Shutting down flushes and joins the vendor threads, so it should not
+        # block the caller
+        threading.Thread(target=tracing_backend.shutdown, daemon=True).start()
+        return key, tracing_backend
+
+
+def hash_config(config: Dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(config, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
 class TracingBackendFactory:
     registry: Dict[str, Type[TracingBackend]] = {}
+    instances: TracingBackendCache = TracingBackendCache(maxsize=32)
 
     @classmethod
     def register(cls, vendor_name: str) -> Callable:
@@ -21,3 +46,33 @@ class TracingBackendFactory:
         if vendor_name not in cls.registry:
             raise ValueError(f"Unknown tracing vendor: {vendor_name}")
         return cls.registry[vendor_name](**config)
+
+    @classmethod
+    def get_or_create(cls, vendor_name: str, config) -> TracingBackend:
+        """Return the shared backend for this vendor and configuration.
+
+        Backends are memoized by vendor and configuration hash, so that their
+        clients, threads and connections are reused across requests. They are
+        wrapped in a BatchingTracingBackend, so that spans are handed over to them
+        off the request path.
+        """
+        key = (vendor_name, hash_config(config))
+        tracing_backend = cls.instances.get(key)
+        if tracing_backend is None:
+            tracing_backend = BatchingTracingBackend(
+                cls.create(vendor_name=vendor_name, config=config)
+            )
+            cls.instances[key] = tracing_backend
+        return tracing_backend
+
+    @classmethod
+    async def shutdown(cls):
+        """Flush and close all the shared backends."""
+        tracing_backends = [cls.instances.pop(key) for key in list(cls.instances)]
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(None, tracing_backend.shutdown)
+                for tracing_backend in tracing_backends
+            )
+        )
@@ -7,9 +7,17 @@ from zav.message_bus.errors import (
     NonRetryableHandlerError,
     RetryableHandlerError,
 )
+from zav.message_bus.event_worker_pool import EventWorkerPool
 from zav.message_bus.handler_registry import (
     CommandHandlerRegistry,
     EventHandlerRegistry,
 )
 from zav.message_bus.handlers_factory import HandlerMixin, HandlersFactory
 from zav.message_bus.message_bus import MessageBus
+from zav.message_bus.outbox import (
+    Outbox,
+    OutboxRecord,
+    SQLiteOutbox,
+    redelivery_delay,
+)
+from zav.message_bus.outbox_worker import OutboxWorker, run_outbox_workers
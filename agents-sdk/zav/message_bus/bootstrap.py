@@ -1,67 +1,137 @@
+import asyncio
 import inspect
-from contextlib import AsyncExitStack
+import sys
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
 from dataclasses import dataclass
 from typing import (
     Any,
     AsyncContextManager,
+    AsyncIterator,
     Awaitable,
     Callable,
+    Deque,
     Dict,
     List,
     Optional,
+    Tuple,
     Type,
 )
 
 from zav.message_bus.common import Command, Event
 from zav.message_bus.errors import ExceptionHandlerRegistry
+from zav.message_bus.event_worker_pool import EventWorkerPool
 from zav.message_bus.handler_registry import (
     CommandHandlerRegistry,
     EventHandlerRegistry,
 )
 from zav.message_bus.message_bus import MessageBus
+from zav.message_bus.outbox import Outbox
 
 
 @dataclass
 class BootstrapDependency:
+    """A value injected into the handlers with a parameter called `name`.
+
+    A `context_value` is entered before and exited after every handler call. Setting
+    `pool_size` opts into pooling instead: up to `pool_size` values are entered once,
+    kept open and reused across handler calls, and only exited on shutdown, or when
+    a handler using them raises. Their exit code therefore does not run between
+    calls, so pool connection-like resources, or set `release_fn` to do the per-call
+    work, e.g. committing a session, before a value goes back to the pool.
+    """
 
     name: str
     value: Optional[Any] = None
     context_value: Optional[Callable[[], AsyncContextManager]] = None
     startup_fn: Optional[Callable[[], Awaitable[None]]] = None
     shutdown_fn: Optional[Callable[[], Awaitable[None]]] = None
+    pool_size: Optional[int] = None
+    release_fn: Optional[Callable[[Any], Awaitable[None]]] = None
+
+
+class _ContextDependencyPool:
+    def __init__(
+        self,
+        context_value: Callable[[], AsyncContextManager],
+        size: int,
+        release_fn: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ):
+        self.__context_value = context_value
+        self.__size = size
+        self.__release_fn = release_fn
+        self.__semaphore: Optional[asyncio.Semaphore] = None
+        self.__idle: Deque[Tuple[Any, AsyncExitStack]] = deque()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.__size)
+        async with self.__semaphore:
+            if self.__idle:
+                value, stack = self.__idle.pop()
+            else:
+                stack = AsyncExitStack()
+                value = await stack.enter_async_context(self.__context_value())
+            try:
+                yield value
+                if self.__release_fn is not None:
+                    await self.__release_fn(value)
+            except BaseException:
+                # The value may be left in a broken state, e.g. a failed transaction
+                await stack.__aexit__(*sys.exc_info())
+                raise
+            self.__idle.append((value, stack))
+
+    async def close(self):
+        while self.__idle:
+            _, stack = self.__idle.pop()
+            await stack.aclose()
 
 
 def inject_dependencies(
-    handler: Callable, dependencies: List[BootstrapDependency]
+    handler: Callable,
+    dependencies: List[BootstrapDependency],
+    pools: Optional[Dict[str, _ContextDependencyPool]] = None,
 ) -> Callable:
 
     params = inspect.signature(handler).parameters
+    pools = pools or {}
 
     value_deps = {
         dependency.name: dependency.value
         for dependency in dependencies
         if dependency.name in params and dependency.value is not None
     }
-    context_deps = {
-        dependency.name: dependency.context_value
+    context_deps = [
+        (
+            dependency.name,
+            (
+                pools[dependency.name].acquire
+                if dependency.name in pools
+                else dependency.context_value
+            ),
+        )
         for dependency in dependencies
         if dependency.name in params and dependency.context_value is not None
-    }
+    ]
 
-    async def handler_wrap(*args, **kwargs):
-        if context_deps != {}:
-            async with AsyncExitStack() as stack:
-                resolved_value_deps = {
-                    name: await stack.enter_async_context(ctxmanager())
-                    for name, ctxmanager in context_deps.items()
-                }
-                return await handler(
-                    *args, **kwargs, **value_deps, **resolved_value_deps
-                )
+    if not context_deps:
 
-        return await handler(*args, **kwargs, **value_deps)
+        async def handler_wrap(*args, **kwargs):
+            return await handler(*args, **kwargs, **value_deps)
 
-    return handler_wrap
+        return handler_wrap
+
+    async def context_handler_wrap(*args, **kwargs):
+        async with AsyncExitStack() as stack:
+            resolved_value_deps = {
+                name: await stack.enter_async_context(ctxmanager())
+                for name, ctxmanager in context_deps
+            }
+            return await handler(*args, **kwargs, **value_deps, **resolved_value_deps)
+
+    return context_handler_wrap
 
 
 class Bootstrap:
@@ -71,12 +141,42 @@ class Bootstrap:
         command_handler_registry: Type[CommandHandlerRegistry],
         event_handler_registry: Type[EventHandlerRegistry],
         exception_handler_registry: Optional[Type[ExceptionHandlerRegistry]] = None,
+        concurrent_event_handlers: bool = False,
+        max_concurrent_event_handlers: int = 10,
+        event_worker_pool: Optional[EventWorkerPool] = None,
+        event_drain_timeout: Optional[float] = None,
+        outbox: Optional[Outbox] = None,
     ):
 
+        for dep in dependencies:
+            if dep.pool_size is not None and (
+                dep.context_value is None or dep.pool_size <= 0
+            ):
+                raise ValueError(
+                    f"Dependency {dep.name} needs a context_value and a positive "
+                    "pool_size to be pooled"
+                )
         self.__dependencies = dependencies
-        self.__command_handler_registry = command_handler_registry.registry
-        self.__event_handler_registry = event_handler_registry.registry
+        self.__pools = {
+            dep.name: _ContextDependencyPool(
+                dep.context_value, dep.pool_size, dep.release_fn
+            )
+            for dep in dependencies
+            if dep.context_value is not None and dep.pool_size is not None
+        }
+        self.__command_handler_registry = command_handler_registry
+        self.__event_handler_registry = event_handler_registry
+        self.__command_handler_updates: Dict[Type[Command], Callable] = {}
+        self.__event_handler_updates: Dict[Type[Event], List[Callable]] = {}
         self.__exception_handler_registry = exception_handler_registry
+        self.__concurrent_event_handlers = concurrent_event_handlers
+        self.__max_concurrent_event_handlers = max_concurrent_event_handlers
+        self.__event_worker_pool = event_worker_pool
+        self.__event_drain_timeout = event_drain_timeout
+        self.__outbox = outbox
+        self.__injected_handlers: Dict[Callable, Callable] = {}
+        self.__message_bus: Optional[MessageBus] = None
+        self.__message_bus_key: Optional[Tuple] = None
 
     async def startup(self):
 
@@ -86,40 +186,86 @@ class Bootstrap:
 
     async def shutdown(self):
 
+        # Background messages may still need the dependencies
+        if self.__event_worker_pool is not None:
+            await self.__event_worker_pool.shutdown(timeout=self.__event_drain_timeout)
+        for pool in self.__pools.values():
+            await pool.close()
         for dep in self.__dependencies:
             if dep.shutdown_fn is not None:
                 await dep.shutdown_fn()
 
     def update_command_handler_registry(self, update: Dict[Type[Command], Callable]):
 
-        self.__command_handler_registry = {
-            **self.__command_handler_registry,
+        self.__command_handler_updates = {
+            **self.__command_handler_updates,
             **update,
         }
 
     def update_event_handler_registry(self, update: Dict[Type[Event], List[Callable]]):
 
-        self.__event_handler_registry = {
-            **self.__event_handler_registry,
+        self.__event_handler_updates = {
+            **self.__event_handler_updates,
             **{
-                event: [*handlers, *self.__event_handler_registry.get(event, [])]
+                event: [*handlers, *self.__event_handler_updates.get(event, [])]
                 for event, handlers in update.items()
             },
         }
 
+    def __handlers(
+        self,
+    ) -> Tuple[Dict[Type[Command], Callable], Dict[Type[Event], List[Callable]]]:
+        """The handlers of the registries, with the updates of this bootstrap."""
+        event_handlers = dict(self.__event_handler_registry.registry)
+        for event, handlers in self.__event_handler_updates.items():
+            event_handlers[event] = [*handlers, *event_handlers.get(event, [])]
+        return {
+            **self.__command_handler_registry.registry,
+            **self.__command_handler_updates,
+        }, event_handlers
+
+    def __inject(self, handler: Callable) -> Callable:
+        injected_handler = self.__injected_handlers.get(handler)
+        if injected_handler is None:
+            injected_handler = inject_dependencies(
+                handler, self.__dependencies, self.__pools
+            )
+            self.__injected_handlers[handler] = injected_handler
+        return injected_handler
+
     @property
-    def message_bus(self):
+    def message_bus(self) -> MessageBus:
+        """The message bus with the current handlers of the registries.
+
+        It is built once and rebuilt only when handlers are registered or updated.
+        """
+        command_handlers, event_handlers = self.__handlers()
+        key = (
+            tuple(command_handlers.items()),
+            tuple(
+                (event, tuple(handlers)) for event, handlers in event_handlers.items()
+            ),
+        )
+        if self.__message_bus is None or key != self.__message_bus_key:
+            self.__message_bus = self.__build_message_bus(
+                command_handlers, event_handlers
+            )
+            self.__message_bus_key = key
+        return self.__message_bus
+
+    def __build_message_bus(
+        self,
+        command_handlers: Dict[Type[Command], Callable],
+        event_handlers: Dict[Type[Event], List[Callable]],
+    ) -> MessageBus:
 
         injected_command_handlers = {
-            command_type: inject_dependencies(handler, self.__dependencies)
-            for command_type, handler in self.__command_handler_registry.items()
+            command_type: self.__inject(handler)
+            for command_type, handler in command_handlers.items()
         }
         injected_event_handlers = {
-            event_type: [
-                inject_dependencies(handler, self.__dependencies)
-                for handler in handlers
-            ]
-            for event_type, handlers in self.__event_handler_registry.items()
+            event_type: [self.__inject(handler) for handler in handlers]
+            for event_type, handlers in event_handlers.items()
         }
         return MessageBus(
             command_handlers=injected_command_handlers,
@@ -129,4 +275,8 @@ class Bootstrap:
                 if self.__exception_handler_registry
                 else {}
             ),
+            concurrent_event_handlers=self.__concurrent_event_handlers,
+            max_concurrent_event_handlers=self.__max_concurrent_event_handlers,
+            event_worker_pool=self.__event_worker_pool,
+            outbox=self.__outbox,
         )
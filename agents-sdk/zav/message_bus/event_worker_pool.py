@@ -0,0 +1,73 @@
+import asyncio
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from zav.logging import logger
+
+from zav.message_bus.common import Message
+
+if TYPE_CHECKING:
+    from zav.message_bus.message_bus import MessageBus
+
+
+class EventWorkerPool:
+    """Processes the messages enqueued by command handlers in the background.
+
+    Messages wait in a queue of `max_queue_size` items, which makes submitters wait
+    when it is full, and are handled by `num_workers` worker tasks through the
+    message bus that submitted them, so retries and exception handlers apply as
+    usual. Workers are started on first use in the running event loop.
+    """
+
+    def __init__(self, num_workers: int = 4, max_queue_size: int = 1000):
+        if num_workers <= 0:
+            raise ValueError("num_workers must be greater than 0")
+        self.__num_workers = num_workers
+        self.__max_queue_size = max_queue_size
+        self.__queue: Optional[asyncio.Queue] = None
+        self.__workers: List[asyncio.Task] = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self.__queue.qsize() if self.__queue is not None else 0
+
+    def __start(self) -> asyncio.Queue:
+        if self.__queue is None:
+            self.__queue = asyncio.Queue(maxsize=self.__max_queue_size)
+            self.__workers = [
+                asyncio.ensure_future(self.__work(self.__queue))
+                for _ in range(self.__num_workers)
+            ]
+        return self.__queue
+
+    async def submit(self, message_bus: "MessageBus", message: Message):
+        """Enqueue the message, waiting for room if the queue is full."""
+        await self.__start().put((message_bus, message))
+
+    @staticmethod
+    async def __work(queue: asyncio.Queue):
+        while True:
+            item: Tuple["MessageBus", Message] = await queue.get()
+            message_bus, message = item
+            try:
+                await message_bus.handle(message, in_background=True)
+            except Exception as e:
+                # The message bus already applied the exception handlers
+                logger.exception(f"Background handling of {message} failed: {e}")
+            finally:
+                queue.task_done()
+
+    async def shutdown(self, timeout: Optional[float] = None):
+        """Wait for the queued messages to be handled, then stop the workers."""
+        queue, workers = self.__queue, self.__workers
+        self.__queue, self.__workers = None, []
+        if queue is None:
+            return
+        try:
+            await asyncio.wait_for(queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Dropping {queue.qsize()} background messages after {timeout}s"
+            )
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
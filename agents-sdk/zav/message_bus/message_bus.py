@@ -1,28 +1,68 @@
+import asyncio
+import uuid
 from asyncio import sleep
-from typing import Callable, Dict, List, Type
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Type
 
 from zav.logging import logger
 
 from zav.message_bus.common import Command, Event, Message
 from zav.message_bus.errors import NonRetryableHandlerError, RetryableHandlerError
+from zav.message_bus.event_worker_pool import EventWorkerPool
+from zav.message_bus.outbox import Outbox, OutboxRecord, redelivery_delay
 
 
 class MessageBus:
+    """Handles a message and then, in order, the messages its handlers enqueue.
+
+    With `concurrent_event_handlers`, the handlers of an event run concurrently, at
+    most `max_concurrent_event_handlers` at a time, so they must be independent of
+    each other. The messages they enqueue are still processed in the order of the
+    handlers, as in sequential dispatch.
+
+    With an `event_worker_pool`, handling a command returns as soon as its handler
+    completes, and the messages it enqueued are handled by the pool.
+
+    With an `outbox`, the events enqueued by a command are stored in the outbox in
+    one batch and handled by outbox workers instead, and retries of events are
+    scheduled as redeliveries with a jittered backoff instead of awaited. Their
+    idempotency keys derive from the handled message and the position of the event,
+    so the events of a retried command are not stored twice.
+    """
+
     def __init__(
         self,
         command_handlers: Dict[Type[Command], Callable],
         event_handlers: Dict[Type[Event], List[Callable]],
         exception_handlers: Dict[Type[Exception], Callable],
+        concurrent_event_handlers: bool = False,
+        max_concurrent_event_handlers: int = 10,
+        event_worker_pool: Optional[EventWorkerPool] = None,
+        outbox: Optional[Outbox] = None,
     ):
-
+        if max_concurrent_event_handlers <= 0:
+            raise ValueError("max_concurrent_event_handlers must be greater than 0")
         self.__command_handlers = command_handlers
         self.__event_handlers = event_handlers
         self.__exception_handlers = exception_handlers
+        self.__concurrent_event_handlers = concurrent_event_handlers
+        self.__max_concurrent_event_handlers = max_concurrent_event_handlers
+        self.__event_worker_pool = event_worker_pool
+        self.__outbox = outbox
 
-    async def handle(self, message: Message, retry_attempts=0):
-
+    async def handle(
+        self,
+        message: Message,
+        retry_attempts=0,
+        in_background=False,
+        origin_key: Optional[str] = None,
+    ):
+        # Kept across retries, as the key of the events stored in the outbox
+        origin_key = (
+            origin_key or getattr(message, "idempotency_key", None) or str(uuid.uuid4())
+        )
         try:
-            result = await self.__handle_message(message)
+            result = await self.__handle_message(message, in_background, origin_key)
             return result
         except Exception as e:
             exc_type = type(e)
@@ -44,8 +84,24 @@ class MessageBus:
                             f"Error: {e}"
                         )
                     )
+                    if self.__outbox is not None and isinstance(message, Event):
+                        await self.__outbox.append(
+                            [
+                                OutboxRecord.from_message(
+                                    message,
+                                    attempts=attempt,
+                                    delay=redelivery_delay(
+                                        attempt, retryable_error.base_delay
+                                    ),
+                                    idempotency_key=f"{origin_key}:retry:{attempt}",
+                                )
+                            ]
+                        )
+                        return []
                     await sleep(attempt * retryable_error.base_delay)
-                    return await self.handle(message, attempt)
+                    return await self.handle(
+                        message, attempt, in_background, origin_key
+                    )
                 except Exception as non_retryable_exception:
                     logger.exception(f"Non retryable error: {non_retryable_exception}")
                     raise e
@@ -53,26 +109,109 @@ class MessageBus:
                 logger.exception(f"No exception handler for {exc_type}")
                 raise e
 
-    async def __handle_message(self, message: Message):
+    async def __handle_message(
+        self,
+        message: Message,
+        in_background: bool = False,
+        origin_key: Optional[str] = None,
+    ):
         results = []
-        queue = [message]
+        origin_key = origin_key or str(uuid.uuid4())
+        queue: Deque[Message] = deque([message])
         while queue:
-            message = queue.pop(0)
+            message = queue.popleft()
             if isinstance(message, Event):
                 await self.__handle_event(message, queue)
             elif isinstance(message, Command):
                 cmd_result = await self.__handle_command(message, queue)
                 results.append(cmd_result)
+                await self.__hand_off(
+                    queue, f"{origin_key}:{len(results)}", in_background
+                )
             else:
                 raise Exception(f"{message} was not an Event or Command")
         return results
 
-    async def __handle_event(self, event: Event, queue: List[Message]):
-        for handler in self.__event_handlers[type(event)]:
+    async def __hand_off(
+        self, queue: Deque[Message], key_prefix: str, in_background: bool = False
+    ):
+        """Move the messages enqueued by a command to the outbox or the pool.
+
+        In the background the remaining messages stay in the queue, to be handled
+        by the caller.
+        """
+        events = [message for message in queue if isinstance(message, Event)]
+        if self.__outbox is not None and events:
+            await self.__outbox.append(
+                [
+                    OutboxRecord.from_message(
+                        event, idempotency_key=f"{key_prefix}:{position}"
+                    )
+                    for position, event in enumerate(events)
+                ]
+            )
+            commands = [message for message in queue if not isinstance(message, Event)]
+            queue.clear()
+            queue.extend(commands)
+        if self.__event_worker_pool is not None and not in_background:
+            # Messages handled by the pool never submit to it themselves, so that
+            # workers cannot block on a full queue
+            while queue:
+                await self.__event_worker_pool.submit(self, queue.popleft())
+
+    async def deliver(self, message: Message):
+        """Handle the message once, for the outbox workers.
+
+        Raises the RetryableHandlerError its failure maps to, for the caller to
+        schedule a redelivery, or a NonRetryableHandlerError.
+        """
+        try:
+            return await self.__handle_message(message, in_background=True)
+        except Exception as e:
+            exception_handler = self.__exception_handlers.get(type(e))
+            handled_exception = exception_handler(e) if exception_handler else None
+            if isinstance(handled_exception, RetryableHandlerError):
+                raise handled_exception from e
+            raise NonRetryableHandlerError(e) from e
+
+    async def __handle_event(self, event: Event, queue: Deque[Message]):
+        handlers = self.__event_handlers[type(event)]
+        if self.__concurrent_event_handlers and len(handlers) > 1:
+            await self.__handle_event_concurrently(event, handlers, queue)
+            return
+        for handler in handlers:
             logger.debug(f"handling event {event} with handler {handler}")
             await handler(event, queue)
 
-    async def __handle_command(self, command: Command, queue: List[Message]):
+    async def __handle_event_concurrently(
+        self, event: Event, handlers: List[Callable], queue: Deque[Message]
+    ):
+        semaphore = asyncio.Semaphore(self.__max_concurrent_event_handlers)
+        # Each handler enqueues into its own queue so that the resulting order does
+        # not depend on which handler finishes first
+        handler_queues: List[Deque[Message]] = [deque() for _ in handlers]
+
+        async def run(handler: Callable, handler_queue: Deque[Message]):
+            async with semaphore:
+                logger.debug(f"handling event {event} with handler {handler}")
+                await handler(event, handler_queue)
+
+        tasks = [
+            asyncio.ensure_future(run(handler, handler_queue))
+            for handler, handler_queue in zip(handlers, handler_queues)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            # Wait for the cancelled handlers to unwind before propagating
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        for handler_queue in handler_queues:
+            queue.extend(handler_queue)
+
+    async def __handle_command(self, command: Command, queue: Deque[Message]):
         logger.debug(f"handling command {command}")
         handler = self.__command_handlers[type(command)]
         result = await handler(command, queue)
@@ -0,0 +1,249 @@
+import pickle
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from zav.executors import force_async
+from zav.logging import logger
+
+from zav.message_bus.common import Message
+
+
+def redelivery_delay(
+    attempt: int, base_delay: float, max_delay: float = 300.0
+) -> float:
+    """Exponential backoff with full jitter for the `attempt`-th redelivery."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** max(attempt - 1, 0)))
+
+
+@dataclass
+class OutboxRecord:
+    payload: bytes
+    idempotency_key: str = field(default_factory=lambda: str(uuid.uuid4()))
+    attempts: int = 0
+    available_at: float = field(default_factory=time.time)
+    id: Optional[int] = None
+    lease_token: Optional[str] = None
+
+    @classmethod
+    def from_message(
+        cls,
+        message: Message,
+        attempts: int = 0,
+        delay: float = 0.0,
+        idempotency_key: Optional[str] = None,
+    ) -> "OutboxRecord":
+        """Serialize the message.
+
+        The `idempotency_key` of the message itself takes precedence over the given
+        one, and a random key is used when there is neither.
+        """
+        return cls(
+            payload=pickle.dumps(message),
+            idempotency_key=(
+                getattr(message, "idempotency_key", None)
+                or idempotency_key
+                or str(uuid.uuid4())
+            ),
+            attempts=attempts,
+            available_at=time.time() + delay,
+        )
+
+    @property
+    def message(self) -> Message:
+        # Payloads are only ever written by this service's own message buses
+        return pickle.loads(self.payload)  # nosec
+
+
+class Outbox(ABC):
+    """Durable store of the messages that must be handled at least once.
+
+    Records are leased by the workers that handle them. A record whose lease
+    expires before it is acknowledged is delivered again, and the outcome reported
+    under the expired lease is ignored.
+    """
+
+    @abstractmethod
+    async def append(self, records: List[OutboxRecord]):
+        """Store the records. Records whose idempotency key is known are skipped."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def lease(self, limit: int, lease_seconds: float) -> List[OutboxRecord]:
+        """Claim up to `limit` available records for `lease_seconds`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def ack(self, record: OutboxRecord):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def retry(self, record: OutboxRecord, delay: float):
+        """Release the record, to be delivered again after `delay` seconds."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def dead_letter(self, record: OutboxRecord, error: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class SQLiteOutbox(Outbox):
+    """Outbox kept in a local SQLite database, shareable across processes.
+
+    Handled records are kept, so that their idempotency keys keep deduplicating
+    appends, until they are removed with `purge`.
+    """
+
+    def __init__(self, path: str, table: str = "outbox"):
+        self.__path = path
+        self.__table = table
+        self.__connection: Optional[sqlite3.Connection] = None
+        self.__lock = threading.Lock()
+
+    @property
+    def __db(self) -> sqlite3.Connection:
+        if self.__connection is None:
+            connection = sqlite3.connect(
+                self.__path,
+                timeout=30.0,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.__table} ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "idempotency_key TEXT NOT NULL UNIQUE, "
+                "payload BLOB NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "available_at REAL NOT NULL, "
+                "lease_token TEXT, "
+                "status TEXT NOT NULL DEFAULT 'pending', "
+                "error TEXT, "
+                "updated_at REAL NOT NULL)"
+            )
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.__table}_available "
+                f"ON {self.__table} (status, available_at)"
+            )
+            self.__connection = connection
+        return self.__connection
+
+    @force_async
+    def append(self, records: List[OutboxRecord]):
+        now = time.time()
+        with self.__lock:
+            db = self.__db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    f"INSERT OR IGNORE INTO {self.__table} "
+                    "(idempotency_key, payload, attempts, available_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            record.idempotency_key,
+                            record.payload,
+                            record.attempts,
+                            record.available_at,
+                            now,
+                        )
+                        for record in records
+                    ],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    @force_async
+    def lease(self, limit: int, lease_seconds: float) -> List[OutboxRecord]:
+        now = time.time()
+        token = str(uuid.uuid4())
+        with self.__lock:
+            db = self.__db
+            # IMMEDIATE serializes the leases of concurrent processes
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    f"UPDATE {self.__table} "
+                    "SET lease_token = ?, available_at = ?, updated_at = ? "
+                    f"WHERE id IN (SELECT id FROM {self.__table} "
+                    "WHERE status = 'pending' AND available_at <= ? "
+                    "ORDER BY id LIMIT ?)",
+                    (token, now + lease_seconds, now, now, limit),
+                )
+                rows = db.execute(
+                    "SELECT id, idempotency_key, payload, attempts, available_at, "
+                    "lease_token "
+                    f"FROM {self.__table} WHERE lease_token = ? ORDER BY id",
+                    (token,),
+                ).fetchall()
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return [
+            OutboxRecord(
+                id=row[0],
+                idempotency_key=row[1],
+                payload=row[2],
+                attempts=row[3],
+                available_at=row[4],
+                lease_token=row[5],
+            )
+            for row in rows
+        ]
+
+    def __update(self, record: OutboxRecord, assignments: str, params: tuple):
+        with self.__lock:
+            updated = self.__db.execute(
+                f"UPDATE {self.__table} SET {assignments}, lease_token = NULL, "
+                "updated_at = ? WHERE id = ? AND lease_token = ?",
+                (*params, time.time(), record.id, record.lease_token),
+            ).rowcount
+        if not updated:
+            logger.warning(
+                f"Lease of outbox record {record.idempotency_key} expired before "
+                "it was released"
+            )
+
+    @force_async
+    def ack(self, record: OutboxRecord):
+        self.__update(record, "status = 'done'", ())
+
+    @force_async
+    def retry(self, record: OutboxRecord, delay: float):
+        self.__update(
+            record,
+            "attempts = attempts + 1, available_at = ?",
+            (time.time() + delay,),
+        )
+
+    @force_async
+    def dead_letter(self, record: OutboxRecord, error: str):
+        self.__update(record, "status = 'dead', error = ?", (error,))
+
+    @force_async
+    def purge(self, older_than: float):
+        """Delete the handled records last updated more than `older_than`s ago."""
+        with self.__lock:
+            self.__db.execute(
+                f"DELETE FROM {self.__table} "
+                "WHERE status = 'done' AND updated_at < ?",
+                (time.time() - older_than,),
+            )
+
+    async def close(self):
+        with self.__lock:
+            connection, self.__connection = self.__connection, None
+        if connection is not None:
+            connection.close()
@@ -0,0 +1,154 @@
+import asyncio
+import multiprocessing
+import signal
+from typing import Callable, List, Optional
+
+from zav.logging import logger
+
+from zav.message_bus.bootstrap import Bootstrap
+from zav.message_bus.errors import RetryableHandlerError
+from zav.message_bus.outbox import Outbox, OutboxRecord, redelivery_delay
+
+
+class OutboxWorker:
+    """Delivers the messages of an outbox through the message bus of a Bootstrap.
+
+    Messages are handled at least once: a record is acknowledged only after its
+    handlers succeeded. Failures mapped to a RetryableHandlerError are delivered
+    again after a jittered exponential backoff, up to `max_retries` times, and
+    any other failure moves the record to the dead letters.
+    """
+
+    def __init__(
+        self,
+        bootstrap: Bootstrap,
+        outbox: Outbox,
+        batch_size: int = 10,
+        max_concurrency: int = 10,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 1.0,
+        max_redelivery_delay: float = 300.0,
+    ):
+        self.__bootstrap = bootstrap
+        self.__outbox = outbox
+        self.__batch_size = batch_size
+        self.__max_concurrency = max_concurrency
+        self.__semaphore: Optional[asyncio.Semaphore] = None
+        self.__lease_seconds = lease_seconds
+        self.__poll_interval = poll_interval
+        self.__max_redelivery_delay = max_redelivery_delay
+        self.__stopping: Optional[asyncio.Event] = None
+
+    async def run_once(self) -> int:
+        """Deliver one batch of available records, returning its size."""
+        records = await self.__outbox.lease(self.__batch_size, self.__lease_seconds)
+        if records:
+            if self.__semaphore is None:
+                self.__semaphore = asyncio.Semaphore(self.__max_concurrency)
+            message_bus = self.__bootstrap.message_bus
+            await asyncio.gather(
+                *(self.__deliver(message_bus, record) for record in records)
+            )
+        return len(records)
+
+    async def __deliver(self, message_bus, record: OutboxRecord):
+        async with self.__semaphore:  # type: ignore
+            try:
+                await message_bus.deliver(record.message)
+            except RetryableHandlerError as e:
+                if record.attempts >= e.max_retries:
+                    logger.exception(
+                        f"Outbox record {record.idempotency_key} failed after "
+                        f"{record.attempts} retries"
+                    )
+                    await self.__outbox.dead_letter(record, repr(e.original_exception))
+                else:
+                    await self.__outbox.retry(
+                        record,
+                        delay=redelivery_delay(
+                            record.attempts + 1,
+                            e.base_delay,
+                            self.__max_redelivery_delay,
+                        ),
+                    )
+            except Exception as e:
+                logger.exception(f"Outbox record {record.idempotency_key} failed")
+                await self.__outbox.dead_letter(record, repr(e))
+            else:
+                await self.__outbox.ack(record)
+
+    async def run(self):
+        """Deliver records until `stop` is called."""
+        self.__stopping = asyncio.Event()
+        while not self.__stopping.is_set():
+            if await self.run_once() < self.__batch_size:
+                try:
+                    await asyncio.wait_for(
+                        self.__stopping.wait(), timeout=self.__poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        if self.__stopping is not None:
+            self.__stopping.set()
+
+
+async def _run_worker(
+    bootstrap_factory: Callable[[], Bootstrap],
+    outbox_factory: Callable[[], Outbox],
+    **worker_kwargs,
+):
+    bootstrap = bootstrap_factory()
+    outbox = outbox_factory()
+    worker = OutboxWorker(bootstrap, outbox, **worker_kwargs)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    await bootstrap.startup()
+    try:
+        await worker.run()
+    finally:
+        await bootstrap.shutdown()
+        await outbox.close()
+
+
+def _worker_process(
+    bootstrap_factory: Callable[[], Bootstrap],
+    outbox_factory: Callable[[], Outbox],
+    worker_kwargs: dict,
+):
+    asyncio.run(_run_worker(bootstrap_factory, outbox_factory, **worker_kwargs))
+
+
+def run_outbox_workers(
+    bootstrap_factory: Callable[[], Bootstrap],
+    outbox_factory: Callable[[], Outbox],
+    num_processes: int = 2,
+    **worker_kwargs,
+):
+    """Run outbox workers in `num_processes` processes until they are stopped.
+
+    The factories are called in every process, so they must be importable
+    (module level) functions. Each process builds its own Bootstrap, runs its
+    startup and shutdown, and stops on SIGINT or SIGTERM.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes: List[multiprocessing.process.BaseProcess] = [
+        context.Process(  # type: ignore
+            target=_worker_process,
+            args=(bootstrap_factory, outbox_factory, worker_kwargs),
+            name=f"outbox-worker-{index}",
+        )
+        for index in range(num_processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
@@ -1,12 +1,10 @@
-import asyncio
-import functools
 import io
-from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Tuple
 from urllib.parse import urlparse
 
 import boto3
 from botocore.exceptions import ClientError
+from zav.executors import force_async
 
 from zav.object_storage_repo.domain.object_storage_item import ObjectStorageItem
 from zav.object_storage_repo.repository import (
@@ -17,17 +15,6 @@ from zav.object_storage_repo.repository import (
 from zav.object_storage_repo.repository_factory import ObjectRepositoryFactory
 
 
-def force_async(fn):
-    pool = ThreadPoolExecutor()
-
-    @functools.wraps(fn)
-    def wrapper(*args, **kwargs):
-        future = pool.submit(fn, *args, **kwargs)
-        return asyncio.wrap_future(future)  # make it awaitable
-
-    return wrapper
-
-
 @ObjectRepositoryFactory.register("s3")
 class S3ObjectRepository(ObjectRepository):
     def __init__(
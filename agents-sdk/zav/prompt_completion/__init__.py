@@ -22,3 +22,18 @@ from zav.prompt_completion.client import (
     ToolCallRequest,
     ToolCallResponse,
 )
+from zav.prompt_completion.failover import FailoverChatCompletionClient
+from zav.prompt_completion.rate_limiter import (
+    AdaptiveRateLimiter,
+    RateLimiterMetrics,
+    RateLimiterRegistry,
+    rate_limiter_registry,
+)
+from zav.prompt_completion.response_cache import (
+    CachedChatCompletionClient,
+    CachedPromptCompletionClient,
+    CachedPromptCompletionWithLogitsClient,
+    ResponseCache,
+)
+from zav.prompt_completion.sdk_clients import SDKClientRegistry, sdk_client_registry
+from zav.prompt_completion.tokenizer import Tokenizer, fit_request
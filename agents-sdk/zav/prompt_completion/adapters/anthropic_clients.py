@@ -1,8 +1,12 @@
+import copy
 import re
+from datetime import datetime
 from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union, overload
 
 import anthropic
+from anthropic import AsyncStream
 from anthropic.types import Message as AnthropicMessage
+from anthropic.types import RawMessageStreamEvent
 from typing_extensions import Literal
 from zav.llm_domain import (
     AnthropicConfiguration,
@@ -10,7 +14,7 @@ from zav.llm_domain import (
     LLMModelType,
     LLMProviderName,
 )
-from zav.llm_tracing import Span
+from zav.llm_tracing import Span, now
 
 from zav.prompt_completion.adapters.tracing import create_span, end_span
 from zav.prompt_completion.client import (
@@ -23,36 +27,73 @@ from zav.prompt_completion.client import (
     PromptTooLargeError,
 )
 from zav.prompt_completion.client_factories import ChatClientFactory
+from zav.prompt_completion.rate_limiter import (
+    create_with_rate_limit,
+    rate_limiter_for,
+)
+from zav.prompt_completion.sdk_clients import sdk_client_registry
+from zav.prompt_completion.tokenizer import Tokenizer, fit_request
 
 
-def build_client(vendor_configuration: AnthropicConfiguration):
-    if vendor_configuration.anthropic_api_type == "bedrock":
-        return anthropic.AsyncAnthropicBedrock(
-            # The Bedrock client uses the AWS_SECRET_ACCESS_KEY & AWS_ACCESS_KEY_ID
-            # environment variables for authentication, and the AWS_REGION variable
-            # to determine the region. We can override these values by passing them
-            # explicitly here to allow per-tenant configuration.
-            aws_secret_key=(
+def build_client(
+    vendor_configuration: AnthropicConfiguration,
+) -> Union[anthropic.AsyncAnthropic, anthropic.AsyncAnthropicBedrock]:
+    def create_client() -> (
+        Union[anthropic.AsyncAnthropic, anthropic.AsyncAnthropicBedrock]
+    ):
+        http_client = anthropic.DefaultAsyncHttpxClient(
+            limits=sdk_client_registry.limits
+        )
+        if vendor_configuration.anthropic_api_type == "bedrock":
+            return anthropic.AsyncAnthropicBedrock(
+                # The Bedrock client uses the AWS_SECRET_ACCESS_KEY & AWS_ACCESS_KEY_ID
+                # environment variables for authentication, and the AWS_REGION variable
+                # to determine the region. We can override these values by passing them
+                # explicitly here to allow per-tenant configuration.
+                aws_secret_key=(
+                    vendor_configuration.aws_secret_key.get_unencrypted_secret()
+                    if vendor_configuration.aws_secret_key
+                    else None
+                ),
+                aws_access_key=(
+                    vendor_configuration.aws_access_key.get_unencrypted_secret()
+                    if vendor_configuration.aws_access_key
+                    else None
+                ),
+                aws_region=vendor_configuration.aws_region,
+                # This is optional, if unset it will use either the value from the
+                # "ANTHROPIC_BEDROCK_BASE_URL" environment variable or the default
+                # Bedrock URL: https://bedrock-runtime.{region}.amazonaws.com
+                base_url=vendor_configuration.anthropic_api_base,
+                http_client=http_client,
+            )
+        else:
+            return anthropic.AsyncAnthropic(
+                api_key=vendor_configuration.anthropic_api_key.get_unencrypted_secret(),
+                base_url=vendor_configuration.anthropic_api_base,
+                http_client=http_client,
+            )
+
+    return sdk_client_registry.get_or_create(
+        vendor=LLMProviderName.ANTHROPIC,
+        create_fn=create_client,
+        credentials=(
+            vendor_configuration.anthropic_api_key.get_unencrypted_secret(),
+            (
                 vendor_configuration.aws_secret_key.get_unencrypted_secret()
                 if vendor_configuration.aws_secret_key
                 else None
             ),
-            aws_access_key=(
+            (
                 vendor_configuration.aws_access_key.get_unencrypted_secret()
                 if vendor_configuration.aws_access_key
                 else None
             ),
-            aws_region=vendor_configuration.aws_region,
-            # This is optional, if unset it will use either the value from the
-            # "ANTHROPIC_BEDROCK_BASE_URL" environment variable or the default
-            # Bedrock URL: https://bedrock-runtime.{region}.amazonaws.com
-            base_url=vendor_configuration.anthropic_api_base,
-        )
-    else:
-        return anthropic.AsyncAnthropic(
-            api_key=vendor_configuration.anthropic_api_key.get_unencrypted_secret(),
-            base_url=vendor_configuration.anthropic_api_base,
-        )
+            vendor_configuration.aws_region,
+        ),
+        api_base=vendor_configuration.anthropic_api_base,
+        api_type=vendor_configuration.anthropic_api_type,
+    )
 
 
 @ChatClientFactory.register(LLMProviderName.ANTHROPIC, LLMModelType.CHAT)
@@ -72,10 +113,22 @@ class AnthropicChatClient(ChatCompletionClient):
         model_configuration: LLMModelConfiguration,
         span: Optional[Span] = None,
     ):
-        self.__client = client
+        self.__rate_limiter = rate_limiter_for(
+            LLMProviderName.ANTHROPIC, client, model_configuration
+        )
+        # Rate limited calls are retried by the limiter instead of the SDK
+        self.__client = (
+            client.with_options(max_retries=0) if self.__rate_limiter else client
+        )
         self.__model_name = model_configuration.name
         self.__model_temperature = model_configuration.temperature
         self.__span = span
+        self.__token_budget = model_configuration.token_budget
+        self.__tokenizer = (
+            Tokenizer.for_model(LLMProviderName.ANTHROPIC, model_configuration.name)
+            if self.__token_budget
+            else Tokenizer()
+        )
 
     def __messages_from(
         self,
@@ -128,12 +181,18 @@ class AnthropicChatClient(ChatCompletionClient):
 
     @overload
     async def complete(  # type: ignore
-        self, request: ChatClientRequest, stream: Literal[False] = False
+        self,
+        request: ChatClientRequest,
+        stream: Literal[False] = False,
+        span: Optional[Span] = None,
     ) -> ChatResponse: ...
 
     @overload
     async def complete(
-        self, request: ChatClientRequest, stream: Literal[True] = True
+        self,
+        request: ChatClientRequest,
+        stream: Literal[True] = True,
+        span: Optional[Span] = None,
     ) -> AsyncIterator[ChatResponse]: ...
 
     @overload
@@ -141,48 +200,79 @@ class AnthropicChatClient(ChatCompletionClient):
         self,
         request: ChatClientRequest,
         stream: bool = False,
+        span: Optional[Span] = None,
     ) -> Union[AsyncIterator[ChatResponse], ChatResponse]: ...
 
     async def complete(
         self,
         request: ChatClientRequest,
         stream: Union[Literal[True, False], bool] = False,
+        span: Optional[Span] = None,
     ) -> Union[AsyncIterator[ChatResponse], ChatResponse]:
-        if stream:
-            raise NotImplementedError(
-                "Streaming is not supported yet for Anthropic client."
+        span = span or self.__span
+        if self.__token_budget is not None:
+            await self.__tokenizer.load()
+            request, _, error = fit_request(
+                request, self.__tokenizer, self.__token_budget, span=span
             )
+            if error is not None:
+                return (
+                    stream_response_item(ChatResponse(error=error, chat_message=None))
+                    if stream
+                    else ChatResponse(error=error, chat_message=None)
+                )
         try:
             messages, system_prompt = self.__messages_from(request["conversation"])
         except ValueError as e:
-            return ChatResponse(error=e, chat_message=None)
+            return (
+                stream_response_item(ChatResponse(error=e, chat_message=None))
+                if stream
+                else ChatResponse(error=e, chat_message=None)
+            )
+        generation_span: Optional[Span] = None
         try:
             generation_span = create_span(
                 messages=messages,
                 model_name=self.__model_name,
                 model_temperature=self.__model_temperature,
-                span=self.__span,
+                span=span,
                 max_tokens=request["max_tokens"],
                 stream=stream,
             )
-            response = await self.__client.messages.create(
-                model=self.__model_name,
-                messages=messages,
-                max_tokens=request["max_tokens"],
-                temperature=self.__model_temperature,
-                **({"system": system_prompt} if system_prompt else {}),  # type: ignore
+            create_params: Dict[str, Any] = {
+                "model": self.__model_name,
+                "messages": messages,
+                "max_tokens": request["max_tokens"],
+                "temperature": self.__model_temperature,
+                **({"system": system_prompt} if system_prompt else {}),
+            }
+            tokens = (
+                self.__tokenizer.count_request(request) + request["max_tokens"]
+                if self.__rate_limiter
+                else 0
+            )
+            if stream:
+                events = await create_with_rate_limit(
+                    self.__client.messages,
+                    {**create_params, "stream": True},
+                    rate_limiter=self.__rate_limiter,
+                    tokens=tokens,
+                    span=generation_span or span,
+                )
+                return self.__stream_response(events, generation_span)
+
+            response = await create_with_rate_limit(
+                self.__client.messages,
+                create_params,
+                rate_limiter=self.__rate_limiter,
+                tokens=tokens,
+                span=generation_span or span,
             )
             end_span(
                 usage=(
-                    {
-                        "usage": {
-                            "input": response.usage.input_tokens,
-                            "output": response.usage.output_tokens,
-                            "total": response.usage.input_tokens
-                            + response.usage.output_tokens,
-                            "unit": "TOKENS",
-                        }
-                    }
+                    self.__usage_from(
+                        response.usage.input_tokens, response.usage.output_tokens
+                    )
                     if response.usage
                     else {}
                 ),
@@ -192,34 +282,106 @@ class AnthropicChatClient(ChatCompletionClient):
             )
             chat_message = self.__chat_message_from(response)
             return ChatResponse(error=None, chat_message=chat_message)
-        except anthropic.BadRequestError as e:
-            if generation_span:
-                generation_span.end(
-                    attributes={
-                        "level": "ERROR",
-                        "status_message": e.message,
-                    }
-                )
-            if "prompt is too long" in e.message:
-                extra_tokens = None
-                if m := re.search(
-                    r"prompt is too long: (\d+) tokens > (\d+) maximum", e.message
+        except Exception as error:
+            chat_response = self.__error_response(error, generation_span)
+            return stream_response_item(chat_response) if stream else chat_response
+
+    async def __stream_response(
+        self,
+        events: AsyncStream[RawMessageStreamEvent],
+        generation_span: Optional[Span],
+    ) -> AsyncIterator[ChatResponse]:
+        completion_start_time: Optional[datetime] = None
+        content_buffer: Optional[str] = None
+        role_buffer: str = "assistant"
+        input_tokens: Optional[int] = None
+        output_tokens: Optional[int] = None
+        try:
+            async for event in events:
+                if event.type == "message_start":
+                    role_buffer = event.message.role
+                    input_tokens = event.message.usage.input_tokens
+                    output_tokens = event.message.usage.output_tokens
+                elif event.type == "message_delta":
+                    # The output token count reported here is cumulative
+                    output_tokens = event.usage.output_tokens
+                elif (
+                    event.type == "content_block_delta"
+                    and event.delta.type == "text_delta"
                 ):
-                    extra_tokens = int(m.group(1)) - int(m.group(2))
-                return ChatResponse(
-                    error=PromptTooLargeError(e.message, extra_tokens=extra_tokens),
-                    chat_message=None,
-                )
-            return ChatResponse(error=e, chat_message=None)
+                    if generation_span and completion_start_time is None:
+                        completion_start_time = now()
+                        generation_span.update(
+                            attributes={
+                                "completion_start_time": completion_start_time,
+                            }
+                        )
+                    content_buffer = (content_buffer or "") + event.delta.text
+                    yield ChatResponse(
+                        error=None,
+                        chat_message=ChatMessage(
+                            content=content_buffer,
+                            sender=self.__ROLE_TO_SENDER[role_buffer],
+                        ),
+                    )
         except Exception as error:
-            if generation_span:
-                generation_span.end(
-                    attributes={
-                        "level": "ERROR",
-                        "status_message": str(error),
-                    }
-                )
-            return ChatResponse(error=error, chat_message=None)
+            yield self.__error_response(error, generation_span)
+            return
+        end_span(
+            usage=(
+                self.__usage_from(input_tokens, output_tokens or 0)
+                if input_tokens is not None
+                else {}
+            ),
+            span=generation_span,
+            content=content_buffer,
+            role=role_buffer,
+        )
+
+    @staticmethod
+    def __usage_from(input_tokens: int, output_tokens: int) -> Dict[str, Any]:
+        return {
+            "usage": {
+                "input": input_tokens,
+                "output": output_tokens,
+                "total": input_tokens + output_tokens,
+                "unit": "TOKENS",
+            }
+        }
+
+    @staticmethod
+    def __error_response(
+        error: Exception, generation_span: Optional[Span]
+    ) -> ChatResponse:
+        status_message = (
+            error.message if isinstance(error, anthropic.APIError) else str(error)
+        )
+        if generation_span:
+            generation_span.end(
+                attributes={
+                    "level": "ERROR",
+                    "status_message": status_message,
+                }
+            )
+        if (
+            isinstance(error, anthropic.BadRequestError)
+            and "prompt is too long" in error.message
+        ):
+            extra_tokens = None
+            if m := re.search(
+                r"prompt is too long: (\d+) tokens > (\d+) maximum", error.message
+            ):
+                extra_tokens = int(m.group(1)) - int(m.group(2))
+            return ChatResponse(
+                error=PromptTooLargeError(error.message, extra_tokens=extra_tokens),
+                chat_message=None,
+            )
+        return ChatResponse(error=error, chat_message=None)
+
+    def with_span(self, span: Optional[Span] = None) -> "AnthropicChatClient":
+        client = copy.copy(self)
+        client.__span = span
+        return client
 
     @classmethod
     def from_configuration(
@@ -230,3 +392,7 @@ class AnthropicChatClient(ChatCompletionClient):
     ) -> "AnthropicChatClient":
         client = build_client(vendor_configuration)
         return cls(client, model_configuration, span=span)
+
+
+async def stream_response_item(chat_response: ChatResponse):
+    yield chat_response
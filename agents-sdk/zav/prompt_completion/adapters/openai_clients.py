@@ -1,11 +1,26 @@
 import asyncio
+import copy
+import functools
 import json
 import re
 from datetime import datetime
-from typing import Any, AsyncIterator, Dict, List, Optional, Union, cast, overload
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+    overload,
+)
 
 import openai
 from openai import BadRequestError
+from openai.types.chat.chat_completion import ChatCompletion
 from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
 from openai.types.chat.chat_completion_named_tool_choice_param import (
     ChatCompletionNamedToolChoiceParam,
@@ -16,6 +31,7 @@ from openai.types.chat.chat_completion_named_tool_choice_param import (
 from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
 from openai.types.chat.completion_create_params import Function
 from openai.types.completion_choice import CompletionChoice
+from openai.types.completion_usage import CompletionUsage
 from pydantic import BaseModel
 from typing_extensions import Literal
 from zav.llm_domain import (
@@ -23,6 +39,7 @@ from zav.llm_domain import (
     LLMModelType,
     LLMProviderName,
     OpenAIConfiguration,
+    PromptBatchingConfiguration,
 )
 from zav.llm_tracing import Span, now
 
@@ -48,6 +65,12 @@ from zav.prompt_completion.client_factories import (
     PromptClientFactory,
     PromptWithLogitsClientFactory,
 )
+from zav.prompt_completion.rate_limiter import (
+    create_with_rate_limit,
+    rate_limiter_for,
+)
+from zav.prompt_completion.sdk_clients import sdk_client_registry
+from zav.prompt_completion.tokenizer import Tokenizer, fit_request
 
 
 class OAIFunctionCall(BaseModel):
@@ -60,6 +83,9 @@ class OAIToolCall(BaseModel):
     function: Optional[OAIFunctionCall] = None
 
 
+CHARACTERS_PER_TOKEN = 4
+
+
 def __extract_int_from_text(pattern: str, text: str) -> Optional[int]:
     """Extract int from text."""
     match = re.search(pattern, text)
@@ -83,29 +109,220 @@ def generate_prompt_too_long_error(error_message: str):
     return PromptTooLargeError(error_message, extra_tokens)
 
 
-def build_client(vendor_configuration: OpenAIConfiguration):
+def usage_attributes(usage: Optional[CompletionUsage]) -> Dict[str, Any]:
+    return (
+        {
+            "usage": {
+                "input": usage.prompt_tokens,
+                "output": usage.completion_tokens,
+                "total": usage.total_tokens,
+                "unit": "TOKENS",
+            }
+        }
+        if usage
+        else {}
+    )
+
+
+def estimate_prompt_tokens(prompt: str, max_tokens: int) -> int:
+    return len(prompt) // CHARACTERS_PER_TOKEN + max_tokens
+
+
+def pack_prompts(
+    prompts: List[str], max_tokens: int, batching: PromptBatchingConfiguration
+) -> List[List[int]]:
+    """Group prompt indices into batches respecting the size and token limits.
+
+    Prompt tokens are estimated from the number of characters. A prompt that
+    exceeds the token budget on its own is sent in a batch of its own.
+    """
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    batch_tokens = 0
+    for index, prompt in enumerate(prompts):
+        prompt_tokens = estimate_prompt_tokens(prompt, max_tokens)
+        if batch and (
+            len(batch) >= batching.max_batch_size
+            or (
+                batching.max_batch_tokens is not None
+                and batch_tokens + prompt_tokens > batching.max_batch_tokens
+            )
+        ):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(index)
+        batch_tokens += prompt_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def complete_in_batches(
+    prompts: List[str],
+    max_tokens: int,
+    batching: PromptBatchingConfiguration,
+    complete_batch: Callable[[List[str], int], Awaitable[List[PromptResponse]]],
+) -> List[PromptResponse]:
+    semaphore = asyncio.Semaphore(batching.max_concurrent_batches)
+
+    async def run(batch: List[int]) -> List[PromptResponse]:
+        async with semaphore:
+            return await complete_batch([prompts[index] for index in batch], max_tokens)
+
+    batches = pack_prompts(prompts, max_tokens, batching)
+    batch_responses = await asyncio.gather(*[run(batch) for batch in batches])
+    responses: List[Optional[PromptResponse]] = [None] * len(prompts)
+    for batch, prompt_responses in zip(batches, batch_responses):
+        for index, prompt_response in zip(batch, prompt_responses):
+            responses[index] = prompt_response
+    return cast(List[PromptResponse], responses)
+
+
+def prompt_error_from(e: BadRequestError, wrap: bool = False) -> Exception:
+    if e.status_code == 400 and "context_length_exceeded" in e.message:
+        return generate_prompt_too_long_error(e.message)
+    if wrap:
+        return Exception(f"Prompt completion failed with error: {e.message}")
+    return e
+
+
+def prompt_response_from(answer_choice: CompletionChoice) -> PromptResponse:
+    return PromptResponse(
+        error=None, prompt_answer=PromptAnswer(text=answer_choice.text.strip())
+    )
+
+
+async def complete_batch(
+    completions: Any,
+    params: Dict[str, Any],
+    prompts: List[str],
+    max_tokens: int,
+    prompt_response_from: Callable[[CompletionChoice], PromptResponse],
+    complete_prompt: Callable[[str, int], Awaitable[PromptResponse]],
+    rate_limiter: Optional[Any] = None,
+    wrap_errors: bool = False,
+    span: Optional[Span] = None,
+) -> List[PromptResponse]:
+    """Complete the prompts of a batch with a single request.
+
+    A bad request fails the whole batch even when a single prompt caused it, e.g.
+    one that exceeds the context window, so the prompts of a rejected batch are
+    sent again one by one.
+    """
+    generation_span: Optional[Span] = None
+    try:
+        generation_span = (
+            span.new(
+                name="prompt-completion",
+                attributes={
+                    "observation_type": "generation",
+                    "model": params["model"],
+                    "input": prompts,
+                    "model_parameters": {
+                        "temperature": params.get("temperature"),
+                        "max_tokens": max_tokens,
+                        "batch_size": len(prompts),
+                    },
+                },
+            )
+            if span
+            else None
+        )
+        answer = await create_with_rate_limit(
+            completions,
+            dict(params, prompt=prompts, max_tokens=max_tokens),
+            rate_limiter=rate_limiter,
+            tokens=sum(estimate_prompt_tokens(p, max_tokens) for p in prompts),
+            span=generation_span or span,
+        )
+        choices = {choice.index: choice for choice in answer.choices}
+        if generation_span:
+            generation_span.end(
+                attributes={
+                    "output": [
+                        choices[index].text if index in choices else None
+                        for index in range(len(prompts))
+                    ],
+                    **usage_attributes(answer.usage),
+                }
+            )
+        return [
+            (
+                prompt_response_from(choices[index])
+                if index in choices
+                else PromptResponse(
+                    error=Exception("No completion returned for prompt"),
+                    prompt_answer=None,
+                )
+            )
+            for index in range(len(prompts))
+        ]
+    except BadRequestError as e:
+        if generation_span:
+            generation_span.end(
+                attributes={
+                    "level": "ERROR",
+                    "status_message": e.message,
+                }
+            )
+        if len(prompts) > 1:
+            return await asyncio.gather(
+                *[complete_prompt(prompt, max_tokens) for prompt in prompts]
+            )
+        return [
+            PromptResponse(error=prompt_error_from(e, wrap_errors), prompt_answer=None)
+        ]
+    except Exception as e:
+        if generation_span:
+            generation_span.end(
+                attributes={
+                    "level": "ERROR",
+                    "status_message": str(e),
+                }
+            )
+        return [PromptResponse(error=e, prompt_answer=None) for _ in prompts]
+
+
+def build_client(
+    vendor_configuration: OpenAIConfiguration,
+) -> Union[openai.AsyncAzureOpenAI, openai.AsyncOpenAI]:
     organization = vendor_configuration.openai_org.get_unencrypted_secret()
     api_key = vendor_configuration.openai_api_key.get_unencrypted_secret()
-    if vendor_configuration.openai_api_type == "azure":
-        if vendor_configuration.openai_api_base:
-            return openai.AsyncAzureOpenAI(
-                api_key=api_key,
-                organization=organization,
-                api_version=vendor_configuration.openai_api_version,
-                azure_endpoint=vendor_configuration.openai_api_base,
-            )
+
+    def create_client() -> Union[openai.AsyncAzureOpenAI, openai.AsyncOpenAI]:
+        http_client = openai.DefaultAsyncHttpxClient(limits=sdk_client_registry.limits)
+        if vendor_configuration.openai_api_type == "azure":
+            if vendor_configuration.openai_api_base:
+                return openai.AsyncAzureOpenAI(
+                    api_key=api_key,
+                    organization=organization,
+                    api_version=vendor_configuration.openai_api_version,
+                    azure_endpoint=vendor_configuration.openai_api_base,
+                    http_client=http_client,
+                )
+            else:
+                return openai.AsyncAzureOpenAI(
+                    api_key=api_key,
+                    organization=organization,
+                    api_version=vendor_configuration.openai_api_version,
+                    http_client=http_client,
+                )
         else:
-            return openai.AsyncAzureOpenAI(
+            return openai.AsyncOpenAI(
                 api_key=api_key,
                 organization=organization,
-                api_version=vendor_configuration.openai_api_version,
+                base_url=vendor_configuration.openai_api_base,
+                http_client=http_client,
             )
-    else:
-        return openai.AsyncOpenAI(
-            api_key=api_key,
-            organization=organization,
-            base_url=vendor_configuration.openai_api_base,
-        )
+
+    return sdk_client_registry.get_or_create(
+        vendor=LLMProviderName.OPENAI,
+        create_fn=create_client,
+        credentials=(api_key, organization),
+        api_base=vendor_configuration.openai_api_base,
+        api_type=vendor_configuration.openai_api_type,
+        api_version=vendor_configuration.openai_api_version,
+    )
 
 
 @PromptWithLogitsClientFactory.register(
@@ -120,22 +337,54 @@ class OpenAiPromptWithLogitsClient(PromptCompletionWithLogitsClient):
         model_configuration: LLMModelConfiguration,
         span: Optional[Span] = None,
     ):
-        self.__client = client
+        self.__rate_limiter = rate_limiter_for(
+            LLMProviderName.OPENAI, client, model_configuration
+        )
+        # Rate limited calls are retried by the limiter instead of the SDK
+        self.__client = (
+            client.with_options(max_retries=0) if self.__rate_limiter else client
+        )
         self.__model_name = model_configuration.name
         self.__model_temperature = model_configuration.temperature
+        self.__prompt_batching = model_configuration.prompt_batching
         self.__span = span
 
     async def complete(
-        self, prompts: List[str], max_tokens: int
+        self, prompts: List[str], max_tokens: int, span: Optional[Span] = None
     ) -> List[PromptResponse]:
+        span = span or self.__span
+        if self.__prompt_batching:
+            return await complete_in_batches(
+                prompts,
+                max_tokens,
+                self.__prompt_batching,
+                functools.partial(
+                    complete_batch,
+                    self.__client.completions,
+                    dict(
+                        model=self.__model_name,
+                        temperature=self.__model_temperature,
+                        logprobs=self.__INCLUDE_LOGPROBS_FOR_MOST_LIKELY_TOKEN,
+                    ),
+                    prompt_response_from=self.__prompt_response_from,
+                    complete_prompt=functools.partial(
+                        self.__complete_prompt, span=span
+                    ),
+                    rate_limiter=self.__rate_limiter,
+                    wrap_errors=True,
+                    span=span,
+                ),
+            )
         return await asyncio.gather(
-            *[self.__complete_prompt(prompt, max_tokens) for prompt in prompts]
+            *[self.__complete_prompt(prompt, max_tokens, span) for prompt in prompts]
         )
 
-    async def __complete_prompt(self, prompt: str, max_tokens: int) -> PromptResponse:
+    async def __complete_prompt(
+        self, prompt: str, max_tokens: int, span: Optional[Span] = None
+    ) -> PromptResponse:
         try:
             generation_span = (
-                self.__span.new(
+                span.new(
                     name="prompt-completion",
                     attributes={
                         "observation_type": "generation",
@@ -147,15 +396,21 @@ class OpenAiPromptWithLogitsClient(PromptCompletionWithLogitsClient):
                         },
                     },
                 )
-                if self.__span
+                if span
                 else None
             )
-            answer = await self.__client.completions.create(
-                model=self.__model_name,
-                prompt=prompt,
-                max_tokens=max_tokens,
-                temperature=self.__model_temperature,
-                logprobs=self.__INCLUDE_LOGPROBS_FOR_MOST_LIKELY_TOKEN,
+            answer = await create_with_rate_limit(
+                self.__client.completions,
+                dict(
+                    model=self.__model_name,
+                    prompt=prompt,
+                    max_tokens=max_tokens,
+                    temperature=self.__model_temperature,
+                    logprobs=self.__INCLUDE_LOGPROBS_FOR_MOST_LIKELY_TOKEN,
+                ),
+                rate_limiter=self.__rate_limiter,
+                tokens=estimate_prompt_tokens(prompt, max_tokens),
+                span=generation_span or span,
             )
             if generation_span:
                 generation_span.end(
@@ -225,6 +480,11 @@ class OpenAiPromptWithLogitsClient(PromptCompletionWithLogitsClient):
             ),
         )
 
+    def with_span(self, span: Optional[Span] = None) -> "OpenAiPromptWithLogitsClient":
+        client = copy.copy(self)
+        client.__span = span
+        return client
+
     @classmethod
     def from_configuration(
         cls,
@@ -245,22 +505,52 @@ class OpenAiPromptClient(PromptCompletionClient):
         model_configuration: LLMModelConfiguration,
         span: Optional[Span] = None,
     ):
-        self.__client = client
+        self.__rate_limiter = rate_limiter_for(
+            LLMProviderName.OPENAI, client, model_configuration
+        )
+        # Rate limited calls are retried by the limiter instead of the SDK
+        self.__client = (
+            client.with_options(max_retries=0) if self.__rate_limiter else client
+        )
         self.__model_name = model_configuration.name
         self.__model_temperature = model_configuration.temperature
+        self.__prompt_batching = model_configuration.prompt_batching
         self.__span = span
 
     async def complete(
-        self, prompts: List[str], max_tokens: int
+        self, prompts: List[str], max_tokens: int, span: Optional[Span] = None
     ) -> List[PromptResponse]:
+        span = span or self.__span
+        if self.__prompt_batching:
+            return await complete_in_batches(
+                prompts,
+                max_tokens,
+                self.__prompt_batching,
+                functools.partial(
+                    complete_batch,
+                    self.__client.completions,
+                    dict(
+                        model=self.__model_name,
+                        temperature=self.__model_temperature,
+                    ),
+                    prompt_response_from=prompt_response_from,
+                    complete_prompt=functools.partial(
+                        self.__complete_prompt, span=span
+                    ),
+                    rate_limiter=self.__rate_limiter,
+                    span=span,
+                ),
+            )
         return await asyncio.gather(
-            *[self.__complete_prompt(prompt, max_tokens) for prompt in prompts]
+            *[self.__complete_prompt(prompt, max_tokens, span) for prompt in prompts]
         )
 
-    async def __complete_prompt(self, prompt: str, max_tokens: int) -> PromptResponse:
+    async def __complete_prompt(
+        self, prompt: str, max_tokens: int, span: Optional[Span] = None
+    ) -> PromptResponse:
         try:
             generation_span = (
-                self.__span.new(
+                span.new(
                     name="prompt-completion",
                     attributes={
                         "observation_type": "generation",
@@ -272,14 +562,20 @@ class OpenAiPromptClient(PromptCompletionClient):
                         },
                     },
                 )
-                if self.__span
+                if span
                 else None
             )
-            answer = await self.__client.completions.create(
-                model=self.__model_name,
-                prompt=prompt,
-                max_tokens=max_tokens,
-                temperature=self.__model_temperature,
+            answer = await create_with_rate_limit(
+                self.__client.completions,
+                dict(
+                    model=self.__model_name,
+                    prompt=prompt,
+                    max_tokens=max_tokens,
+                    temperature=self.__model_temperature,
+                ),
+                rate_limiter=self.__rate_limiter,
+                tokens=estimate_prompt_tokens(prompt, max_tokens),
+                span=generation_span or span,
             )
             if generation_span:
                 generation_span.end(
@@ -326,6 +622,11 @@ class OpenAiPromptClient(PromptCompletionClient):
                 )
             return PromptResponse(error=e, prompt_answer=None)
 
+    def with_span(self, span: Optional[Span] = None) -> "OpenAiPromptClient":
+        client = copy.copy(self)
+        client.__span = span
+        return client
+
     @classmethod
     def from_configuration(
         cls,
@@ -359,18 +660,31 @@ class OpenAiChatClient(ChatCompletionClient):
         model_configuration: LLMModelConfiguration,
         span: Optional[Span] = None,
     ):
-        self.__client = client
+        self.__rate_limiter = rate_limiter_for(
+            LLMProviderName.OPENAI, client, model_configuration
+        )
+        # Rate limited calls are retried by the limiter instead of the SDK
+        self.__client = (
+            client.with_options(max_retries=0) if self.__rate_limiter else client
+        )
         self.__model_name = model_configuration.name
         self.__model_temperature = model_configuration.temperature
         self.__json_output = model_configuration.json_output
         self.__interleave_system_message = model_configuration.interleave_system_message
         self.__span = span
+        self.__token_budget = model_configuration.token_budget
+        self.__tokenizer = (
+            Tokenizer.for_model(LLMProviderName.OPENAI, model_configuration.name)
+            if self.__token_budget
+            else Tokenizer()
+        )
 
     @overload
     async def complete(  # type: ignore
         self,
         request: ChatClientRequest,
         stream: Literal[False] = False,
+        span: Optional[Span] = None,
     ) -> ChatResponse: ...
 
     @overload
@@ -378,6 +692,7 @@ class OpenAiChatClient(ChatCompletionClient):
         self,
         request: ChatClientRequest,
         stream: Literal[True] = True,
+        span: Optional[Span] = None,
     ) -> AsyncIterator[ChatResponse]: ...
 
     @overload
@@ -385,13 +700,20 @@ class OpenAiChatClient(ChatCompletionClient):
         self,
         request: ChatClientRequest,
         stream: bool = False,
+        span: Optional[Span] = None,
     ) -> Union[AsyncIterator[ChatResponse], ChatResponse]: ...
 
     async def complete(
         self,
         request: ChatClientRequest,
         stream: Union[Literal[True, False], bool] = False,
+        span: Optional[Span] = None,
     ) -> Union[AsyncIterator[ChatResponse], ChatResponse]:
+        span = span or self.__span
+        request, error = await self.__fit(request, span)
+        if error is not None:
+            return self.__error_response(error, stream)
+        generation_span: Optional[Span] = None
         try:
             messages = self.__messages_from(request["conversation"])
             functions_dict = (
@@ -413,7 +735,7 @@ class OpenAiChatClient(ChatCompletionClient):
                 tools_dict=tools_dict,
                 model_name=self.__model_name,
                 model_temperature=self.__model_temperature,
-                span=self.__span,
+                span=span,
                 max_tokens=request["max_tokens"],
                 json_output=self.__json_output,
                 interleave_system_message=self.__interleave_system_message,
@@ -431,201 +753,29 @@ class OpenAiChatClient(ChatCompletionClient):
                     )
                     else request.get("tool_choice", "auto")
                 )
-            response = await self.__client.chat.completions.create(
-                model=self.__model_name,
-                messages=messages,
-                max_tokens=request["max_tokens"],
-                temperature=self.__model_temperature,
-                stream=stream,
-                **functions_dict,
-                **(
-                    {"response_format": {"type": "json_object"}}
-                    if self.__json_output
-                    else {}
-                ),  # type: ignore
-                **tools_dict,
+            response = await create_with_rate_limit(
+                self.__client.chat.completions,
+                dict(
+                    model=self.__model_name,
+                    messages=messages,
+                    max_tokens=request["max_tokens"],
+                    temperature=self.__model_temperature,
+                    stream=stream,
+                    **functions_dict,
+                    **(
+                        {"response_format": {"type": "json_object"}}
+                        if self.__json_output
+                        else {}
+                    ),  # type: ignore
+                    **tools_dict,
+                ),
+                rate_limiter=self.__rate_limiter,
+                tokens=self.__rate_limited_tokens(request),
+                span=generation_span or span,
             )
             if isinstance(response, AsyncIterator):
-
-                async def stream_response(
-                    response: AsyncIterator[ChatCompletionChunk],
-                ) -> AsyncIterator[ChatResponse]:
-                    completion_start_time: Optional[datetime] = None
-                    content_buffer: Optional[str] = None
-                    role_buffer: Optional[str] = None
-                    function_call_buffer: Optional[OAIFunctionCall] = None
-                    function_call_buffer_trace: Optional[OAIFunctionCall] = None
-                    tool_calls_buffer: List[OAIToolCall] = []
-                    tool_calls_buffer_trace: List[OAIToolCall] = []
-                    usage_buffer: Dict = {}
-                    async for chunk in response:
-                        if generation_span and completion_start_time is None:
-                            completion_start_time = now()
-                            generation_span.update(
-                                attributes={
-                                    "completion_start_time": completion_start_time,
-                                }
-                            )
-                        if generation_span:
-                            usage_buffer = (
-                                {
-                                    "usage": {
-                                        "input": chunk.usage.prompt_tokens,
-                                        "output": chunk.usage.completion_tokens,
-                                        "total": chunk.usage.total_tokens,
-                                        "unit": "TOKENS",
-                                    }
-                                }
-                                if chunk.usage
-                                else {}
-                            )
-                        choice_chunk = chunk.choices[0]
-                        if choice_chunk is None:
-                            # This is a completion chunk with no choices, skip it
-                            continue
-
-                        if choice_chunk.delta.role is not None:
-                            role_buffer = choice_chunk.delta.role
-
-                        if (fn_call := choice_chunk.delta.function_call) is not None:
-                            if fn_call.name is not None:
-                                function_call_buffer = OAIFunctionCall(
-                                    name=fn_call.name,
-                                    arguments=fn_call.arguments or "",
-                                )
-                            if fn_call.arguments is not None and function_call_buffer:
-                                function_call_buffer.arguments += fn_call.arguments
-                            # We need to wait until the function call is complete
-                            # because we don't support non-parseable arguments
-                            continue
-                        if function_call_buffer:
-                            yield ChatResponse(
-                                error=None,
-                                chat_message=self.__parse_chat_message(
-                                    content=content_buffer,
-                                    role=role_buffer,
-                                    function_call=function_call_buffer,
-                                    tool_calls=None,
-                                ),
-                            )
-                            function_call_buffer_trace = function_call_buffer
-                            function_call_buffer = None
-
-                        if (tool_calls := choice_chunk.delta.tool_calls) is not None:
-                            for tool_call in tool_calls:
-                                if tool_call.id is not None:
-                                    tool_calls_buffer.append(
-                                        OAIToolCall(id=tool_call.id)
-                                    )
-                                if (
-                                    tool_fn := tool_call.function
-                                ) is not None and tool_calls_buffer:
-                                    existing_tool_call = tool_calls_buffer[-1]
-                                    if tool_fn.name is not None:
-                                        existing_tool_call.function = OAIFunctionCall(
-                                            name=tool_fn.name,
-                                            arguments=tool_fn.arguments or "",
-                                        )
-                                    if (
-                                        tool_fn.arguments is not None
-                                        and existing_tool_call.function is not None
-                                    ):
-                                        existing_tool_call.function.arguments += (
-                                            tool_fn.arguments
-                                        )
-                            # We need to wait until all tool calls are complete
-                            # because we don't support non-parseable arguments
-                            continue
-
-                        if tool_calls_buffer:
-                            yield ChatResponse(
-                                error=None,
-                                chat_message=self.__parse_chat_message(
-                                    content=content_buffer,
-                                    role=role_buffer,
-                                    function_call=None,
-                                    tool_calls=tool_calls_buffer,
-                                ),
-                            )
-                            tool_calls_buffer_trace = tool_calls_buffer
-                            tool_calls_buffer = []
-
-                        if choice_chunk.delta.content:
-                            content_buffer = (
-                                content_buffer + choice_chunk.delta.content
-                                if content_buffer
-                                else choice_chunk.delta.content
-                            )
-                            yield ChatResponse(
-                                error=None,
-                                chat_message=self.__parse_chat_message(
-                                    content=content_buffer,
-                                    role=role_buffer,
-                                    function_call=None,
-                                    tool_calls=None,
-                                ),
-                            )
-                    end_span(
-                        tool_calls=tool_calls_buffer_trace,
-                        usage=usage_buffer,
-                        span=generation_span,
-                        content=content_buffer,
-                        role=role_buffer,
-                        function_call=function_call_buffer_trace,
-                    )
-
-                return stream_response(response)
-
-            else:
-                choice = response.choices[0]
-                function_call = (
-                    OAIFunctionCall(
-                        name=fn_call.name,
-                        arguments=fn_call.arguments,
-                    )
-                    if (fn_call := choice.message.function_call)
-                    else None
-                )
-                tool_calls = (
-                    [
-                        OAIToolCall(
-                            id=tool_call.id,
-                            function=OAIFunctionCall(
-                                name=tool_call.function.name,
-                                arguments=tool_call.function.arguments,
-                            ),
-                        )
-                        for tool_call in tool_calls
-                    ]
-                    if (tool_calls := choice.message.tool_calls)
-                    else []
-                )
-                end_span(
-                    tool_calls=tool_calls,
-                    usage=(
-                        {
-                            "usage": {
-                                "input": response.usage.prompt_tokens,
-                                "output": response.usage.completion_tokens,
-                                "total": response.usage.total_tokens,
-                                "unit": "TOKENS",
-                            }
-                        }
-                        if response.usage
-                        else {}
-                    ),
-                    span=generation_span,
-                    content=choice.message.content,
-                    role=choice.message.role,
-                    function_call=function_call,
-                )
-                chat_message = self.__parse_chat_message(
-                    content=choice.message.content,
-                    role=choice.message.role,
-                    function_call=function_call,
-                    tool_calls=tool_calls,
-                )
-                return ChatResponse(error=None, chat_message=chat_message)
+                return self.__stream_response(response, generation_span)
+            return self.__chat_response_from(response, generation_span)
         except BadRequestError as e:
             if generation_span:
                 generation_span.end(
@@ -638,11 +788,7 @@ class OpenAiChatClient(ChatCompletionClient):
                 error = generate_prompt_too_long_error(e.message)
             else:
                 error = e
-            return (
-                stream_response_item(ChatResponse(error=error, chat_message=None))
-                if stream
-                else ChatResponse(error=error, chat_message=None)
-            )
+            return self.__error_response(error, stream)
         except Exception as error:
             if generation_span:
                 generation_span.end(
@@ -651,11 +797,209 @@ class OpenAiChatClient(ChatCompletionClient):
                         "status_message": str(error),
                     }
                 )
-            return (
-                stream_response_item(ChatResponse(error=error, chat_message=None))
-                if stream
-                else ChatResponse(error=error, chat_message=None)
+            return self.__error_response(error, stream)
+
+    async def __fit(
+        self, request: ChatClientRequest, span: Optional[Span]
+    ) -> Tuple[ChatClientRequest, Optional[PromptTooLargeError]]:
+        """Trim the request to the token budget of the model, if any."""
+        if self.__token_budget is None:
+            return request, None
+        await self.__tokenizer.load()
+        request, _, error = fit_request(
+            request, self.__tokenizer, self.__token_budget, span=span
+        )
+        return request, error
+
+    def __rate_limited_tokens(self, request: ChatClientRequest) -> int:
+        if not self.__rate_limiter:
+            return 0
+        return self.__tokenizer.count_request(request) + request["max_tokens"]
+
+    @staticmethod
+    def __error_response(
+        error: Exception, stream: bool
+    ) -> Union[AsyncIterator[ChatResponse], ChatResponse]:
+        chat_response = ChatResponse(error=error, chat_message=None)
+        return stream_response_item(chat_response) if stream else chat_response
+
+    async def __stream_response(
+        self,
+        response: AsyncIterator[ChatCompletionChunk],
+        generation_span: Optional[Span],
+    ) -> AsyncIterator[ChatResponse]:
+        completion_start_time: Optional[datetime] = None
+        content_buffer: Optional[str] = None
+        role_buffer: Optional[str] = None
+        function_call_buffer: Optional[OAIFunctionCall] = None
+        function_call_buffer_trace: Optional[OAIFunctionCall] = None
+        tool_calls_buffer: List[OAIToolCall] = []
+        tool_calls_buffer_trace: List[OAIToolCall] = []
+        usage_buffer: Dict = {}
+        async for chunk in response:
+            if generation_span and completion_start_time is None:
+                completion_start_time = now()
+                generation_span.update(
+                    attributes={
+                        "completion_start_time": completion_start_time,
+                    }
+                )
+            if generation_span:
+                usage_buffer = (
+                    {
+                        "usage": {
+                            "input": chunk.usage.prompt_tokens,
+                            "output": chunk.usage.completion_tokens,
+                            "total": chunk.usage.total_tokens,
+                            "unit": "TOKENS",
+                        }
+                    }
+                    if chunk.usage
+                    else {}
+                )
+            choice_chunk = chunk.choices[0]
+            if choice_chunk is None:
+                # This is a completion chunk with no choices, skip it
+                continue
+
+            if choice_chunk.delta.role is not None:
+                role_buffer = choice_chunk.delta.role
+
+            if (fn_call := choice_chunk.delta.function_call) is not None:
+                if fn_call.name is not None:
+                    function_call_buffer = OAIFunctionCall(
+                        name=fn_call.name,
+                        arguments=fn_call.arguments or "",
+                    )
+                if fn_call.arguments is not None and function_call_buffer:
+                    function_call_buffer.arguments += fn_call.arguments
+                # We need to wait until the function call is complete
+                # because we don't support non-parseable arguments
+                continue
+            if function_call_buffer:
+                yield ChatResponse(
+                    error=None,
+                    chat_message=self.__parse_chat_message(
+                        content=content_buffer,
+                        role=role_buffer,
+                        function_call=function_call_buffer,
+                        tool_calls=None,
+                    ),
+                )
+                function_call_buffer_trace = function_call_buffer
+                function_call_buffer = None
+
+            if (tool_calls := choice_chunk.delta.tool_calls) is not None:
+                for tool_call in tool_calls:
+                    if tool_call.id is not None:
+                        tool_calls_buffer.append(OAIToolCall(id=tool_call.id))
+                    if (
+                        tool_fn := tool_call.function
+                    ) is not None and tool_calls_buffer:
+                        existing_tool_call = tool_calls_buffer[-1]
+                        if tool_fn.name is not None:
+                            existing_tool_call.function = OAIFunctionCall(
+                                name=tool_fn.name,
+                                arguments=tool_fn.arguments or "",
+                            )
+                        if (
+                            tool_fn.arguments is not None
+                            and existing_tool_call.function is not None
+                        ):
+                            existing_tool_call.function.arguments += tool_fn.arguments
+                # We need to wait until all tool calls are complete
+                # because we don't support non-parseable arguments
+                continue
+
+            if tool_calls_buffer:
+                yield ChatResponse(
+                    error=None,
+                    chat_message=self.__parse_chat_message(
+                        content=content_buffer,
+                        role=role_buffer,
+                        function_call=None,
+                        tool_calls=tool_calls_buffer,
+                    ),
+                )
+                tool_calls_buffer_trace = tool_calls_buffer
+                tool_calls_buffer = []
+
+            if choice_chunk.delta.content:
+                content_buffer = (
+                    content_buffer + choice_chunk.delta.content
+                    if content_buffer
+                    else choice_chunk.delta.content
+                )
+                yield ChatResponse(
+                    error=None,
+                    chat_message=self.__parse_chat_message(
+                        content=content_buffer,
+                        role=role_buffer,
+                        function_call=None,
+                        tool_calls=None,
+                    ),
+                )
+        end_span(
+            tool_calls=tool_calls_buffer_trace,
+            usage=usage_buffer,
+            span=generation_span,
+            content=content_buffer,
+            role=role_buffer,
+            function_call=function_call_buffer_trace,
+        )
+
+    def __chat_response_from(
+        self, response: ChatCompletion, generation_span: Optional[Span]
+    ) -> ChatResponse:
+        choice = response.choices[0]
+        function_call = (
+            OAIFunctionCall(
+                name=fn_call.name,
+                arguments=fn_call.arguments,
             )
+            if (fn_call := choice.message.function_call)
+            else None
+        )
+        tool_calls = (
+            [
+                OAIToolCall(
+                    id=tool_call.id,
+                    function=OAIFunctionCall(
+                        name=tool_call.function.name,
+                        arguments=tool_call.function.arguments,
+                    ),
+                )
+                for tool_call in tool_calls
+            ]
+            if (tool_calls := choice.message.tool_calls)
+            else []
+        )
+        end_span(
+            tool_calls=tool_calls,
+            usage=(
+                {
+                    "usage": {
+                        "input": response.usage.prompt_tokens,
+                        "output": response.usage.completion_tokens,
+                        "total": response.usage.total_tokens,
+                        "unit": "TOKENS",
+                    }
+                }
+                if response.usage
+                else {}
+            ),
+            span=generation_span,
+            content=choice.message.content,
+            role=choice.message.role,
+            function_call=function_call,
+        )
+        chat_message = self.__parse_chat_message(
+            content=choice.message.content,
+            role=choice.message.role,
+            function_call=function_call,
+            tool_calls=tool_calls,
+        )
+        return ChatResponse(error=None, chat_message=chat_message)
 
     def __messages_from(self, conversation: BotConversation):
         messages: List[Any] = []
@@ -873,6 +1217,11 @@ class OpenAiChatClient(ChatCompletionClient):
             ]
         return msg
 
+    def with_span(self, span: Optional[Span] = None) -> "OpenAiChatClient":
+        client = copy.copy(self)
+        client.__span = span
+        return client
+
     @classmethod
     def from_configuration(
         cls,
@@ -893,6 +1242,7 @@ class OpenAiChatClient2PromptClientAdapter(PromptCompletionClient):
         self,
         prompts: List[str],
         max_tokens: int,
+        span: Optional[Span] = None,
     ) -> List[PromptResponse]:
         bot_conversations = [self.__to_bot_conversation(prompt) for prompt in prompts]
 
@@ -900,6 +1250,7 @@ class OpenAiChatClient2PromptClientAdapter(PromptCompletionClient):
             *[
                 self.__chat_client.complete(
                     ChatClientRequest(conversation=conversation, max_tokens=max_tokens),
+                    span=span,
                 )
                 for conversation in bot_conversations
             ]
@@ -927,6 +1278,13 @@ class OpenAiChatClient2PromptClientAdapter(PromptCompletionClient):
         )
         return PromptResponse(error=chat_response.error, prompt_answer=prompt_answer)
 
+    def with_span(
+        self, span: Optional[Span] = None
+    ) -> "OpenAiChatClient2PromptClientAdapter":
+        return OpenAiChatClient2PromptClientAdapter(
+            chat_client=self.__chat_client.with_span(span)
+        )
+
     @classmethod
     def from_configuration(
         cls,
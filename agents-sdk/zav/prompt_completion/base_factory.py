@@ -1,9 +1,10 @@
-from typing import Callable, Dict, Generic, Optional, Tuple, Type, TypeVar
+from typing import Callable, Dict, Generic, Optional, Tuple, Type, TypeVar, cast
 
 from zav.llm_domain import LLMClientConfiguration, LLMModelType, LLMProviderName
 from zav.llm_tracing import Span
 
 from zav.prompt_completion.client import BaseCompletionClient
+from zav.prompt_completion.response_cache import with_response_cache
 
 PROMPT_COMPLETION_CLIENT = TypeVar(
     "PROMPT_COMPLETION_CLIENT", bound=BaseCompletionClient
@@ -44,10 +45,21 @@ class BaseClientFactory(Generic[PROMPT_COMPLETION_CLIENT]):
         )
         if not vendor_configuration:
             raise ValueError(f"Vendor configuration not found for: {config.vendor}")
-        return cls.registry[
+        client = cls.registry[
             (config.vendor, config.model_configuration.type)
         ].from_configuration(
             vendor_configuration=vendor_configuration,
             model_configuration=config.model_configuration,
             span=span,
         )
+        if config.model_configuration.response_cache:
+            return cast(
+                PROMPT_COMPLETION_CLIENT,
+                with_response_cache(
+                    client,
+                    vendor=config.vendor,
+                    model_configuration=config.model_configuration,
+                    span=span,
+                ),
+            )
+        return client
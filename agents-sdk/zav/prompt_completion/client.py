@@ -130,11 +130,19 @@ class BaseCompletionClient(ABC):
     ) -> "BaseCompletionClient":
         raise NotImplementedError
 
+    def with_span(self, span: Optional[Span] = None) -> "BaseCompletionClient":
+        """Return a client that traces under `span` and shares the connections.
+
+        Clients that are shared across requests must implement it, so that every
+        request is traced under its own span.
+        """
+        raise NotImplementedError
+
 
 class PromptCompletionClient(BaseCompletionClient):
     @abstractmethod
     async def complete(
-        self, prompts: List[str], max_tokens: int
+        self, prompts: List[str], max_tokens: int, span: Optional[Span] = None
     ) -> List[PromptResponse]:
 
         raise NotImplementedError
@@ -143,7 +151,7 @@ class PromptCompletionClient(BaseCompletionClient):
 class PromptCompletionWithLogitsClient(BaseCompletionClient):
     @abstractmethod
     async def complete(
-        self, prompts: List[str], max_tokens: int
+        self, prompts: List[str], max_tokens: int, span: Optional[Span] = None
     ) -> List[PromptResponse]:
 
         raise NotImplementedError
@@ -161,21 +169,30 @@ class ChatCompletionClient(BaseCompletionClient):
     @abstractmethod
     @overload
     async def complete(  # type: ignore
-        self, request: ChatClientRequest, stream: Literal[False] = False
+        self,
+        request: ChatClientRequest,
+        stream: Literal[False] = False,
+        span: Optional[Span] = None,
     ) -> ChatResponse:
         pass
 
     @abstractmethod
     @overload
     async def complete(
-        self, request: ChatClientRequest, stream: Literal[True] = True
+        self,
+        request: ChatClientRequest,
+        stream: Literal[True] = True,
+        span: Optional[Span] = None,
     ) -> AsyncIterator[ChatResponse]:
         pass
 
     @abstractmethod
     @overload
     async def complete(
-        self, request: ChatClientRequest, stream: bool = False
+        self,
+        request: ChatClientRequest,
+        stream: bool = False,
+        span: Optional[Span] = None,
     ) -> Union[AsyncIterator[ChatResponse], ChatResponse]:
         pass
 
@@ -184,6 +201,11 @@ class ChatCompletionClient(BaseCompletionClient):
         self,
         request: ChatClientRequest,
         stream: Union[Literal[True, False], bool] = False,
+        span: Optional[Span] = None,
     ) -> Union[AsyncIterator[ChatResponse], ChatResponse]:
+        """Complete the conversation of the request.
 
+        The `span` traces this call only and takes precedence over the span the
+        client was created with.
+        """
         raise NotImplementedError
@@ -1,12 +1,29 @@
+from typing import Optional
+
+from zav.llm_domain import LLMClientConfiguration
+from zav.llm_tracing import Span
+
 from zav.prompt_completion.base_factory import BaseClientFactory
 from zav.prompt_completion.client import (
     ChatCompletionClient,
     PromptCompletionClient,
     PromptCompletionWithLogitsClient,
 )
+from zav.prompt_completion.failover import FailoverChatCompletionClient
 
 
-class ChatClientFactory(BaseClientFactory[ChatCompletionClient]): ...
+class ChatClientFactory(BaseClientFactory[ChatCompletionClient]):
+    @classmethod
+    def create(
+        cls,
+        config: LLMClientConfiguration,
+        span: Optional[Span] = None,
+    ) -> ChatCompletionClient:
+        if config.failover and config.failover.backends:
+            return FailoverChatCompletionClient.from_client_configuration(
+                config, span=span
+            )
+        return super().create(config, span=span)
 
 
 class PromptClientFactory(BaseClientFactory[PromptCompletionClient]): ...
@@ -0,0 +1,216 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from typing_extensions import Literal
+from zav.llm_domain import (
+    FailoverConfiguration,
+    LLMClientConfiguration,
+    LLMModelConfiguration,
+    LLMProviderName,
+    LLMVendorConfiguration,
+)
+from zav.llm_tracing import Span
+
+from zav.prompt_completion.client import (
+    ChatClientRequest,
+    ChatCompletionClient,
+    ChatResponse,
+)
+
+Attempt = Tuple[ChatResponse, Optional[AsyncIterator[ChatResponse]]]
+
+
+async def _attempt(
+    client: ChatCompletionClient,
+    request: ChatClientRequest,
+    stream: bool,
+    span: Optional[Span],
+) -> Attempt:
+    """Return the response, or the first chunk and the rest of the stream."""
+    if not stream:
+        return await client.complete(request, stream=False, span=span), None
+    chat_responses = await client.complete(request, stream=True, span=span)
+    try:
+        first = await chat_responses.__anext__()
+    except StopAsyncIteration:
+        return (
+            ChatResponse(error=Exception("Empty response stream"), chat_message=None),
+            None,
+        )
+    return first, chat_responses
+
+
+def _close_attempt(task: "asyncio.Future[Attempt]"):
+    if task.cancelled() or task.exception() is not None:
+        return
+    _, chat_responses = task.result()
+    if chat_responses is not None and hasattr(chat_responses, "aclose"):
+        asyncio.ensure_future(chat_responses.aclose())  # type: ignore
+
+
+async def stream_response_item(chat_response: ChatResponse):
+    yield chat_response
+
+
+async def _continue_stream(
+    first: ChatResponse, chat_responses: AsyncIterator[ChatResponse]
+) -> AsyncIterator[ChatResponse]:
+    yield first
+    async for chat_response in chat_responses:
+        yield chat_response
+
+
+class FailoverChatCompletionClient(ChatCompletionClient):
+    """Completes with the first backend that succeeds, hedging slow ones.
+
+    Backends are called in order. The next one is called as soon as the current ones
+    failed or, when `hedge_delay` is set, when none of them responded within that
+    many seconds. Once a stream has produced its first chunk it is not replaced.
+    """
+
+    def __init__(
+        self,
+        clients: List[ChatCompletionClient],
+        hedge_delay: Optional[float] = None,
+        span: Optional[Span] = None,
+    ):
+        if not clients:
+            raise ValueError("At least one backend is required")
+        self.__clients = clients
+        self.__hedge_delay = hedge_delay
+        self.__span = span
+
+    async def complete(  # type: ignore
+        self,
+        request: ChatClientRequest,
+        stream: Union[Literal[True, False], bool] = False,
+        span: Optional[Span] = None,
+    ) -> Union[AsyncIterator[ChatResponse], ChatResponse]:
+        span = span or self.__span
+        first, chat_responses = await self.__race(request, stream, span)
+        if not stream:
+            return first
+        if chat_responses is None:
+            return stream_response_item(first)
+        return _continue_stream(first, chat_responses)
+
+    async def __race(
+        self,
+        request: ChatClientRequest,
+        stream: bool,
+        span: Optional[Span],
+    ) -> Attempt:
+        pending: Dict["asyncio.Future[Attempt]", int] = {}
+        started = 0
+        last_error: Optional[ChatResponse] = None
+
+        def start_next(reason: str):
+            nonlocal started
+            if span and started > 0:
+                span.add_event(
+                    name="llm-failover",
+                    attributes={"backend": started, "reason": reason},
+                )
+            task = asyncio.ensure_future(
+                _attempt(self.__clients[started], request, stream, span)
+            )
+            pending[task] = started
+            started += 1
+
+        start_next("first")
+        try:
+            while pending:
+                can_hedge = self.__hedge_delay is not None and started < len(
+                    self.__clients
+                )
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.__hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    start_next("hedge")
+                    continue
+                for task in done:
+                    backend = pending.pop(task)
+                    try:
+                        first, chat_responses = task.result()
+                    except Exception as e:
+                        first, chat_responses = (
+                            ChatResponse(error=e, chat_message=None),
+                            None,
+                        )
+                    if first.error is None:
+                        if span and started > 1:
+                            span.add_event(
+                                name="llm-failover-winner",
+                                attributes={"backend": backend},
+                            )
+                        return first, chat_responses
+                    last_error = first
+                if not pending and started < len(self.__clients):
+                    start_next("error")
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_close_attempt)
+        return (
+            last_error
+            or ChatResponse(
+                error=Exception("No backend returned a response"), chat_message=None
+            ),
+            None,
+        )
+
+    def with_span(self, span: Optional[Span] = None) -> "FailoverChatCompletionClient":
+        return FailoverChatCompletionClient(
+            clients=[client.with_span(span) for client in self.__clients],
+            hedge_delay=self.__hedge_delay,
+            span=span,
+        )
+
+    @classmethod
+    def from_client_configuration(
+        cls, config: LLMClientConfiguration, span: Optional[Span] = None
+    ) -> "FailoverChatCompletionClient":
+        """Client of the model of `config`, failing over to its backends."""
+        # Imported here, as the factory builds this client
+        from zav.prompt_completion.client_factories import ChatClientFactory
+
+        if not config.failover or not config.failover.backends:
+            raise ValueError("At least one failover backend is required")
+        return cls(
+            clients=[
+                ChatClientFactory.create(
+                    config.copy(update={"failover": None}), span=span
+                )
+            ]
+            + [
+                ChatClientFactory.create(backend, span=span)
+                for backend in config.failover.backends
+            ],
+            hedge_delay=config.failover.hedge_delay,
+            span=span,
+        )
+
+    @classmethod
+    def from_configuration(
+        cls,
+        vendor_configuration,
+        model_configuration: LLMModelConfiguration,
+        span: Optional[Span] = None,
+        *,
+        vendor: LLMProviderName,
+        failover: FailoverConfiguration,
+    ) -> "FailoverChatCompletionClient":
+        return cls.from_client_configuration(
+            LLMClientConfiguration(
+                vendor=vendor,
+                vendor_configuration=LLMVendorConfiguration(
+                    **{vendor.value: vendor_configuration}
+                ),
+                model_configuration=model_configuration,
+                failover=failover,
+            ),
+            span=span,
+        )
@@ -0,0 +1,484 @@
+import asyncio
+import functools
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from zav.llm_domain import LLMModelConfiguration, RateLimitConfiguration
+from zav.llm_tracing import Span
+
+T = TypeVar("T")
+
+# Too Many Requests, and Anthropic's Overloaded
+RATE_LIMITED_STATUS_CODES = (429, 529)
+
+__DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+__DURATION = re.compile(r"(?:\d+(?:\.\d+)?(?:ms|s|m|h))+")
+__DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a reset or retry-after header into the number of seconds from now.
+
+    Supports plain seconds, OpenAI durations (e.g. 6m0s, 120ms), RFC 3339
+    timestamps (Anthropic) and HTTP dates.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    if __DURATION.fullmatch(value):
+        return sum(
+            float(amount) * __DURATION_UNITS[unit]
+            for amount, unit in __DURATION_PART.findall(value)
+        )
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max((moment - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+@dataclass
+class RateLimitHeaders:
+    remaining_requests: Optional[int] = None
+    requests_reset: Optional[float] = None
+    remaining_tokens: Optional[int] = None
+    tokens_reset: Optional[float] = None
+    retry_after: Optional[float] = None
+
+    @classmethod
+    def parse(cls, headers: Optional[Mapping[str, str]]) -> "RateLimitHeaders":
+        """Read the OpenAI, Azure OpenAI and Anthropic rate limit headers."""
+        if not headers:
+            return cls()
+
+        def first(*names: str) -> Optional[str]:
+            return next((value for name in names if (value := headers.get(name))), None)
+
+        retry_after_ms = _parse_int(first("retry-after-ms"))
+        return cls(
+            remaining_requests=_parse_int(
+                first(
+                    "x-ratelimit-remaining-requests",
+                    "anthropic-ratelimit-requests-remaining",
+                )
+            ),
+            requests_reset=_parse_seconds(
+                first(
+                    "x-ratelimit-reset-requests", "anthropic-ratelimit-requests-reset"
+                )
+            ),
+            remaining_tokens=_parse_int(
+                first(
+                    "x-ratelimit-remaining-tokens",
+                    "anthropic-ratelimit-tokens-remaining",
+                )
+            ),
+            tokens_reset=_parse_seconds(
+                first("x-ratelimit-reset-tokens", "anthropic-ratelimit-tokens-reset")
+            ),
+            retry_after=(
+                retry_after_ms / 1000
+                if retry_after_ms is not None
+                else _parse_seconds(first("retry-after"))
+            ),
+        )
+
+
+@dataclass
+class RateLimiterMetrics:
+    concurrency_limit: float
+    in_flight: int
+    queued: int
+    acquired: int
+    rate_limited: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+
+def _tenant_of(span: Optional[Span]) -> Optional[str]:
+    return span.context.trace_state.get("tenant") if span else None
+
+
+class AdaptiveRateLimiter:
+    """Coordinates the calls to a model deployment across requests.
+
+    Calls wait for a slot when the concurrency limit is reached, when the vendor
+    reported that the request or token budget of the current window is spent, or
+    after a rate limited response. Waiting calls are served round-robin across
+    tenants, so that a burst of one tenant does not starve the others.
+    """
+
+    def __init__(self, config: RateLimitConfiguration):
+        self.__config = config
+        self.__limit = float(
+            min(
+                max(config.initial_concurrency, config.min_concurrency),
+                config.max_concurrency,
+            )
+        )
+        self.__in_flight = 0
+        self.__queues: Dict[Optional[str], Deque[Tuple[asyncio.Future, int]]] = {}
+        self.__tenants: Deque[Optional[str]] = deque()
+        self.__timer: Optional[asyncio.TimerHandle] = None
+        self.__blocked_until = 0.0
+        self.__last_decrease = 0.0
+        self.__remaining_requests: Optional[int] = None
+        self.__requests_reset_at = 0.0
+        self.__remaining_tokens: Optional[int] = None
+        self.__tokens_reset_at = 0.0
+        self.__acquired = 0
+        self.__rate_limited = 0
+        self.__total_wait = 0.0
+        self.__max_wait = 0.0
+
+    def metrics(self) -> RateLimiterMetrics:
+        return RateLimiterMetrics(
+            concurrency_limit=self.__limit,
+            in_flight=self.__in_flight,
+            queued=sum(len(queue) for queue in self.__queues.values()),
+            acquired=self.__acquired,
+            rate_limited=self.__rate_limited,
+            total_wait_seconds=self.__total_wait,
+            max_wait_seconds=self.__max_wait,
+        )
+
+    async def call(
+        self,
+        create_fn: Callable[[], Awaitable[T]],
+        tokens: int = 0,
+        span: Optional[Span] = None,
+        hold: Optional[Callable[[T, Callable[[], None]], Any]] = None,
+    ) -> Any:
+        """Run `create_fn` within a slot, retrying it when it is rate limited.
+
+        Args:
+            create_fn: Sends the request. Its result may expose the response
+                `headers`, and its errors a `status_code` and a `response`.
+            tokens: Estimated tokens of the request (prompt plus max tokens).
+            span: The tenant is read from its trace state, and the time spent
+                waiting is added to it as a "rate-limit-wait" event.
+            hold: Called with the response and a function that releases the slot,
+                for responses that keep the connection busy after `create_fn`
+                returned, e.g. streams. Its result is returned and the slot is
+                only released by that function.
+        """
+        tenant = _tenant_of(span)
+        attempt = 0
+        while True:
+            held = False
+            started_at = time.monotonic()
+            await self.__acquire(tenant, tokens)
+            granted_at = time.monotonic()
+            self.__record_wait(granted_at - started_at, tenant, attempt, span)
+            try:
+                response = await create_fn()
+            except Exception as e:
+                if getattr(e, "status_code", None) not in RATE_LIMITED_STATUS_CODES:
+                    raise
+                self.__on_rate_limited(
+                    granted_at, getattr(getattr(e, "response", None), "headers", None)
+                )
+                if attempt >= self.__config.max_retries:
+                    raise
+            else:
+                self.__on_success(getattr(response, "headers", None))
+                if hold is not None:
+                    response = hold(response, self.__slot_release())
+                    held = True
+                return response
+            finally:
+                if not held:
+                    self.__release()
+            attempt += 1
+
+    def __record_wait(
+        self, wait: float, tenant: Optional[str], attempt: int, span: Optional[Span]
+    ):
+        self.__acquired += 1
+        self.__total_wait += wait
+        self.__max_wait = max(self.__max_wait, wait)
+        if span and wait >= 0.001:
+            span.add_event(
+                name="rate-limit-wait",
+                attributes={
+                    "wait_seconds": wait,
+                    "tenant": tenant,
+                    "attempt": attempt,
+                    "concurrency_limit": self.__limit,
+                },
+            )
+
+    async def __acquire(self, tenant: Optional[str], tokens: int):
+        if not self.__tenants and self.__delay(tokens) == 0:
+            self.__grant(tokens)
+            return
+        future = asyncio.get_running_loop().create_future()
+        if tenant not in self.__queues:
+            self.__queues[tenant] = deque()
+            self.__tenants.append(tenant)
+        self.__queues[tenant].append((future, tokens))
+        self.__dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted right before the cancellation
+                self.__release()
+            raise
+
+    def __delay(self, tokens: int) -> Optional[float]:
+        """Seconds until a call can be sent, or None if it waits for a release."""
+        if self.__in_flight >= int(self.__limit):
+            return None
+        now = time.monotonic()
+        delay = self.__blocked_until - now
+        if self.__remaining_requests is not None:
+            if now >= self.__requests_reset_at:
+                self.__remaining_requests = None
+            elif self.__remaining_requests <= 0:
+                delay = max(delay, self.__requests_reset_at - now)
+        if self.__remaining_tokens is not None:
+            if now >= self.__tokens_reset_at:
+                self.__remaining_tokens = None
+            elif self.__remaining_tokens < tokens:
+                delay = max(delay, self.__tokens_reset_at - now)
+        return max(delay, 0.0)
+
+    def __grant(self, tokens: int):
+        self.__in_flight += 1
+        if self.__remaining_requests is not None:
+            self.__remaining_requests -= 1
+        if self.__remaining_tokens is not None:
+            self.__remaining_tokens -= tokens
+
+    def __dispatch(self):
+        while self.__tenants:
+            tenant = self.__tenants[0]
+            queue = self.__queues[tenant]
+            while queue and queue[0][0].done():
+                # Cancelled while waiting
+                queue.popleft()
+            if not queue:
+                self.__tenants.popleft()
+                del self.__queues[tenant]
+                continue
+            future, tokens = queue[0]
+            delay = self.__delay(tokens)
+            if delay is None:
+                return
+            if delay > 0:
+                if self.__timer is None:
+                    self.__timer = asyncio.get_running_loop().call_later(
+                        delay, self.__on_timer
+                    )
+                return
+            queue.popleft()
+            self.__tenants.rotate(-1)
+            self.__grant(tokens)
+            future.set_result(None)
+
+    def __on_timer(self):
+        self.__timer = None
+        self.__dispatch()
+
+    def __release(self):
+        self.__in_flight -= 1
+        self.__dispatch()
+
+    def __slot_release(self) -> Callable[[], None]:
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.__release()
+
+        return release
+
+    def __observe(self, headers: RateLimitHeaders):
+        now = time.monotonic()
+        default_reset = self.__config.default_retry_after
+        if headers.remaining_requests is not None:
+            self.__remaining_requests = headers.remaining_requests
+            self.__requests_reset_at = now + (
+                headers.requests_reset
+                if headers.requests_reset is not None
+                else default_reset
+            )
+        if headers.remaining_tokens is not None:
+            self.__remaining_tokens = headers.remaining_tokens
+            self.__tokens_reset_at = now + (
+                headers.tokens_reset
+                if headers.tokens_reset is not None
+                else default_reset
+            )
+
+    def __on_success(self, headers: Optional[Mapping[str, str]]):
+        self.__observe(RateLimitHeaders.parse(headers))
+        # Additive increase: about `increase_step` per round of `limit` calls
+        self.__limit = min(
+            self.__limit + self.__config.increase_step / self.__limit,
+            float(self.__config.max_concurrency),
+        )
+
+    def __on_rate_limited(
+        self, granted_at: float, headers: Optional[Mapping[str, str]]
+    ):
+        rate_limit_headers = RateLimitHeaders.parse(headers)
+        self.__observe(rate_limit_headers)
+        now = time.monotonic()
+        self.__rate_limited += 1
+        retry_after = (
+            rate_limit_headers.retry_after
+            if rate_limit_headers.retry_after is not None
+            else self.__config.default_retry_after
+        )
+        self.__blocked_until = max(self.__blocked_until, now + retry_after)
+        # Multiplicative decrease, once per round: calls sent before the last
+        # decrease were already accounted for
+        if granted_at >= self.__last_decrease:
+            self.__limit = max(
+                self.__limit * self.__config.decrease_factor,
+                float(self.__config.min_concurrency),
+            )
+            self.__last_decrease = now
+
+
+class RateLimiterRegistry:
+    """Shares one limiter per vendor, deployment (api base url) and model."""
+
+    def __init__(self):
+        self.__limiters: Dict[Tuple[str, str, str], AdaptiveRateLimiter] = {}
+
+    def get_or_create(
+        self,
+        vendor: str,
+        deployment: str,
+        model_name: str,
+        config: RateLimitConfiguration,
+    ) -> AdaptiveRateLimiter:
+        key = (vendor, deployment, model_name)
+        if key not in self.__limiters:
+            self.__limiters[key] = AdaptiveRateLimiter(config)
+        return self.__limiters[key]
+
+    def metrics(self) -> Dict[Tuple[str, str, str], RateLimiterMetrics]:
+        return {key: limiter.metrics() for key, limiter in self.__limiters.items()}
+
+
+rate_limiter_registry = RateLimiterRegistry()
+
+
+def rate_limiter_for(
+    vendor: str, client: Any, model_configuration: LLMModelConfiguration
+) -> Optional[AdaptiveRateLimiter]:
+    """Return the limiter of the model deployment the SDK client points to."""
+    if model_configuration.rate_limit is None:
+        return None
+    return rate_limiter_registry.get_or_create(
+        vendor=vendor,
+        deployment=str(client.base_url),
+        model_name=model_configuration.name,
+        config=model_configuration.rate_limit,
+    )
+
+
+class _SlotHoldingStream:
+    """Stream of a vendor SDK that holds its rate limiter slot until it ends.
+
+    The slot is released when the stream is exhausted, fails or is closed.
+    """
+
+    def __init__(self, stream: Any, release: Callable[[], None]):
+        self.__stream = stream
+        self.__release = release
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__stream, name)
+
+    def __aiter__(self) -> "_SlotHoldingStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return await self.__stream.__anext__()
+        except BaseException:
+            self.__release()
+            raise
+
+    async def aclose(self):
+        self.__release()
+        close = getattr(self.__stream, "close", None) or getattr(
+            self.__stream, "aclose", None
+        )
+        if close is not None:
+            await close()
+
+    close = aclose
+
+    def __del__(self):
+        try:
+            self.__release()
+        except RuntimeError:
+            # No running event loop to wake up the waiting calls
+            pass
+
+
+async def create_with_rate_limit(
+    resource: Any,
+    params: Dict[str, Any],
+    rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    tokens: int = 0,
+    span: Optional[Span] = None,
+) -> Any:
+    """Call `resource.create(**params)` of a vendor SDK through the rate limiter.
+
+    The raw response is requested so that the rate limit headers can be read.
+    Streams keep their slot until they are exhausted or closed.
+    """
+    if rate_limiter is None:
+        return await resource.create(**params)
+    create_fn = functools.partial(resource.with_raw_response.create, **params)
+    if params.get("stream"):
+        return await rate_limiter.call(
+            create_fn,
+            tokens=tokens,
+            span=span,
+            hold=lambda raw_response, release: _SlotHoldingStream(
+                raw_response.parse(), release
+            ),
+        )
+    raw_response = await rate_limiter.call(create_fn, tokens=tokens, span=span)
+    return raw_response.parse()
@@ -0,0 +1,340 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+
+from cachetools import LRUCache
+from typing_extensions import Literal
+from zav.llm_domain import (
+    LLMModelConfiguration,
+    LLMProviderName,
+    ResponseCacheConfiguration,
+)
+from zav.llm_tracing import Span
+from zav.object_storage_repo import (
+    ObjectRepository,
+    ObjectRepositoryFactory,
+    ObjectStorageItem,
+)
+
+from zav.prompt_completion.client import (
+    BaseCompletionClient,
+    ChatClientRequest,
+    ChatCompletionClient,
+    ChatMessage,
+    ChatResponse,
+    PromptCompletionClient,
+    PromptCompletionWithLogitsClient,
+    PromptResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+CacheEntry = List[Dict[str, Any]]
+
+
+def request_fingerprint(request: Dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(request, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class ResponseCache:
+    """Two tier (memory and optional object storage) cache of model responses.
+
+    Entries are lists of json serializable dicts: the chunks of a chat response or
+    the answer to a prompt. Writes to object storage happen in the background.
+    """
+
+    instances: Dict[str, "ResponseCache"] = {}
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        object_repository: Optional[ObjectRepository] = None,
+        storage_url: Optional[str] = None,
+    ):
+        self.__entries: LRUCache = LRUCache(maxsize=max_entries)
+        self.__object_repository = object_repository if storage_url else None
+        self.__storage_url = storage_url.rstrip("/") if storage_url else None
+        self.__pending_writes: Set[asyncio.Task] = set()
+
+    @classmethod
+    def get_or_create(cls, config: ResponseCacheConfiguration) -> "ResponseCache":
+        """Return the cache shared by all the clients with this configuration."""
+        key = config.json(exclude={"max_stream_chunks"})
+        if key not in cls.instances:
+            cls.instances[key] = cls(
+                max_entries=config.max_entries,
+                object_repository=(
+                    ObjectRepositoryFactory.create(config.storage_backend)
+                    if config.storage_backend
+                    else None
+                ),
+                storage_url=config.storage_url,
+            )
+        return cls.instances[key]
+
+    def __url(self, key: str) -> str:
+        return f"{self.__storage_url}/{key}.json"
+
+    async def get(self, key: str) -> Tuple[Optional[CacheEntry], Optional[str]]:
+        """Return the entry and the tier ("memory" or "storage") it was found in."""
+        entry = self.__entries.get(key)
+        if entry is not None:
+            return entry, "memory"
+        if self.__object_repository is None:
+            return None, None
+        try:
+            item = await self.__object_repository.get(self.__url(key))
+        except Exception as e:
+            logger.warning(f"Could not read response cache entry {key}: {e}")
+            return None, None
+        if item is None:
+            return None, None
+        entry = json.loads(item.payload)
+        self.__entries[key] = entry
+        return entry, "storage"
+
+    def set(self, key: str, entry: CacheEntry):
+        self.__entries[key] = entry
+        if self.__object_repository is not None:
+            task = asyncio.ensure_future(self.__write(key, entry))
+            self.__pending_writes.add(task)
+            task.add_done_callback(self.__pending_writes.discard)
+
+    async def __write(self, key: str, entry: CacheEntry):
+        try:
+            await self.__object_repository.add(  # type: ignore
+                ObjectStorageItem(
+                    url=self.__url(key), payload=json.dumps(entry).encode()
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Could not write response cache entry {key}: {e}")
+
+    async def flush(self):
+        """Wait for the pending object storage writes."""
+        await asyncio.gather(*self.__pending_writes, return_exceptions=True)
+
+    @classmethod
+    async def flush_all(cls):
+        await asyncio.gather(*(cache.flush() for cache in cls.instances.values()))
+
+
+def _add_cache_hit_event(span: Optional[Span], key: str, tier: Optional[str]):
+    if span:
+        span.add_event(name="response-cache-hit", attributes={"key": key, "tier": tier})
+
+
+class CachedChatCompletionClient(ChatCompletionClient):
+    def __init__(
+        self,
+        client: ChatCompletionClient,
+        cache: ResponseCache,
+        vendor: LLMProviderName,
+        model_configuration: LLMModelConfiguration,
+        max_stream_chunks: int = 32,
+        span: Optional[Span] = None,
+    ):
+        self.__client = client
+        self.__cache = cache
+        self.__vendor = vendor
+        self.__model_configuration = model_configuration
+        self.__max_stream_chunks = max_stream_chunks
+        self.__span = span
+
+    def __key(self, request: ChatClientRequest) -> str:
+        return request_fingerprint(
+            {
+                "vendor": self.__vendor,
+                "model": self.__model_configuration.name,
+                "temperature": self.__model_configuration.temperature,
+                "json_output": self.__model_configuration.json_output,
+                "interleave_system_message": (
+                    self.__model_configuration.interleave_system_message
+                ),
+                "max_tokens": request["max_tokens"],
+                "conversation": request["conversation"].dict(),
+                "functions": request.get("functions"),
+                "tools": request.get("tools"),
+                "tool_choice": request.get("tool_choice"),
+            }
+        )
+
+    async def complete(  # type: ignore
+        self,
+        request: ChatClientRequest,
+        stream: Union[Literal[True, False], bool] = False,
+        span: Optional[Span] = None,
+    ) -> Union[AsyncIterator[ChatResponse], ChatResponse]:
+        span = span or self.__span
+        key = self.__key(request)
+        entry, tier = await self.__cache.get(key)
+        if entry:
+            _add_cache_hit_event(span, key, tier)
+            chat_responses = [
+                ChatResponse(error=None, chat_message=ChatMessage.parse_obj(chunk))
+                for chunk in entry
+            ]
+            if stream:
+                return self.__replay(chat_responses)
+            return chat_responses[-1]
+
+        response = await self.__client.complete(request, stream=stream, span=span)
+        if isinstance(response, ChatResponse):
+            if response.error is None and response.chat_message is not None:
+                self.__cache.set(key, [response.chat_message.dict()])
+            return response
+        return self.__record(key, response)
+
+    @staticmethod
+    async def __replay(
+        chat_responses: List[ChatResponse],
+    ) -> AsyncIterator[ChatResponse]:
+        for chat_response in chat_responses:
+            yield chat_response
+
+    async def __record(
+        self, key: str, chat_responses: AsyncIterator[ChatResponse]
+    ) -> AsyncIterator[ChatResponse]:
+        chunks: CacheEntry = []
+        last_message: Optional[ChatMessage] = None
+        is_last_message_kept = False
+        failed = False
+        async for chat_response in chat_responses:
+            if chat_response.error is not None or chat_response.chat_message is None:
+                failed = True
+            else:
+                last_message = chat_response.chat_message
+                is_last_message_kept = len(chunks) < self.__max_stream_chunks
+                if is_last_message_kept:
+                    chunks.append(last_message.dict())
+            yield chat_response
+        if not failed and last_message is not None:
+            if not is_last_message_kept:
+                chunks.append(last_message.dict())
+            self.__cache.set(key, chunks)
+
+    def with_span(self, span: Optional[Span] = None) -> "CachedChatCompletionClient":
+        return CachedChatCompletionClient(
+            client=self.__client,
+            cache=self.__cache,
+            vendor=self.__vendor,
+            model_configuration=self.__model_configuration,
+            max_stream_chunks=self.__max_stream_chunks,
+            span=span,
+        )
+
+    @classmethod
+    def from_configuration(cls, *args, **kwargs):
+        raise NotImplementedError("Use BaseClientFactory.create to build this client")
+
+
+class _CachedPromptCompletion:
+    def __init__(
+        self,
+        client: Union[PromptCompletionClient, PromptCompletionWithLogitsClient],
+        cache: ResponseCache,
+        vendor: LLMProviderName,
+        model_configuration: LLMModelConfiguration,
+        span: Optional[Span] = None,
+    ):
+        self._client = client
+        self._cache = cache
+        self._vendor = vendor
+        self._model_configuration = model_configuration
+        self._span = span
+
+    async def complete(
+        self, prompts: List[str], max_tokens: int, span: Optional[Span] = None
+    ) -> List[PromptResponse]:
+        span = span or self._span
+        keys = [
+            request_fingerprint(
+                {
+                    "vendor": self._vendor,
+                    "model": self._model_configuration.name,
+                    "type": self._model_configuration.type,
+                    "temperature": self._model_configuration.temperature,
+                    "max_tokens": max_tokens,
+                    "prompt": prompt,
+                }
+            )
+            for prompt in prompts
+        ]
+        entries = await asyncio.gather(*[self._cache.get(key) for key in keys])
+        responses: List[Optional[PromptResponse]] = [None] * len(prompts)
+        missing = []
+        for index, (key, (entry, tier)) in enumerate(zip(keys, entries)):
+            if entry:
+                _add_cache_hit_event(span, key, tier)
+                responses[index] = PromptResponse(error=None, prompt_answer=entry[0])
+            else:
+                missing.append(index)
+        if missing:
+            prompt_responses = await self._client.complete(
+                [prompts[index] for index in missing], max_tokens, span=span
+            )
+            for index, prompt_response in zip(missing, prompt_responses):
+                if (
+                    prompt_response.error is None
+                    and prompt_response.prompt_answer is not None
+                ):
+                    self._cache.set(keys[index], [dict(prompt_response.prompt_answer)])
+                responses[index] = prompt_response
+        return responses  # type: ignore
+
+    @classmethod
+    def from_configuration(cls, *args, **kwargs):
+        raise NotImplementedError("Use BaseClientFactory.create to build this client")
+
+
+class CachedPromptCompletionClient(_CachedPromptCompletion, PromptCompletionClient):
+    def with_span(self, span: Optional[Span] = None) -> "CachedPromptCompletionClient":
+        return CachedPromptCompletionClient(
+            self._client, self._cache, self._vendor, self._model_configuration, span
+        )
+
+
+class CachedPromptCompletionWithLogitsClient(
+    _CachedPromptCompletion, PromptCompletionWithLogitsClient
+):
+    def with_span(
+        self, span: Optional[Span] = None
+    ) -> "CachedPromptCompletionWithLogitsClient":
+        return CachedPromptCompletionWithLogitsClient(
+            self._client, self._cache, self._vendor, self._model_configuration, span
+        )
+
+
+def with_response_cache(
+    client: BaseCompletionClient,
+    vendor: LLMProviderName,
+    model_configuration: LLMModelConfiguration,
+    span: Optional[Span] = None,
+) -> BaseCompletionClient:
+    """Wrap the client with the response cache of the model configuration."""
+    config = model_configuration.response_cache
+    if config is None:
+        return client
+    cache = ResponseCache.get_or_create(config)
+    if isinstance(client, ChatCompletionClient):
+        return CachedChatCompletionClient(
+            client=client,
+            cache=cache,
+            vendor=vendor,
+            model_configuration=model_configuration,
+            max_stream_chunks=config.max_stream_chunks,
+            span=span,
+        )
+    if isinstance(client, PromptCompletionWithLogitsClient):
+        return CachedPromptCompletionWithLogitsClient(
+            client, cache, vendor, model_configuration, span
+        )
+    if isinstance(client, PromptCompletionClient):
+        return CachedPromptCompletionClient(
+            client, cache, vendor, model_configuration, span
+        )
+    return client
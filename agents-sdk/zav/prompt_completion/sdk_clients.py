@@ -0,0 +1,113 @@
+import asyncio
+import os
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+import httpx
+from zav.encryption.fingerprint import credential_fingerprint
+
+T = TypeVar("T")
+
+SDKClientKey = Tuple[
+    str,
+    Optional[str],
+    Optional[str],
+    Optional[str],
+    str,
+    Optional[asyncio.AbstractEventLoop],
+]
+
+
+class SDKClientRegistry:
+    """Shares vendor SDK clients, and their connection pools, across requests.
+
+    Clients are keyed by vendor, api base, api type, api version, a fingerprint of
+    the credentials and the event loop their connections are bound to. At most
+    `max_clients` clients are kept: the least recently used one is dropped when a
+    new one is needed, and clients of closed event loops are dropped. Dropped
+    clients are not closed, as completion clients created from them may still be
+    in use, but `close` still closes the ones that are alive at shutdown.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20,
+        keepalive_expiry: Optional[float] = 30.0,
+        max_clients: int = 64,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.__max_clients = max_clients
+        self.__clients: "OrderedDict[SDKClientKey, Any]" = OrderedDict()
+        # Evicted clients, with the event loop they are bound to
+        self.__evicted: "weakref.WeakKeyDictionary[Any, Any]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def __len__(self) -> int:
+        return len(self.__clients)
+
+    def get_or_create(
+        self,
+        vendor: str,
+        create_fn: Callable[[], T],
+        credentials: Tuple[Optional[str], ...] = (),
+        api_base: Optional[str] = None,
+        api_type: Optional[str] = None,
+        api_version: Optional[str] = None,
+    ) -> T:
+        try:
+            loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        key = (
+            vendor,
+            api_base,
+            api_type,
+            api_version,
+            credential_fingerprint(*credentials),
+            loop,
+        )
+        client = self.__clients.get(key)
+        if client is not None:
+            self.__clients.move_to_end(key)
+            return client
+        self.__drop_closed_loops()
+        client = self.__clients[key] = create_fn()
+        while len(self.__clients) > self.__max_clients:
+            evicted_key, evicted = self.__clients.popitem(last=False)
+            self.__evicted[evicted] = evicted_key[-1]
+        return client
+
+    def __drop_closed_loops(self):
+        for key in [
+            key
+            for key in self.__clients
+            if key[-1] is not None and key[-1].is_closed()  # type: ignore
+        ]:
+            del self.__clients[key]
+
+    async def close(self):
+        current_loop = asyncio.get_running_loop()
+        clients, self.__clients = self.__clients, OrderedDict()
+        evicted, self.__evicted = self.__evicted, weakref.WeakKeyDictionary()
+        for client, loop in [
+            *((client, key[-1]) for key, client in clients.items()),
+            *evicted.items(),
+        ]:
+            # Clients of other (likely closed) event loops can only be dropped
+            if loop in (current_loop, None):
+                await client.close()
+
+
+sdk_client_registry = SDKClientRegistry(
+    max_connections=int(os.getenv("ZAV_LLM_MAX_CONNECTIONS", 100)),
+    max_keepalive_connections=int(os.getenv("ZAV_LLM_MAX_KEEPALIVE_CONNECTIONS", 20)),
+    keepalive_expiry=float(os.getenv("ZAV_LLM_KEEPALIVE_EXPIRY", 30.0)),
+    max_clients=int(os.getenv("ZAV_LLM_MAX_SDK_CLIENTS", 64)),
+)
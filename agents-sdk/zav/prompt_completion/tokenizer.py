@@ -0,0 +1,204 @@
+import functools
+import importlib.util
+import json
+import logging
+from typing import Any, Hashable, Optional, Tuple
+
+from cachetools import LRUCache
+from zav.executors import force_async
+from zav.llm_domain import LLMProviderName, TokenBudgetConfiguration
+from zav.llm_tracing import Span
+
+from zav.prompt_completion.client import (
+    BotConversation,
+    ChatClientRequest,
+    ChatMessage,
+    ChatMessageSender,
+    PromptTooLargeError,
+)
+
+logger = logging.getLogger(__name__)
+
+CHARACTERS_PER_TOKEN = 4
+# Role markers and separators added around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Priming of the reply of the model
+REPLY_OVERHEAD_TOKENS = 3
+# Upper bound of a high detail image tile set
+IMAGE_TOKENS = 765
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding_for(model_name: str) -> Any:
+    if importlib.util.find_spec("tiktoken") is None:
+        return None
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        pass
+    except Exception as e:
+        # Encodings are downloaded on first use and may not be reachable
+        logger.warning(f"Could not load the tokenizer of {model_name}: {e}")
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Could not load the cl100k_base tokenizer: {e}")
+        return None
+
+
+# Loads the encoding off the event loop, as it may be downloaded on first use
+_load_encoding = force_async(_encoding_for)
+
+# Token counts of recently counted texts, keyed by their hash rather than by the
+# texts themselves so that the cache does not keep the texts alive
+_token_counts: "LRUCache[Hashable, int]" = LRUCache(maxsize=4096)
+
+
+def _count_text_tokens(encoding: Any, text: str) -> int:
+    if encoding is None:
+        return -(-len(text) // CHARACTERS_PER_TOKEN)
+    key = (encoding.name, len(text), hash(text))
+    count = _token_counts.get(key)
+    if count is None:
+        count = _token_counts[key] = len(encoding.encode(text, disallowed_special=()))
+    return count
+
+
+class Tokenizer:
+    """Counts the tokens of chat requests without calling the model.
+
+    OpenAI models are counted with tiktoken when it is installed, other models (and
+    OpenAI models whose encoding cannot be loaded) with an approximation of
+    `CHARACTERS_PER_TOKEN` characters per token. The encoding of a tokenizer
+    created with `for_model` is loaded by `load`, and texts are approximated until
+    then.
+    """
+
+    def __init__(self, encoding: Any = None, model_name: Optional[str] = None):
+        self.__encoding = encoding
+        self.__model_name = model_name
+
+    @classmethod
+    def for_model(cls, vendor: LLMProviderName, model_name: str) -> "Tokenizer":
+        if vendor == LLMProviderName.OPENAI:
+            return cls(model_name=model_name)
+        return cls()
+
+    async def load(self) -> "Tokenizer":
+        """Load the encoding of the model, in a thread the first time."""
+        if self.__model_name is not None:
+            self.__encoding = await _load_encoding(self.__model_name)
+            self.__model_name = None
+        return self
+
+    @property
+    def is_exact(self) -> bool:
+        return self.__encoding is not None
+
+    def count_text(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        return _count_text_tokens(self.__encoding, text)
+
+    def count_message(self, message: ChatMessage) -> int:
+        tokens = MESSAGE_OVERHEAD_TOKENS + self.count_text(message.content)
+        if message.image_uri:
+            tokens += IMAGE_TOKENS
+        if fn_call := message.function_call_request:
+            tokens += self.count_text(fn_call.function_name)
+            tokens += self.count_text(json.dumps(fn_call.function_params))
+        if fn_response := message.function_call_response:
+            tokens += self.count_text(fn_response.function_name)
+            tokens += self.count_text(fn_response.function_response)
+        for tool_call in message.tool_call_requests or []:
+            tokens += MESSAGE_OVERHEAD_TOKENS
+            tokens += self.count_text(tool_call.function_call_request.function_name)
+            tokens += self.count_text(
+                json.dumps(tool_call.function_call_request.function_params)
+            )
+        for tool_response in message.tool_call_responses or []:
+            tokens += MESSAGE_OVERHEAD_TOKENS + self.count_text(
+                tool_response.tool_response
+            )
+        return tokens
+
+    def count_request(self, request: ChatClientRequest) -> int:
+        """Estimate the prompt tokens of the request, excluding the completion."""
+        conversation = request["conversation"]
+        tokens = REPLY_OVERHEAD_TOKENS + sum(
+            self.count_message(message) for message in conversation.messages
+        )
+        if conversation.bot_setup_description:
+            tokens += MESSAGE_OVERHEAD_TOKENS + self.count_text(
+                conversation.bot_setup_description
+            )
+        for definitions in (request.get("functions"), request.get("tools")):
+            if definitions:
+                tokens += self.count_text(json.dumps(definitions, sort_keys=True))
+        return tokens
+
+
+def _is_response(message: ChatMessage) -> bool:
+    return message.sender in (ChatMessageSender.FUNCTION, ChatMessageSender.TOOL) or (
+        message.function_call_response is not None
+        or message.tool_call_responses is not None
+    )
+
+
+def fit_request(
+    request: ChatClientRequest,
+    tokenizer: Tokenizer,
+    token_budget: TokenBudgetConfiguration,
+    span: Optional[Span] = None,
+) -> Tuple[ChatClientRequest, int, Optional[PromptTooLargeError]]:
+    """Check that the request fits the context window of the model.
+
+    When the request is too large and trimming is enabled, the oldest messages are
+    dropped, together with the function and tool responses that would be left
+    without their call. The last message is always kept. Trimming is reported as a
+    "conversation-trimmed" event of the span.
+
+    Returns:
+        The request to send, the number of messages that were dropped and the error
+        to return instead of sending the request, if any.
+    """
+    budget = token_budget.context_window - request["max_tokens"]
+    prompt_tokens = tokenizer.count_request(request)
+    if prompt_tokens <= budget:
+        return request, 0, None
+
+    messages = request["conversation"].messages
+    dropped = 0
+    if token_budget.trim_conversation:
+        while prompt_tokens > budget and dropped < len(messages) - 1:
+            prompt_tokens -= tokenizer.count_message(messages[dropped])
+            dropped += 1
+            while dropped < len(messages) - 1 and _is_response(messages[dropped]):
+                prompt_tokens -= tokenizer.count_message(messages[dropped])
+                dropped += 1
+    if prompt_tokens > budget:
+        extra_tokens = prompt_tokens - budget
+        return (
+            request,
+            0,
+            PromptTooLargeError(
+                f"The prompt is estimated at {prompt_tokens} tokens, which is "
+                f"{extra_tokens} more than the {budget} tokens left in the context "
+                f"window after reserving {request['max_tokens']} for the completion",
+                extra_tokens=extra_tokens,
+            ),
+        )
+    if span:
+        span.add_event(
+            name="conversation-trimmed",
+            attributes={"dropped_messages": dropped, "prompt_tokens": prompt_tokens},
+        )
+    trimmed_request = ChatClientRequest(**request)  # type: ignore
+    trimmed_request["conversation"] = BotConversation(
+        bot_setup_description=request["conversation"].bot_setup_description,
+        messages=messages[dropped:],
+    )
+    return trimmed_request, dropped, None
@@ -14,6 +14,7 @@ __version__ = "2.8.20"
 
 # import ApiClient
 from zav.search_api.api_client import ApiClient
+from zav.search_api.async_api_client import AsyncApiClient
 
 # import Configuration
 from zav.search_api.configuration import Configuration
@@ -135,6 +135,47 @@ class ApiClient(object):
         _content_type: typing.Optional[str] = None
     ):
 
+        method, url, query_params, header_params, post_params, body = \
+            self._prepare_request(
+                resource_path, method, path_params, query_params,
+                header_params, body, post_params, files, auth_settings,
+                collection_formats, _host)
+
+        try:
+            # perform request and return response
+            response_data = self.request(
+                method, url, query_params=query_params, headers=header_params,
+                post_params=post_params, body=body,
+                _preload_content=_preload_content,
+                _request_timeout=_request_timeout)
+        except ApiException as e:
+            e.body = e.body.decode('utf-8')
+            raise e
+
+        self.last_response = response_data
+
+        return self._handle_response(
+            response_data, response_type, _return_http_data_only,
+            _preload_content, _check_type)
+
+    def _prepare_request(
+        self,
+        resource_path: str,
+        method: str,
+        path_params: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        query_params: typing.Optional[typing.List[typing.Tuple[str, typing.Any]]] = None,
+        header_params: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        body: typing.Optional[typing.Any] = None,
+        post_params: typing.Optional[typing.List[typing.Tuple[str, typing.Any]]] = None,
+        files: typing.Optional[typing.Dict[str, typing.List[io.IOBase]]] = None,
+        auth_settings: typing.Optional[typing.List[str]] = None,
+        collection_formats: typing.Optional[typing.Dict[str, str]] = None,
+        _host: typing.Optional[str] = None,
+    ):
+        """Serializes the request parameters and builds the request url.
+
+        Shared by the synchronous and the asyncio clients.
+        """
         config = self.configuration
 
         # header parameters
@@ -191,19 +232,20 @@ class ApiClient(object):
             # use server/host defined in path or operation instead
             url = _host + resource_path
 
-        try:
-            # perform request and return response
-            response_data = self.request(
-                method, url, query_params=query_params, headers=header_params,
-                post_params=post_params, body=body,
-                _preload_content=_preload_content,
-                _request_timeout=_request_timeout)
-        except ApiException as e:
-            e.body = e.body.decode('utf-8')
-            raise e
+        return method, url, query_params, header_params, post_params, body
 
-        self.last_response = response_data
+    def _handle_response(
+        self,
+        response_data,
+        response_type: typing.Optional[typing.Tuple[typing.Any]] = None,
+        _return_http_data_only: typing.Optional[bool] = None,
+        _preload_content: bool = True,
+        _check_type: typing.Optional[bool] = None
+    ):
+        """Deserializes the response of a request.
 
+        Shared by the synchronous and the asyncio clients.
+        """
         return_data = response_data
 
         if not _preload_content:
@@ -784,6 +826,10 @@ class Endpoint(object):
 
     def call_with_http_info(self, **kwargs):
 
+        # Extra headers sent with this call only, e.g. per-request credentials
+        # when the api client is shared between requests.
+        _headers = kwargs.pop('_headers', None)
+
         try:
             index = self.api_client.configuration.server_operation_index.get(
                 self.settings['operation_id'], self.api_client.configuration.server_index
@@ -847,6 +893,9 @@ class Endpoint(object):
                         params['body'])
                     params['header']['Content-Type'] = header_list
 
+        if _headers:
+            params['header'].update(_headers)
+
         return self.api_client.call_api(
             self.settings['endpoint_path'], self.settings['http_method'],
             params['path'],
@@ -0,0 +1,134 @@
+"""
+Asyncio counterpart of `zav.search_api.ApiClient`.
+
+`call_api` is a coroutine backed by `AsyncRESTClientObject`, so every generated
+endpoint (e.g. `DocumentsApi.document_search_post`) returns an awaitable when
+the api instance is constructed with an `AsyncApiClient`.
+"""
+
+import io
+import typing
+
+from zav.search_api.api_client import ApiClient
+from zav.search_api.exceptions import ApiException
+from zav.search_api.rest_async import AsyncRESTClientObject
+
+
+class AsyncApiClient(ApiClient):
+    """Generic asyncio API client.
+
+    :param configuration: .Configuration object for this client
+    :param header_name: a header to pass when making calls to the API.
+    :param header_value: a header value to pass when making calls to
+        the API.
+    :param cookie: a cookie to include in the header when making calls
+        to the API
+    :param maxsize: maximum number of concurrent connections. Defaults to
+        `configuration.connection_pool_maxsize`.
+    :param max_keepalive: maximum number of idle connections kept alive.
+    :param keepalive_expiry: seconds an idle connection is kept alive.
+    :param http2: negotiate HTTP/2. Requires `httpx[http2]` to be installed,
+        HTTP/1.1 is used otherwise.
+    """
+
+    def __init__(
+        self,
+        configuration=None,
+        header_name=None,
+        header_value=None,
+        cookie=None,
+        maxsize=None,
+        max_keepalive=None,
+        keepalive_expiry=30.0,
+        http2=False,
+    ):
+        super().__init__(configuration, header_name, header_value, cookie)
+        self.rest_client = AsyncRESTClientObject(
+            self.configuration,
+            maxsize=maxsize,
+            max_keepalive=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+            http2=http2,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.rest_client.close()
+
+    async def call_api(
+        self,
+        resource_path: str,
+        method: str,
+        path_params: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        query_params: typing.Optional[
+            typing.List[typing.Tuple[str, typing.Any]]
+        ] = None,
+        header_params: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        body: typing.Optional[typing.Any] = None,
+        post_params: typing.Optional[typing.List[typing.Tuple[str, typing.Any]]] = None,
+        files: typing.Optional[typing.Dict[str, typing.List[io.IOBase]]] = None,
+        response_type: typing.Optional[typing.Tuple[typing.Any]] = None,
+        auth_settings: typing.Optional[typing.List[str]] = None,
+        async_req: typing.Optional[bool] = None,
+        _return_http_data_only: typing.Optional[bool] = None,
+        collection_formats: typing.Optional[typing.Dict[str, str]] = None,
+        _preload_content: bool = True,
+        _request_timeout: typing.Optional[
+            typing.Union[int, float, typing.Tuple]
+        ] = None,
+        _host: typing.Optional[str] = None,
+        _check_type: typing.Optional[bool] = None,
+    ):
+        """Makes the HTTP request on the event loop and returns deserialized data.
+
+        Accepts the same parameters as `ApiClient.call_api`. `async_req` is
+        ignored since the request is always awaited. The client is shared by
+        concurrent requests, so `last_response` is not set: pass
+        `_return_http_data_only=False` to get the status and headers of the
+        response with its data.
+        """
+        method, url, query_params, header_params, post_params, body = (
+            self._prepare_request(
+                resource_path,
+                method,
+                path_params,
+                query_params,
+                header_params,
+                body,
+                post_params,
+                files,
+                auth_settings,
+                collection_formats,
+                _host,
+            )
+        )
+
+        try:
+            # perform request and return response
+            response_data = await self.request(
+                method,
+                url,
+                query_params=query_params,
+                headers=header_params,
+                post_params=post_params,
+                body=body,
+                _preload_content=_preload_content,
+                _request_timeout=_request_timeout,
+            )
+        except ApiException as e:
+            if isinstance(e.body, bytes):
+                e.body = e.body.decode("utf-8")
+            raise e
+
+        return self._handle_response(
+            response_data,
+            response_type,
+            _return_http_data_only,
+            _preload_content,
+            _check_type,
+        )
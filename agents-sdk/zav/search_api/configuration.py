@@ -134,6 +134,7 @@ class Configuration(object):
         """
         self.logger["package_logger"] = logging.getLogger("zav.search_api")
         self.logger["urllib3_logger"] = logging.getLogger("urllib3")
+        self.logger["httpx_logger"] = logging.getLogger("httpx")
         self.logger_format = '%(asctime)s %(levelname)s %(message)s'
         """Log format
         """
@@ -0,0 +1,389 @@
+"""
+Asyncio counterpart of `zav.search_api.rest`, backed by httpx.AsyncClient.
+
+Requests are awaited directly on the event loop instead of being pushed onto
+threads, and connections are kept alive and pooled across requests. HTTP/1.1 is
+used by default. To use HTTP/2, install `httpx[http2]` (which adds the `h2`
+package) and pass `http2=True`.
+"""
+
+import importlib.util
+import io
+import json
+import logging
+import re
+import ssl
+
+import httpx
+
+from zav.search_api.exceptions import (
+    ApiException,
+    UnauthorizedException,
+    ForbiddenException,
+    NotFoundException,
+    ServiceException,
+    ApiValueError,
+)
+from zav.search_api.rest import should_bypass_proxies
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRESTResponse(io.IOBase):
+
+    def __init__(self, resp: httpx.Response):
+        self.httpx_response = resp
+        self.status = resp.status_code
+        self.reason = resp.reason_phrase
+        self.data = resp.content
+
+    def getheaders(self):
+        """Returns a dictionary of the response headers."""
+        return self.httpx_response.headers
+
+    def getheader(self, name, default=None):
+        """Returns a given response header."""
+        return self.httpx_response.headers.get(name, default)
+
+
+class AsyncRESTClientObject(object):
+
+    def __init__(
+        self,
+        configuration,
+        maxsize=None,
+        max_keepalive=None,
+        keepalive_expiry=30.0,
+        http2=False,
+    ):
+        """
+        :param configuration: .Configuration object of the client
+        :param maxsize: maximum number of concurrent connections. Defaults to
+                        `configuration.connection_pool_maxsize`.
+        :param max_keepalive: maximum number of idle connections kept alive.
+                              Defaults to `maxsize`.
+        :param keepalive_expiry: seconds an idle connection is kept alive.
+        :param http2: negotiate HTTP/2. Requires `httpx[http2]` to be installed,
+                      HTTP/1.1 is used otherwise.
+        """
+        if maxsize is None:
+            if configuration.connection_pool_maxsize is not None:
+                maxsize = configuration.connection_pool_maxsize
+            else:
+                maxsize = 4
+        if max_keepalive is None:
+            max_keepalive = maxsize
+
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning(
+                "HTTP/2 requires `pip install httpx[http2]`, falling back to HTTP/1.1"
+            )
+            http2 = False
+
+        if configuration.verify_ssl:
+            verify = ssl.create_default_context(cafile=configuration.ssl_ca_cert)
+            if configuration.assert_hostname is False:
+                verify.check_hostname = False
+        else:
+            verify = False
+
+        cert = None
+        if configuration.cert_file:
+            cert = (
+                (configuration.cert_file, configuration.key_file)
+                if configuration.key_file
+                else configuration.cert_file
+            )
+
+        proxy = None
+        if configuration.proxy and not should_bypass_proxies(
+            configuration.host, no_proxy=configuration.no_proxy or ""
+        ):
+            proxy = httpx.Proxy(
+                configuration.proxy, headers=configuration.proxy_headers
+            )
+
+        # `None` means the urllib3 default of 3 retries. Only connection errors
+        # are retried by httpx.
+        retries = configuration.retries
+        if retries is None:
+            retries = 3
+        elif not isinstance(retries, int):
+            retries = retries.total or 0
+
+        # Like urllib3, requests have no timeout unless one is given per request
+        self.http_client = httpx.AsyncClient(
+            timeout=None,
+            transport=httpx.AsyncHTTPTransport(
+                http2=http2,
+                verify=verify,
+                cert=cert,
+                proxy=proxy,
+                retries=retries,
+                limits=httpx.Limits(
+                    max_connections=maxsize,
+                    max_keepalive_connections=max_keepalive,
+                    keepalive_expiry=keepalive_expiry,
+                ),
+            ),
+        )
+
+    async def close(self):
+        await self.http_client.aclose()
+
+    async def request(
+        self,
+        method,
+        url,
+        query_params=None,
+        headers=None,
+        body=None,
+        post_params=None,
+        _preload_content=True,
+        _request_timeout=None,
+    ):
+        """Perform requests.
+
+        :param method: http request method
+        :param url: http request url
+        :param query_params: query parameters in the url
+        :param headers: http request headers
+        :param body: request json body, for `application/json`
+        :param post_params: request post parameters,
+                            `application/x-www-form-urlencoded`
+                            and `multipart/form-data`
+        :param _preload_content: if False, the httpx.Response object will
+                                 be returned without being wrapped. The body
+                                 is always read. Default is True.
+        :param _request_timeout: timeout setting for this request. If one
+                                 number provided, it will be total request
+                                 timeout. It can also be a pair (tuple) of
+                                 (connection, read) timeouts.
+        """
+        method = method.upper()
+        assert method in ["GET", "HEAD", "DELETE", "POST", "PUT", "PATCH", "OPTIONS"]
+
+        if post_params and body:
+            raise ApiValueError(
+                "body parameter cannot be used with post_params parameter."
+            )
+
+        post_params = post_params or {}
+        headers = headers or {}
+
+        timeout = httpx.USE_CLIENT_DEFAULT
+        if _request_timeout:
+            if isinstance(_request_timeout, (int, float)):  # noqa: E501,F821
+                timeout = httpx.Timeout(_request_timeout)
+            elif isinstance(_request_timeout, tuple) and len(_request_timeout) == 2:
+                timeout = httpx.Timeout(
+                    None, connect=_request_timeout[0], read=_request_timeout[1]
+                )
+
+        request_kwargs = {}
+        # For `POST`, `PUT`, `PATCH`, `OPTIONS`, `DELETE`
+        if method in ["POST", "PUT", "PATCH", "OPTIONS", "DELETE"]:
+            # Only set a default Content-Type for POST, PUT, PATCH and OPTIONS requests
+            if (method != "DELETE") and ("Content-Type" not in headers):
+                headers["Content-Type"] = "application/json"
+            if ("Content-Type" not in headers) or (
+                re.search("json", headers["Content-Type"], re.IGNORECASE)
+            ):
+                if body is not None:
+                    request_kwargs["content"] = json.dumps(body)
+            elif (
+                headers["Content-Type"] == "application/x-www-form-urlencoded"
+            ):  # noqa: E501
+                request_kwargs["data"] = dict(post_params)
+            elif headers["Content-Type"] == "multipart/form-data":
+                # must del headers['Content-Type'], or the correct
+                # Content-Type which generated by httpx will be
+                # overwritten.
+                del headers["Content-Type"]
+                request_kwargs["files"] = post_params
+            # Pass a `string` parameter directly in the body to support
+            # other content types than Json when `body` argument is
+            # provided in serialized form
+            elif isinstance(body, str) or isinstance(body, bytes):
+                request_kwargs["content"] = body
+            else:
+                # Cannot generate the request from given parameters
+                msg = """Cannot prepare a request message for provided
+                         arguments. Please check that your arguments match
+                         declared content type."""
+                raise ApiException(status=0, reason=msg)
+
+        try:
+            r = await self.http_client.request(
+                method,
+                url,
+                params=query_params or None,
+                headers=headers,
+                timeout=timeout,
+                **request_kwargs
+            )
+        except httpx.HTTPError as e:
+            msg = "{0}\n{1}".format(type(e).__name__, str(e))
+            raise ApiException(status=0, reason=msg)
+
+        if _preload_content:
+            r = AsyncRESTResponse(r)
+
+            # log response body
+            logger.debug("response body: %s", r.data)
+
+        status = r.status if _preload_content else r.status_code
+        if not 200 <= status <= 299:
+            r = r if _preload_content else AsyncRESTResponse(r)
+            if status == 401:
+                raise UnauthorizedException(http_resp=r)
+
+            if status == 403:
+                raise ForbiddenException(http_resp=r)
+
+            if status == 404:
+                raise NotFoundException(http_resp=r)
+
+            if 500 <= status <= 599:
+                raise ServiceException(http_resp=r)
+
+            raise ApiException(http_resp=r)
+
+        return r
+
+    async def GET(
+        self,
+        url,
+        headers=None,
+        query_params=None,
+        _preload_content=True,
+        _request_timeout=None,
+    ):
+        return await self.request(
+            "GET",
+            url,
+            headers=headers,
+            _preload_content=_preload_content,
+            _request_timeout=_request_timeout,
+            query_params=query_params,
+        )
+
+    async def HEAD(
+        self,
+        url,
+        headers=None,
+        query_params=None,
+        _preload_content=True,
+        _request_timeout=None,
+    ):
+        return await self.request(
+            "HEAD",
+            url,
+            headers=headers,
+            _preload_content=_preload_content,
+            _request_timeout=_request_timeout,
+            query_params=query_params,
+        )
+
+    async def OPTIONS(
+        self,
+        url,
+        headers=None,
+        query_params=None,
+        post_params=None,
+        body=None,
+        _preload_content=True,
+        _request_timeout=None,
+    ):
+        return await self.request(
+            "OPTIONS",
+            url,
+            headers=headers,
+            query_params=query_params,
+            post_params=post_params,
+            _preload_content=_preload_content,
+            _request_timeout=_request_timeout,
+            body=body,
+        )
+
+    async def DELETE(
+        self,
+        url,
+        headers=None,
+        query_params=None,
+        body=None,
+        _preload_content=True,
+        _request_timeout=None,
+    ):
+        return await self.request(
+            "DELETE",
+            url,
+            headers=headers,
+            query_params=query_params,
+            _preload_content=_preload_content,
+            _request_timeout=_request_timeout,
+            body=body,
+        )
+
+    async def POST(
+        self,
+        url,
+        headers=None,
+        query_params=None,
+        post_params=None,
+        body=None,
+        _preload_content=True,
+        _request_timeout=None,
+    ):
+        return await self.request(
+            "POST",
+            url,
+            headers=headers,
+            query_params=query_params,
+            post_params=post_params,
+            _preload_content=_preload_content,
+            _request_timeout=_request_timeout,
+            body=body,
+        )
+
+    async def PUT(
+        self,
+        url,
+        headers=None,
+        query_params=None,
+        post_params=None,
+        body=None,
+        _preload_content=True,
+        _request_timeout=None,
+    ):
+        return await self.request(
+            "PUT",
+            url,
+            headers=headers,
+            query_params=query_params,
+            post_params=post_params,
+            _preload_content=_preload_content,
+            _request_timeout=_request_timeout,
+            body=body,
+        )
+
+    async def PATCH(
+        self,
+        url,
+        headers=None,
+        query_params=None,
+        post_params=None,
+        body=None,
+        _preload_content=True,
+        _request_timeout=None,
+    ):
+        return await self.request(
+            "PATCH",
+            url,
+            headers=headers,
+            query_params=query_params,
+            post_params=post_params,
+            _preload_content=_preload_content,
+            _request_timeout=_request_timeout,
+            body=body,
+        )